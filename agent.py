@@ -0,0 +1,278 @@
+"""Локальный агент разблокировки (по аналогии с ssh-agent).
+
+Агент один раз выводит ключи хранилища и держит их в памяти, обслуживая
+запросы encrypt/decrypt через Unix-сокет с правами 0600 в каталоге 0700.
+После idle_timeout секунд без запросов ключи забываются и агент
+завершается. Протокол - JSON, одна строка на запрос и ответ.
+
+    echo "$MASTER" | python agent.py start &
+    python lockup.py --agent list
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import socketserver
+import struct
+import sys
+import tempfile
+import threading
+import time
+
+DEFAULT_IDLE_TIMEOUT = 15 * 60
+
+def default_socket_path() -> str:
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"lockup-{os.getuid()}", "agent.sock")
+
+def _pack_field(value):
+    # Шифротекст AEAD (bytes) передается в base64, токен Fernet - строкой
+    if isinstance(value, bytes):
+        return {"b64": base64.b64encode(value).decode()}
+    return value
+
+def _unpack_field(value):
+    if isinstance(value, dict):
+        return base64.b64decode(value["b64"])
+    return value
+
+class AgentError(Exception):
+    """Агент недоступен или отклонил запрос"""
+
+def _is_listening(socket_path: str) -> bool:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        return False
+    finally:
+        sock.close()
+    return True
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        if not self.server.peer_allowed(self.request):
+            return
+        for line in self.rfile:
+            try:
+                response = self.server.dispatch(json.loads(line))
+            except Exception as e:
+                response = {"ok": False, "error": str(e)}
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+class AgentServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, key_context, socket_path: str = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT):
+        self.key_context = key_context
+        self.socket_path = socket_path or default_socket_path()
+        self.idle_timeout = idle_timeout
+        self.last_activity = time.monotonic()
+        self._stopped = threading.Event()
+
+        directory = os.path.dirname(self.socket_path)
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        os.chmod(directory, 0o700)
+        if os.path.exists(self.socket_path):
+            if _is_listening(self.socket_path):
+                raise FileExistsError(f"Агент уже запущен: {self.socket_path}")
+            # Сокет остался от завершившегося агента
+            os.remove(self.socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+        os.chmod(self.socket_path, 0o600)
+
+    def peer_allowed(self, connection) -> bool:
+        """На Linux принимаются только процессы того же пользователя"""
+        if not hasattr(socket, "SO_PEERCRED"):
+            return True
+        creds = connection.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i"))
+        _, uid, _ = struct.unpack("3i", creds)
+        return uid == os.getuid()
+
+    def dispatch(self, request: dict) -> dict:
+        self.last_activity = time.monotonic()
+        op = request.get("op")
+        if op == "ping":
+            return {"ok": True, "unlocked": self.key_context is not None}
+        if op == "lock":
+            self.stop()
+            return {"ok": True}
+        if self.key_context is None:
+            return {"ok": False, "error": "Хранилище заблокировано"}
+
+        crypto = self.key_context
+        data = request.get("data", "")
+        if op == "encrypt":
+            return {"ok": True, "result": crypto.encrypt(data)}
+        if op == "decrypt":
+            return {"ok": True, "result": crypto.decrypt(data)}
+        if op == "encrypt_bytes":
+            return {"ok": True, "result": base64.b64encode(crypto.encrypt_bytes(base64.b64decode(data))).decode()}
+        if op == "decrypt_bytes":
+            return {"ok": True, "result": base64.b64encode(crypto.decrypt_bytes(base64.b64decode(data))).decode()}
+        if op == "encrypt_fields":
+            items = [(record_id, column, value) for record_id, column, value in data]
+            return {"ok": True, "result": [_pack_field(value) for value in crypto.encrypt_fields(items)]}
+        if op == "decrypt_fields":
+            items = [(record_id, column, _unpack_field(value)) for record_id, column, value in data]
+            return {"ok": True, "result": crypto.decrypt_fields(items)}
+        if op == "hmac_key":
+            return {"ok": True, "result": crypto.generate_hmac_key().hex()}
+        return {"ok": False, "error": f"Неизвестная операция: {op}"}
+
+    def run(self, poll_interval: float = 0.5):
+        """Обслуживание запросов до lock, stop() или истечения idle_timeout"""
+        self.timeout = poll_interval
+        try:
+            while not self._stopped.is_set():
+                self.handle_request()
+                if self.idle_timeout and time.monotonic() - self.last_activity > self.idle_timeout:
+                    break
+        finally:
+            self.key_context = None
+            self.server_close()
+            if os.path.exists(self.socket_path):
+                os.remove(self.socket_path)
+
+    def start_background(self) -> threading.Thread:
+        thread = threading.Thread(target=self.run, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.key_context = None
+        self._stopped.set()
+
+class AgentClient:
+    """Клиент агента с интерфейсом CryptoManager (encrypt, decrypt и т.д.)"""
+
+    def __init__(self, socket_path: str = None, timeout: float = 10):
+        self.socket_path = socket_path or default_socket_path()
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._hmac_key = None
+
+    def _connect(self):
+        if self._sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.socket_path)
+            except OSError as e:
+                sock.close()
+                raise AgentError(f"Агент недоступен: {e}")
+            self._sock = sock
+            self._file = sock.makefile("rwb")
+
+    def call(self, op: str, data=None):
+        self._connect()
+        request = {"op": op}
+        if data is not None:
+            request["data"] = data
+        self._file.write(json.dumps(request).encode() + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            self.close()
+            raise AgentError("Агент закрыл соединение")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise AgentError(response.get("error", "Ошибка агента"))
+        return response.get("result", response)
+
+    def is_unlocked(self) -> bool:
+        try:
+            return bool(self.call("ping")["unlocked"])
+        except AgentError:
+            return False
+
+    def encrypt(self, data):
+        return self.call("encrypt", data)
+
+    def decrypt(self, encrypted_data):
+        return self.call("decrypt", encrypted_data)
+
+    def encrypt_fields(self, items):
+        items = [[record_id, column, value] for record_id, column, value in items]
+        if not items:
+            return []
+        return [_unpack_field(value) for value in self.call("encrypt_fields", items)]
+
+    def decrypt_fields(self, items):
+        items = [[record_id, column, _pack_field(value)] for record_id, column, value in items]
+        if not items:
+            return []
+        return self.call("decrypt_fields", items)
+
+    def encrypt_field(self, record_id, column, value):
+        return self.encrypt_fields([(record_id, column, value)])[0]
+
+    def decrypt_field(self, record_id, column, value):
+        return self.decrypt_fields([(record_id, column, value)])[0]
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        return base64.b64decode(self.call("encrypt_bytes", base64.b64encode(data).decode()))
+
+    def decrypt_bytes(self, token: bytes) -> bytes:
+        return base64.b64decode(self.call("decrypt_bytes", base64.b64encode(token).decode()))
+
+    def generate_hmac_key(self):
+        if self._hmac_key is None:
+            self._hmac_key = bytes.fromhex(self.call("hmac_key"))
+        return self._hmac_key
+
+    def close(self):
+        if self._sock is not None:
+            self._file.close()
+            self._sock.close()
+            self._sock = None
+            self._file = None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="lockup-agent", description="Агент разблокировки LockUp")
+    parser.add_argument("command", choices=["start", "stop", "status"])
+    parser.add_argument("--socket", help="путь к сокету агента")
+    parser.add_argument("--db", help="путь к файлу базы (по умолчанию из settings.json)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_IDLE_TIMEOUT,
+                        help="время простоя в секундах до блокировки")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        print(json.dumps({"unlocked": AgentClient(args.socket).is_unlocked()}))
+        return 0
+    if args.command == "stop":
+        try:
+            AgentClient(args.socket).call("lock")
+        except AgentError as e:
+            print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+            return 1
+        return 0
+
+    from lockup import _read_secret
+    from connection import set_database_path
+    from database import unlock_vault
+    from settings import load_settings
+
+    set_database_path(args.db or load_settings()["database_path"])
+    key_context = unlock_vault(_read_secret("Мастер-пароль: "), load_settings()["kdf"])
+    if key_context is None:
+        print(json.dumps({"error": "Неверный мастер-пароль!"}, ensure_ascii=False), file=sys.stderr)
+        return 2
+    try:
+        server = AgentServer(key_context, args.socket, args.timeout)
+    except OSError as e:
+        print(json.dumps({"error": str(e)}, ensure_ascii=False), file=sys.stderr)
+        return 1
+    print(json.dumps({"socket": server.socket_path}), flush=True)
+    server.run()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,23 @@
+"""Общий кеш изображений интерфейса.
+
+Каждый PNG декодируется один раз за запуск; окна, открытые повторно,
+получают уже готовый объект PhotoImage. Кеш держит ссылки на изображения,
+поэтому Tk не удаляет их вместе с локальными переменными окон.
+"""
+import tkinter as tk
+
+_images = {}
+
+def load_image(filename: str, factor: int = 1) -> tk.PhotoImage:
+    """Изображение из файла, уменьшенное в factor раз"""
+    key = (filename, factor)
+    image = _images.get(key)
+    if image is None:
+        original = _images.get((filename, 1))
+        if original is None:
+            original = _images[(filename, 1)] = tk.PhotoImage(file=filename)
+        image = _images[key] = original.subsample(factor) if factor != 1 else original
+    return image
+
+def clear():
+    _images.clear()
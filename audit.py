@@ -0,0 +1,109 @@
+"""Проверка паролей хранилища: повторы, слабые и давно не менявшиеся пароли.
+
+Пароли расшифровываются пачками в пуле процессов (rekey.map_chunks) и
+сразу заменяются отпечатком - HMAC-SHA256 с ключом, выведенным из ключа
+хранилища, - и оценкой стойкости. Открытые пароли из рабочих процессов
+не возвращаются; повторы ищутся по совпадению отпечатков. Если задана
+локальная база утечек (breach.py), пароль проверяется и по ней.
+
+Как и rekey.py, модуль не импортирует tkinter и database.
+"""
+import base64
+import hashlib
+import hmac
+import math
+import string
+
+from breach import open_corpus
+from cipher import FieldCipher
+from rekey import map_chunks
+
+FINGERPRINT_SIZE = 16
+TOKEN_TAG_SIZE = 16
+WEAK_SCORE = 2  # оценки ниже считаются слабыми
+OLD_AFTER_DAYS = 365
+
+# Самые частые пароли и их основы; совпадение обнуляет оценку
+COMMON_PASSWORDS = frozenset((
+    "password", "passw0rd", "qwerty", "qwertyuiop", "123456", "12345678", "123456789",
+    "1234567890", "111111", "000000", "abc123", "letmein", "welcome", "admin", "iloveyou",
+    "monkey", "dragon", "football", "baseball", "master", "sunshine", "princess", "login",
+    "starwars", "whatever", "trustno1", "йцукен", "пароль",
+))
+KEYBOARD_ROWS = ("qwertyuiop", "asdfghjkl", "zxcvbnm", "1234567890", "йцукенгшщзхъ", "фывапролджэ", "ячсмитьбю")
+# Соседние клавиши в обе стороны: "qw" и "wq"
+KEYBOARD_PAIRS = frozenset(
+    pair for row in KEYBOARD_ROWS for a, b in zip(row, row[1:]) for pair in (a + b, b + a)
+)
+CHARACTER_CLASSES = (
+    (frozenset(string.ascii_lowercase), 26),
+    (frozenset(string.ascii_uppercase), 26),
+    (frozenset(string.digits), 10),
+    (frozenset(string.punctuation + " "), 33),
+)
+
+def fingerprint_key(key: bytes) -> bytes:
+    """Ключ отпечатков из ключа хранилища (base64, как у Fernet)"""
+    return hmac.new(base64.urlsafe_b64decode(key), b"lockup-audit-fingerprint", hashlib.sha256).digest()
+
+def fingerprint(audit_key: bytes, password: str) -> bytes:
+    return hmac.new(audit_key, password.encode(), hashlib.sha256).digest()[:FINGERPRINT_SIZE]
+
+def token_tag(token):
+    """Хвост шифротекста (тег аутентификации): меняется при каждой записи пароля.
+
+    Совпадает с substr(password, -TOKEN_TAG_SIZE) в SQL и для BLOB, и для токенов Fernet.
+    """
+    return token[-TOKEN_TAG_SIZE:]
+
+def _pool_size(password: str) -> int:
+    characters = set(password)
+    pool = sum(size for charset, size in CHARACTER_CLASSES if not characters.isdisjoint(charset))
+    if not password.isascii():
+        # Кириллица и прочие символы вне ASCII
+        pool += 66
+    return pool
+
+def _pattern_length(password: str) -> int:
+    """Длина пароля без повторов и последовательностей (abc, 321, qwe)"""
+    lowered = password.lower()
+    effective = min(len(lowered), 1)
+    for previous, current in zip(lowered, lowered[1:]):
+        if current == previous or ord(current) - ord(previous) in (1, -1) or previous + current in KEYBOARD_PAIRS:
+            continue
+        effective += 1
+    return effective
+
+def strength(password: str) -> int:
+    """Оценка стойкости от 0 (очень слабый) до 4 (стойкий) по оценке энтропии"""
+    lowered = password.lower()
+    if not password or lowered in COMMON_PASSWORDS or lowered.rstrip(string.digits + "!") in COMMON_PASSWORDS:
+        return 0
+    bits = _pattern_length(password) * math.log2(max(_pool_size(password), 2))
+    if bits < 28:
+        return 0
+    if bits < 36:
+        return 1
+    if bits < 60:
+        return 2
+    if bits < 80:
+        return 3
+    return 4
+
+def audit_chunk(key: bytes, backend: str, corpus_path, rows):
+    """Пачка (id, password, last_updated) ->
+    (id, last_updated, отпечаток, оценка, длина, в утечках, хвост шифротекста)"""
+    cipher = FieldCipher(key, backend)
+    audit_key = fingerprint_key(key)
+    corpus = open_corpus(corpus_path) if corpus_path else None
+    result = []
+    for record_id, token, last_updated in rows:
+        password = cipher.decrypt(record_id, "password", token)
+        breached = corpus is not None and password in corpus
+        result.append((record_id, last_updated, fingerprint(audit_key, password), strength(password),
+                       len(password), int(breached), token_tag(token)))
+    return result
+
+def audit_rows(rows, total, key: bytes, backend: str, progress=None, workers=None, corpus_path=None):
+    """Генератор пачек результатов audit_chunk в порядке исходных строк"""
+    return map_chunks(audit_chunk, (key, backend, corpus_path), rows, total, progress, workers)
@@ -0,0 +1,156 @@
+"""Инкрементные зашифрованные резервные копии по журналу изменений.
+
+Полная копия содержит все записи, инкрементная - только записи, измененные
+после предыдущей копии (таблица change_log, migrations.py), поэтому ее
+стоимость пропорциональна числу правок, а не размеру хранилища.
+Восстановление применяет последнюю полную копию и продолжающие ее
+инкрементные по порядку номеров журнала.
+
+Файл копии:
+
+    MAGIC | длина заголовка (4 байта, big-endian) | заголовок JSON | контейнер export_format
+
+Открытый заголовок нужен, чтобы при восстановлении вывести ключ (соль и
+параметры KDF) и выстроить цепочку копий; его копия - первая запись
+контейнера, она защищена HMAC и сверяется при чтении. Остальные записи:
+(операция, id, service, username, password, last_updated), операция
+"U" - запись добавлена или изменена, "D" - удалена.
+
+    python lockup.py backup DIR [--full]
+    python backup.py restore DIR TARGET.db [--vault ID]
+
+Копии разных хранилищ можно складывать в один каталог: в заголовке есть
+id и имя хранилища, восстановление выбирает копии одного из них.
+"""
+import glob
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+
+from encryption import SecurityError
+from export_format import ExportReader, ExportWriter
+
+MAGIC = b"LKBACKUP"
+FORMAT_VERSION = 1
+FIELDS = 6
+_HEADER_LENGTH = struct.Struct(">I")
+
+def backup_name(header: dict) -> str:
+    return f"lockup-{header['vault']}-{header['to_seq']:012d}-{header['kind']}.lkb"
+
+class BackupWriter:
+    """Пишет заголовок и записи копии поверх ExportWriter"""
+
+    def __init__(self, fileobj, crypto, header: dict):
+        header = dict(header, format=FORMAT_VERSION)
+        self._header = json.dumps(header, sort_keys=True)
+        data = self._header.encode()
+        fileobj.write(MAGIC + _HEADER_LENGTH.pack(len(data)) + data)
+        self._writer = ExportWriter(fileobj, crypto)
+        self._writer.write(("header", self._header, None, None, None, None))
+
+    @property
+    def count(self) -> int:
+        return self._writer.count - 1
+
+    def write(self, record):
+        self._writer.write(record)
+
+    def close(self):
+        self._writer.close()
+
+def read_header(fileobj) -> dict:
+    prefix = fileobj.read(len(MAGIC) + _HEADER_LENGTH.size)
+    if len(prefix) < len(MAGIC) + _HEADER_LENGTH.size or prefix[:len(MAGIC)] != MAGIC:
+        raise SecurityError("Неизвестный формат резервной копии")
+    (length,) = _HEADER_LENGTH.unpack_from(prefix, len(MAGIC))
+    data = fileobj.read(length)
+    try:
+        header = json.loads(data)
+    except ValueError:
+        raise SecurityError("Поврежденный заголовок резервной копии")
+    if header.get("format") != FORMAT_VERSION:
+        raise SecurityError(f"Неподдерживаемая версия резервной копии: {header.get('format')}")
+    header["_raw"] = data.decode()
+    return header
+
+class BackupReader:
+    """Итератор пачек (операция, id, service, username, password, last_updated).
+
+    Как и ExportReader, проверяет HMAC в конце файла: изменения нужно
+    применять в транзакции и откатывать при SecurityError.
+    """
+
+    def __init__(self, fileobj, crypto):
+        self.header = read_header(fileobj)
+        self._reader = ExportReader(fileobj, crypto, FIELDS)
+
+    def __iter__(self):
+        first = True
+        for batch in self._reader:
+            if first:
+                if not batch or batch[0][:2] != ("header", self.header["_raw"]):
+                    raise SecurityError("Заголовок резервной копии не совпадает с содержимым")
+                batch = batch[1:]
+                first = False
+            yield [(op, int(record_id), service, username, password, last_updated)
+                   for op, record_id, service, username, password, last_updated in batch]
+
+def _created(header: dict) -> datetime:
+    return datetime.strptime(header["created"], "%Y-%m-%dT%H:%M:%S%z")
+
+def backup_chain(directory: str, vault: str = None):
+    """[(путь, заголовок)]: последняя по времени создания полная копия и
+    продолжающие ее инкрементные.
+
+    vault - id или имя хранилища; в каталоге могут лежать копии нескольких
+    хранилищ, и тогда без него выбор неоднозначен (ValueError).
+    """
+    headers = []
+    for path in glob.glob(os.path.join(directory, "*.lkb")):
+        with open(path, "rb") as f:
+            headers.append((path, read_header(f)))
+    if vault is not None:
+        headers = [item for item in headers if vault in (item[1]["vault"], item[1].get("name"))]
+    fulls = [item for item in headers if item[1]["kind"] == "full"]
+    if not fulls:
+        return []
+    vaults = {header["vault"]: header.get("name", "") for _, header in fulls}
+    if len(vaults) > 1:
+        listing = ", ".join(f"{vault_id} ({name})" for vault_id, name in sorted(vaults.items()))
+        raise ValueError(f"В {directory} копии нескольких хранилищ, укажите одно через --vault: {listing}")
+    chain = [max(fulls, key=lambda item: (_created(item[1]), item[1]["to_seq"]))]
+    vault = chain[0][1]["vault"]
+    deltas = {header["from_seq"]: (path, header) for path, header in headers
+              if header["kind"] == "delta" and header["vault"] == vault}
+    while chain[-1][1]["to_seq"] in deltas:
+        chain.append(deltas[chain[-1][1]["to_seq"]])
+    return chain
+
+def main(argv=None):
+    import argparse
+    import getpass
+
+    parser = argparse.ArgumentParser(prog="lockup-backup", description="Восстановление из резервных копий")
+    commands = parser.add_subparsers(dest="command", required=True)
+    restore_parser = commands.add_parser("restore", help="полная копия и все ее инкрементные -> новая база")
+    restore_parser.add_argument("directory")
+    restore_parser.add_argument("target")
+    restore_parser.add_argument("--vault", help="id или имя хранилища, если в каталоге копии нескольких")
+    args = parser.parse_args(argv)
+
+    from database import restore_backup
+
+    password = getpass.getpass("Мастер-пароль копии: ")
+    try:
+        count, files = restore_backup(args.directory, password, args.target, vault=args.vault)
+    except (SecurityError, ValueError, OSError) as e:
+        print(f"Ошибка: {e}", file=sys.stderr)
+        return 1
+    print(json.dumps({"records": count, "files": files}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
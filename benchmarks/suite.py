@@ -0,0 +1,550 @@
+"""Набор бенчмарков базы, шифрования и интерфейса с результатами в JSON.
+
+Замеряются операции DatabaseManager на хранилищах разного размера
+(записи по одной и пачками, поиск, страницы списка с сортировкой, смена
+мастер-пароля, проверка паролей, резервные копии), шифрование полей,
+общий список нескольких хранилищ, база утечек, разблокировка и
+MainApp.load_data. Для интерфейса нужен дисплей: используется $DISPLAY,
+иначе виртуальный Xvfb (через pyvirtualdisplay или исполняемый файл Xvfb),
+а если его нет - бенчмарк помечается как пропущенный.
+
+Запуск из корня репозитория:
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --compare results.json --threshold 0.2
+
+С --compare печатается сравнение медиан с прежним результатом; код
+возврата 1, если какая-то медиана выросла больше, чем на threshold.
+"""
+import argparse
+import hashlib
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+from breach import BreachCorpus, convert
+from cipher import BACKENDS, FieldCipher
+from connection import close_all, set_database_path
+import encryption
+from database import (SORT_KEYS, DatabaseManager, restore_backup, row_sort_key, save_master_password,
+                      unlock_vault, verify_master_password)
+from encryption import CryptoManager, KeyContext
+from listview import MergedRowSource, PagedRowSource
+from vaults import Vault, VaultRegistry
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_ROUNDS = 5
+OPS_PER_ROUND = 50
+CRYPTO_OPS = 1000
+BULK_OPS = 1000
+EDITS = 100  # правок перед повторной проверкой паролей и инкрементной копией
+PAGE_ROWS = 200
+VISIBLE_ROWS = 30
+SEARCH_QUERIES = ("service-42", "user-9", "service", "nomatch")
+VAULTS = 4
+BREACH_RECORDS = 200000
+BREACH_LOOKUPS = 10000
+PASSWORD = "benchmark-password"
+IMAGES = ("logo.png", "settings_icon.png", "info_icon.png")
+
+
+def measure(func, rounds, ops=1, setup=None):
+    """Время rounds запусков func; setup выполняется перед каждым вне замера"""
+    times = []
+    for _ in range(rounds):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    median = statistics.median(times)
+    return {
+        "unit": "s",
+        "rounds": rounds,
+        "ops": ops,
+        "min": min(times),
+        "max": max(times),
+        "mean": statistics.fmean(times),
+        "median": median,
+        "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+        "per_op": median / ops,
+    }
+
+
+class KdfCounter:
+    """Подменяет функции KDF в encryption и считает вызовы"""
+
+    NAMES = ("derive", "pbkdf2_hmac")
+
+    def __init__(self):
+        self.calls = 0
+        self._originals = {name: getattr(encryption, name) for name in self.NAMES}
+
+    def __enter__(self):
+        for name, original in self._originals.items():
+            setattr(encryption, name, self._counted(original))
+        return self
+
+    def _counted(self, original):
+        def counted(*args, **kwargs):
+            self.calls += 1
+            return original(*args, **kwargs)
+        return counted
+
+    def __exit__(self, *exc):
+        for name, original in self._originals.items():
+            setattr(encryption, name, original)
+
+
+class Suite:
+    def __init__(self, workdir, sizes, rounds, only=None):
+        self.workdir = workdir
+        self.sizes = sizes
+        self.rounds = rounds
+        self.only = only
+        self.results = []
+        self.key_context = KeyContext(PASSWORD)
+
+    def wanted(self, name):
+        return not self.only or any(part in name for part in self.only)
+
+    def record(self, name, params, result):
+        entry = {"name": name, "params": params}
+        entry.update(result)
+        self.results.append(entry)
+        label = " ".join(f"{key}={value}" for key, value in params.items())
+        if "skipped" in result:
+            print(f"{name:<24} {label:<12} skipped: {result['skipped']}", file=sys.stderr)
+        else:
+            extra = f"  kdf_calls={result['kdf_calls']:g}" if "kdf_calls" in result else ""
+            print(f"{name:<24} {label:<12} median={result['median'] * 1000:9.2f} ms"
+                  f"  per_op={result['per_op'] * 1e6:9.1f} us{extra}", file=sys.stderr)
+
+    def new_vault(self, name, size=0):
+        db = DatabaseManager(self.key_context, os.path.join(self.workdir, f"{name}.db"))
+        if size:
+            db.add_many((f"service-{i}", f"user-{i}", f"password-{i}") for i in range(size))
+        return db
+
+    def bench_database(self, size):
+        db = self.new_vault(f"vault-{size}", size)
+        params = {"size": size}
+
+        if self.wanted("db.add_password"):
+            def add():
+                for i in range(OPS_PER_ROUND):
+                    db.add_password(f"new-{i}", "user", "password")
+            self.record("db.add_password", params, measure(add, self.rounds, OPS_PER_ROUND))
+
+        if self.wanted("db.get_all_passwords"):
+            self.record("db.get_all_passwords", params, measure(db.get_all_passwords, self.rounds))
+
+        record_ids = [row[0] for row in db.conn.execute("SELECT id FROM passwords")]
+        if self.wanted("db.update_password"):
+            def update():
+                for record_id in random.sample(record_ids, min(OPS_PER_ROUND, len(record_ids))):
+                    db.update_password(record_id, "updated", "user", "new-password")
+            self.record("db.update_password", params, measure(update, self.rounds, OPS_PER_ROUND))
+
+        if self.wanted("db.delete_password"):
+            doomed = []
+
+            def setup():
+                db.add_many(("doomed", "user", "password") for _ in range(OPS_PER_ROUND))
+                doomed[:] = [row[0] for row in db.conn.execute(
+                    "SELECT id FROM passwords ORDER BY id DESC LIMIT ?", (OPS_PER_ROUND,)
+                )]
+
+            def delete():
+                for record_id in doomed:
+                    db.delete_password(record_id)
+            self.record("db.delete_password", params, measure(delete, self.rounds, OPS_PER_ROUND, setup))
+
+        export_file = os.path.join(self.workdir, f"export-{size}.lockup")
+        if self.wanted("db.export_to_file") or self.wanted("db.import_from_file"):
+            count = db.count_passwords()
+            self.record("db.export_to_file", params,
+                        measure(lambda: db.export_to_file(export_file), self.rounds, count))
+            targets = []
+
+            def new_target():
+                targets.append(self.new_vault(f"import-{size}-{len(targets)}"))
+
+            self.record("db.import_from_file", params,
+                        measure(lambda: targets[-1].import_from_file(export_file), self.rounds, count, new_target))
+            assert targets[-1].count_passwords() == count
+
+    def bench_bulk(self, size):
+        db = self.new_vault(f"bulk-{size}", size)
+        params = {"size": size}
+        entries = [(f"bulk-{i}", "user", "password") for i in range(BULK_OPS)]
+        added = []
+
+        def add():
+            db.add_many(entries)
+
+        def setup():
+            added[:] = [row[0] for row in db.conn.execute(
+                "SELECT id FROM passwords ORDER BY id DESC LIMIT ?", (BULK_OPS,)
+            )]
+
+        if self.wanted("db.add_many") or self.wanted("db.delete_many"):
+            self.record("db.add_many", params, measure(add, self.rounds, BULK_OPS))
+            self.record("db.delete_many", params,
+                        measure(lambda: db.delete_many(added), self.rounds, BULK_OPS, lambda: (add(), setup())))
+
+    def bench_search(self, size):
+        if not self.wanted("db.search_passwords"):
+            return
+        db = self.new_vault(f"search-{size}", size)
+        for query in SEARCH_QUERIES:
+            self.record("db.search_passwords", {"size": size, "query": query},
+                        measure(lambda: db.search_passwords(query), self.rounds))
+
+    def bench_pages(self, size):
+        """Первая страница при каждой сортировке и страница в конце списка: по ключу и через OFFSET"""
+        if not self.wanted("db.page"):
+            return
+        db = self.new_vault(f"pages-{size}", size)
+        deep = max(size - PAGE_ROWS, 0) // PAGE_ROWS * PAGE_ROWS
+        for column in SORT_KEYS:
+            for descending in (False, True):
+                sort = (column, descending)
+                params = {"size": size, "sort": f"{column}{'-desc' if descending else ''}"}
+                self.record("db.page.first", params,
+                            measure(lambda: db.get_passwords_page(0, PAGE_ROWS, sort=sort), self.rounds))
+                if deep:
+                    previous = db.get_passwords_page(deep - PAGE_ROWS, PAGE_ROWS, sort=sort)
+                    after = row_sort_key(previous[-1], column)
+                    assert (db.get_passwords_page(0, PAGE_ROWS, sort=sort, after=after)
+                            == db.get_passwords_page(deep, PAGE_ROWS, sort=sort))
+                    self.record("db.page.keyset", params, measure(
+                        lambda: db.get_passwords_page(0, PAGE_ROWS, sort=sort, after=after), self.rounds))
+                    self.record("db.page.offset", params, measure(
+                        lambda: db.get_passwords_page(deep, PAGE_ROWS, sort=sort), self.rounds))
+
+        if self.wanted("listview.first_page"):
+            source = PagedRowSource(db)
+            self.record("listview.first_page", {"size": size},
+                        measure(lambda: (source.reset(), source.rows(0, VISIBLE_ROWS)), self.rounds))
+
+    def bench_rekey(self, size):
+        if not self.wanted("db.change_master_password"):
+            return
+        db = self.new_vault(f"rekey-{size}", size)
+        passwords = iter(f"{PASSWORD}-{i}" for i in range(self.rounds))
+        # Каждый повтор включает вывод нового ключа (KDF)
+        self.record("db.change_master_password", {"size": size},
+                    measure(lambda: db.change_master_password(next(passwords)), min(self.rounds, 3), size))
+
+    def _edit(self, db, size):
+        record_ids = random.sample(range(1, size + 1), min(EDITS, size))
+        db.update_many((record_id, None, None, "changed") for record_id in record_ids)
+
+    def bench_audit(self, size):
+        if not self.wanted("db.audit"):
+            return
+        db = self.new_vault(f"audit-{size}", size)
+        params = {"size": size}
+        clear = lambda: db.conn.execute("DELETE FROM vault_meta WHERE key = 'audit_key'")
+        self.record("db.audit_passwords.full", params,
+                    measure(db.audit_passwords, min(self.rounds, 3), size, clear))
+        self.record("db.audit_passwords.incremental", params,
+                    measure(db.audit_passwords, self.rounds, min(EDITS, size), lambda: self._edit(db, size)))
+        self.record("db.audit_report", params, measure(db.audit_report, self.rounds))
+
+    def bench_backup(self, size):
+        if not self.wanted("backup"):
+            return
+        db = self.new_vault(f"backup-{size}", size)
+        params = {"size": size}
+        directory = os.path.join(self.workdir, f"backups-{size}")
+        os.makedirs(directory)
+        self.record("backup.full", params,
+                    measure(lambda: db.write_backup(directory, full=True), self.rounds, size))
+        self.record("backup.delta", params,
+                    measure(lambda: db.write_backup(directory), self.rounds, min(EDITS, size),
+                            lambda: self._edit(db, size)))
+        targets = []
+
+        def new_target():
+            targets.append(os.path.join(self.workdir, f"restored-{size}-{len(targets)}.db"))
+
+        self.record("backup.restore", params, measure(
+            lambda: restore_backup(directory, PASSWORD, targets[-1]), min(self.rounds, 3), size, new_target
+        ))
+
+    def bench_vaults(self, size):
+        """Первая страница общего списка VAULTS хранилищ: потоки реестра и последовательно"""
+        if not self.wanted("vaults.merged_page"):
+            return
+
+        class SequentialRegistry(VaultRegistry):
+            def map(self, func, items):
+                return [func(item) for item in items]
+
+        vaults = []
+        for i in range(VAULTS):
+            vault = Vault(f"merged-{size}-{i}", os.path.join(self.workdir, f"merged-{size}-{i}.db"))
+            vault.create(PASSWORD)
+            vault.db.add_many((f"service-{j}", f"user-{j}", "password") for j in range(size))
+            vaults.append(vault)
+        for cls, mode in ((VaultRegistry, "parallel"), (SequentialRegistry, "sequential")):
+            registry = cls(vaults[0])
+            for vault in vaults[1:]:
+                registry.add(vault.path).key_context = vault.key_context
+            source = MergedRowSource(registry)
+            source.set_sort("service")
+
+            def first_page():
+                source.reset()
+                source.rows(0, VISIBLE_ROWS)
+            self.record("vaults.merged_page", {"size": size, "mode": mode}, measure(first_page, self.rounds))
+            registry.close()
+
+    def bench_breach(self):
+        if not self.wanted("breach"):
+            return
+        source = os.path.join(self.workdir, "breach.txt")
+        target = os.path.join(self.workdir, "breach.bin")
+        digests = sorted(hashlib.sha1(f"leaked-{i}".encode()).hexdigest().upper() for i in range(BREACH_RECORDS))
+        with open(source, "w") as f:
+            f.writelines(f"{digest}:1\n" for digest in digests)
+        params = {"records": BREACH_RECORDS}
+        self.record("breach.convert", params,
+                    measure(lambda: convert(source, target), min(self.rounds, 3), BREACH_RECORDS))
+        corpus = BreachCorpus(target)
+        for label, template in (("found", "leaked-{}"), ("missing", "clean-{}")):
+            passwords = [template.format(i) for i in range(BREACH_LOOKUPS)]
+            self.record("breach.lookup", dict(params, result=label),
+                        measure(lambda: [password in corpus for password in passwords], self.rounds, BREACH_LOOKUPS))
+        corpus.close()
+
+    def bench_crypto(self):
+        crypto = self.key_context
+        plaintexts = [f"password-{i}" for i in range(CRYPTO_OPS)]
+        tokens = [crypto.encrypt(value) for value in plaintexts]
+        fields = [crypto.encrypt_field(i, "password", value) for i, value in enumerate(plaintexts)]
+        cases = {
+            "crypto.encrypt": lambda: [crypto.encrypt(value) for value in plaintexts],
+            "crypto.decrypt": lambda: [crypto.decrypt(token) for token in tokens],
+            "crypto.encrypt_field": lambda: [crypto.encrypt_field(i, "password", value)
+                                             for i, value in enumerate(plaintexts)],
+            "crypto.decrypt_field": lambda: [crypto.decrypt_field(i, "password", value)
+                                             for i, value in enumerate(fields)],
+        }
+        for name, func in cases.items():
+            if self.wanted(name):
+                self.record(name, {"ops": CRYPTO_OPS}, measure(func, self.rounds, CRYPTO_OPS))
+
+        # Пакетное шифрование полей каждым доступным алгоритмом
+        items = [(i, "password", value) for i, value in enumerate(plaintexts)]
+        for backend in BACKENDS:
+            if BACKENDS[backend] is None or not self.wanted("cipher."):
+                continue
+            cipher = FieldCipher(crypto.key, backend)
+            values = cipher.encrypt_many(items)
+            encrypted = [(i, "password", value) for i, value in enumerate(values)]
+            params = {"backend": backend}
+            self.record("cipher.encrypt_many", params,
+                        measure(lambda: cipher.encrypt_many(items), self.rounds, CRYPTO_OPS))
+            self.record("cipher.decrypt_many", params,
+                        measure(lambda: cipher.decrypt_many(encrypted), self.rounds, CRYPTO_OPS))
+
+    def bench_unlock(self):
+        """Разблокировка: время и число вызовов KDF на одну разблокировку"""
+        if not self.wanted("unlock_vault"):
+            return
+        set_database_path(os.path.join(self.workdir, "unlock.db"))
+        save_master_password(PASSWORD)
+
+        def legacy():
+            # Прежний порядок: AuthWindow.authenticate, App.on_login_success,
+            # DatabaseManager.__init__ и MainApp.__init__
+            verify_master_password(PASSWORD)
+            verify_master_password(PASSWORD)
+            CryptoManager(PASSWORD)
+            CryptoManager(PASSWORD)
+
+        def session():
+            DatabaseManager(unlock_vault(PASSWORD))
+
+        # KDF занимает сотни миллисекунд, поэтому число повторов ограничено
+        rounds = min(self.rounds, 3)
+        for name, func in (("unlock_vault", session), ("unlock_vault.legacy", legacy)):
+            with KdfCounter() as counter:
+                result = measure(func, rounds)
+            result["kdf_calls"] = counter.calls / rounds
+            self.record(name, {}, result)
+
+    def bench_gui(self, size):
+        if not self.wanted("gui.load_data"):
+            return
+        with display() as available:
+            if not available:
+                self.record("gui.load_data", {"size": size}, {"skipped": "нет дисплея и Xvfb"})
+                return
+            import tkinter as tk
+            from gui import MainApp
+
+            set_database_path(os.path.join(self.workdir, f"vault-{size}.db"))
+            root = tk.Tk()
+            try:
+                for image in IMAGES:
+                    _ensure_image(image)
+                app = MainApp(root, self.key_context)
+                root.update()
+
+                def refresh():
+                    app.load_data()
+                    root.update_idletasks()
+                self.record("gui.load_data", {"size": size}, measure(refresh, self.rounds))
+            finally:
+                root.destroy()
+
+    def run(self):
+        with open(os.path.join(self.workdir, "settings.json"), "w") as f:
+            json.dump({"check_updates": False}, f)
+        self.bench_crypto()
+        self.bench_unlock()
+        self.bench_breach()
+        for size in self.sizes:
+            self.bench_database(size)
+            self.bench_bulk(size)
+            self.bench_search(size)
+            self.bench_pages(size)
+            self.bench_rekey(size)
+            self.bench_audit(size)
+            self.bench_backup(size)
+            self.bench_vaults(size)
+            self.bench_gui(size)
+        close_all()
+
+
+def _ensure_image(filename):
+    """Изображения интерфейса из репозитория или пустые заглушки"""
+    import tkinter as tk
+
+    source = os.path.join(REPO_ROOT, filename)
+    if os.path.exists(source):
+        shutil.copy(source, filename)
+    elif not os.path.exists(filename):
+        tk.PhotoImage(width=64, height=64).write(filename, format="png")
+
+
+@contextmanager
+def display():
+    """Дисплей для Tk: текущий $DISPLAY или виртуальный Xvfb"""
+    if os.environ.get("DISPLAY") or sys.platform in ("win32", "darwin"):
+        yield True
+        return
+    try:
+        from pyvirtualdisplay import Display
+    except ImportError:
+        Display = None
+    if Display is not None:
+        with Display(visible=False, size=(1024, 768)):
+            yield True
+        return
+    if not shutil.which("Xvfb"):
+        yield False
+        return
+    number = 99
+    server = subprocess.Popen(["Xvfb", f":{number}", "-screen", "0", "1024x768x24", "-nolisten", "tcp"],
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    os.environ["DISPLAY"] = f":{number}"
+    try:
+        time.sleep(0.5)
+        yield server.poll() is None
+    finally:
+        del os.environ["DISPLAY"]
+        server.terminate()
+        server.wait()
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def _key(entry):
+    return entry["name"], json.dumps(entry["params"], sort_keys=True)
+
+
+def compare(baseline, current, threshold):
+    """Сравнение медиан; возвращает список регрессий"""
+    previous = {_key(entry): entry for entry in baseline["results"] if "median" in entry}
+    regressions = []
+    for entry in current["results"]:
+        old = previous.get(_key(entry))
+        if old is None or "median" not in entry:
+            continue
+        ratio = entry["median"] / old["median"] if old["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(entry["name"])
+        label = " ".join(f"{key}={value}" for key, value in entry["params"].items())
+        print(f"{entry['name']:<24} {label:<12} {old['median'] * 1000:9.2f} -> "
+              f"{entry['median'] * 1000:9.2f} ms  x{ratio:.2f}{flag}", file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="benchmarks.suite", description="Бенчмарки LockUp")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="размеры хранилища")
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--only", nargs="+", help="запускать бенчмарки, в имени которых есть эти подстроки")
+    parser.add_argument("--output", help="файл для результатов JSON (по умолчанию stdout)")
+    parser.add_argument("--compare", help="прежний результат JSON для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.2, help="допустимый рост медианы (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            suite = Suite(tmp, args.sizes, args.rounds, args.only)
+            suite.run()
+        finally:
+            os.chdir(cwd)
+
+    data = {"meta": metadata(), "results": suite.results}
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(data, f, indent=2)
+    else:
+        print(json.dumps(data, indent=2))
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if compare(baseline, data, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
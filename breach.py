@@ -0,0 +1,170 @@
+"""Проверка паролей по локальной базе утечек без обращения к сети.
+
+База - отсортированный список SHA-1 (как в выгрузке Pwned Passwords),
+преобразованный в двоичный файл:
+
+    заголовок   MAGIC, версия, размер записи, число записей
+    индекс      65537 смещений uint64 - первая запись для каждого 16-битного префикса
+    записи      отсортированные 20-байтные SHA-1
+
+Файл отображается в память (mmap): поиск читает одну ячейку индекса и
+около log2(N / 65536) записей, поэтому занимает микросекунды, а в памяти
+остаются только прочитанные страницы.
+
+Преобразование текстовой выгрузки:
+
+    python breach.py convert pwned-passwords-sha1-ordered-by-hash.txt breach.bin
+    python breach.py check breach.bin
+"""
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+MAGIC = b"LKBREACH"
+VERSION = 1
+HEADER = struct.Struct("<8sIIQ")  # magic, версия, размер записи, число записей
+RECORD_SIZE = 20
+PREFIX_BITS = 16
+INDEX_SIZE = (1 << PREFIX_BITS) + 1
+INDEX_OFFSET = HEADER.size
+RECORDS_OFFSET = INDEX_OFFSET + INDEX_SIZE * 8
+
+class BreachCorpus:
+    """Отображенная в память база утечек; проверка - password in corpus"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            # Версия именно отображенного файла, даже если путь уже указывает на новый
+            self.stat = os.fstat(f.fileno())
+        if hasattr(self._map, "madvise"):
+            # Чтение вразброс: упреждающее чтение только раздуло бы память
+            self._map.madvise(mmap.MADV_RANDOM)
+        if len(self._map) < RECORDS_OFFSET:
+            raise ValueError(f"{path}: файл слишком мал для базы утечек")
+        magic, version, record_size, self.count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"{path}: неизвестный формат базы утечек")
+        if len(self._map) != RECORDS_OFFSET + self.count * RECORD_SIZE:
+            raise ValueError(f"{path}: файл базы утечек поврежден")
+
+    def contains_digest(self, digest: bytes) -> bool:
+        prefix = int.from_bytes(digest[:2], "big")
+        low, high = struct.unpack_from("<2Q", self._map, INDEX_OFFSET + prefix * 8)
+        records = self._map
+        while low < high:
+            middle = (low + high) // 2
+            offset = RECORDS_OFFSET + middle * RECORD_SIZE
+            record = records[offset:offset + RECORD_SIZE]
+            if record == digest:
+                return True
+            if record < digest:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(hashlib.sha1(password.encode("utf-8")).digest())
+
+    def identity(self) -> str:
+        """Метка версии файла: результаты проверок устаревают при его замене"""
+        return f"{os.path.abspath(self.path)}:{self.stat.st_size}:{self.stat.st_mtime_ns}"
+
+    def is_current(self) -> bool:
+        """Указывает ли путь все еще на отображенный файл"""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return False
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns) == (
+            self.stat.st_ino, self.stat.st_size, self.stat.st_mtime_ns)
+
+    def close(self):
+        self._map.close()
+
+_opened = {}
+
+def open_corpus(path: str) -> BreachCorpus:
+    """База утечек, открытая один раз на процесс; после замены файла открывается заново"""
+    corpus = _opened.get(path)
+    if corpus is None or not corpus.is_current():
+        # Прежнее отображение закроется, когда его перестанут использовать
+        _opened.pop(path, None)
+        corpus = _opened[path] = BreachCorpus(path)
+    return corpus
+
+def convert(source: str, target: str, progress=None) -> int:
+    """Текстовая выгрузка (строки "SHA1[:число]", по возрастанию хеша) -> двоичная база.
+
+    Возвращает число записей; повторы пропускаются.
+    """
+    counts = array("Q", bytes(8 * INDEX_SIZE))
+    count = 0
+    previous = b""
+    tmp_file = target + ".tmp"
+    with open(source, "rb") as src, open(tmp_file, "wb") as dst:
+        dst.write(bytes(RECORDS_OFFSET))
+        buffer = bytearray()
+        for line_number, line in enumerate(src, 1):
+            line = line.strip()
+            if not line:
+                continue
+            digest = bytes.fromhex(line.split(b":", 1)[0].decode("ascii"))
+            if len(digest) != RECORD_SIZE:
+                raise ValueError(f"{source}:{line_number}: ожидается SHA-1 в hex")
+            if digest <= previous:
+                if digest == previous:
+                    continue
+                raise ValueError(f"{source}:{line_number}: хеши не отсортированы по возрастанию")
+            previous = digest
+            buffer += digest
+            counts[int.from_bytes(digest[:2], "big") + 1] += 1
+            count += 1
+            if len(buffer) >= 1 << 20:
+                dst.write(buffer)
+                buffer.clear()
+                if progress:
+                    progress(count)
+        dst.write(buffer)
+        # Индекс: накопленное число записей до каждого префикса
+        for prefix in range(1, INDEX_SIZE):
+            counts[prefix] += counts[prefix - 1]
+        dst.seek(0)
+        dst.write(HEADER.pack(MAGIC, VERSION, RECORD_SIZE, count))
+        if sys.byteorder != "little":
+            counts.byteswap()
+        dst.write(counts.tobytes())
+    os.replace(tmp_file, target)
+    return count
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="lockup-breach", description="Локальная база утечек паролей")
+    commands = parser.add_subparsers(dest="command", required=True)
+    convert_parser = commands.add_parser("convert", help="преобразовать текстовую выгрузку SHA-1")
+    convert_parser.add_argument("source")
+    convert_parser.add_argument("target")
+    check_parser = commands.add_parser("check", help="проверить пароль из stdin")
+    check_parser.add_argument("corpus")
+    args = parser.parse_args(argv)
+
+    if args.command == "convert":
+        count = convert(args.source, args.target,
+                        lambda done: print(f"\r{done}", end="", file=sys.stderr, flush=True))
+        print(f"\r{count} записей -> {args.target}", file=sys.stderr)
+        return 0
+
+    import getpass
+    password = getpass.getpass("Пароль: ") if sys.stdin.isatty() else sys.stdin.readline().rstrip("\n")
+    found = password in open_corpus(args.corpus)
+    print("found" if found else "not found")
+    return 1 if found else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Шифрование отдельных полей записей (AEAD) с привязкой к строке.
+
+Формат значения BLOB: id алгоритма (1 байт) | nonce (12 байт) | шифротекст с тегом.
+В качестве связанных данных используется "lockup:<столбец>:<id записи>",
+поэтому шифротекст нельзя перенести в другую строку или другой столбец.
+Строковые значения (TEXT) - прежний формат Fernet, они по-прежнему читаются.
+
+Модуль зависит только от cryptography и используется также в рабочих
+процессах перешифрования.
+"""
+import base64
+import hashlib
+import hmac
+import os
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+
+ALG_AES_GCM = 1
+ALG_CHACHA20_POLY1305 = 2
+
+BACKENDS = {
+    "fernet": None,  # прежний формат: base64-токен Fernet в TEXT
+    "aes-gcm": ALG_AES_GCM,
+    "chacha20-poly1305": ALG_CHACHA20_POLY1305,
+}
+
+DEFAULT_BACKEND = "aes-gcm"
+
+NONCE_SIZE = 12
+
+def associated_data(record_id, column: str) -> bytes:
+    return f"lockup:{column}:{record_id}".encode()
+
+class FieldCipher:
+    """Шифрование полей ключом, производным от ключа хранилища.
+
+    fernet_key - ключ CryptoManager.key; ключ AEAD получается из него через
+    HMAC, поэтому дополнительный запуск KDF не нужен.
+    """
+
+    def __init__(self, fernet_key: bytes, backend: str = DEFAULT_BACKEND):
+        if backend not in BACKENDS:
+            raise ValueError(f"Неизвестный шифр: {backend}")
+        self.backend = backend
+        self._alg = BACKENDS[backend]
+        self._fernet = Fernet(fernet_key)
+        field_key = hmac.new(base64.urlsafe_b64decode(fernet_key), b"lockup-field-key-v1", hashlib.sha256).digest()
+        self._aeads = {
+            ALG_AES_GCM: AESGCM(field_key),
+            ALG_CHACHA20_POLY1305: ChaCha20Poly1305(field_key),
+        }
+
+    def encrypt(self, record_id, column: str, plaintext: str):
+        if self._alg is None:
+            return self._fernet.encrypt(plaintext.encode()).decode()
+        nonce = os.urandom(NONCE_SIZE)
+        ciphertext = self._aeads[self._alg].encrypt(nonce, plaintext.encode(), associated_data(record_id, column))
+        return bytes([self._alg]) + nonce + ciphertext
+
+    def decrypt(self, record_id, column: str, value) -> str:
+        if isinstance(value, str):
+            return self._fernet.decrypt(value.encode()).decode()
+        value = bytes(value)
+        aead = self._aeads.get(value[0])
+        if aead is None:
+            raise ValueError(f"Неизвестный алгоритм шифрования поля: {value[0]}")
+        nonce = value[1:1 + NONCE_SIZE]
+        return aead.decrypt(nonce, value[1 + NONCE_SIZE:], associated_data(record_id, column)).decode()
+
+    def encrypt_many(self, items):
+        """Пакетное шифрование (record_id, column, plaintext)"""
+        return [self.encrypt(record_id, column, plaintext) for record_id, column, plaintext in items]
+
+    def decrypt_many(self, items):
+        """Пакетная расшифровка (record_id, column, value)"""
+        return [self.decrypt(record_id, column, value) for record_id, column, value in items]
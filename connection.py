@@ -0,0 +1,91 @@
+import os
+import sqlite3
+import threading
+
+from migrations import upgrade
+
+DEFAULT_DB_PATH = "passwords.db"
+
+# Настройки соединения: WAL и synchronous=NORMAL дают один fsync на
+# контрольную точку вместо нескольких на каждую транзакцию
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -8000",  # ~8 МБ страничного кеша
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA busy_timeout = 5000",
+)
+
+# Размер кеша подготовленных выражений sqlite3 на соединение
+STATEMENT_CACHE_SIZE = 256
+
+class ConnectionPool:
+    """Постоянные соединения SQLite, по одному на поток и файл базы.
+
+    Все функции database.py берут соединение отсюда, поэтому проверка
+    пароля и работа с записями не открывают базу заново, а повторяющиеся
+    запросы используют кеш подготовленных выражений.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all = []
+
+    def set_path(self, path: str):
+        """Смена файла базы; открытые соединения закрываются"""
+        self.close_all()
+        self.path = path
+
+    def get(self, path: str = None) -> sqlite3.Connection:
+        path = os.path.abspath(path or self.path)
+        connections = getattr(self._local, "connections", None)
+        if connections is None:
+            connections = self._local.connections = {}
+        conn = connections.get(path)
+        if conn is None:
+            conn = sqlite3.connect(path, cached_statements=STATEMENT_CACHE_SIZE, check_same_thread=False)
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            # Миграции схемы; для актуальной базы - одно чтение user_version
+            upgrade(conn)
+            connections[path] = conn
+            with self._lock:
+                self._all.append((connections, path, conn))
+        return conn
+
+    def close_thread(self):
+        """Закрывает соединения текущего потока (по завершении фоновой задачи)"""
+        connections = getattr(self._local, "connections", None)
+        if not connections:
+            return
+        with self._lock:
+            for conn in connections.values():
+                conn.close()
+            self._all = [item for item in self._all if item[0] is not connections]
+            connections.clear()
+
+    def close_all(self):
+        with self._lock:
+            for connections, path, conn in self._all:
+                conn.close()
+                connections.pop(path, None)
+            self._all.clear()
+
+_pool = ConnectionPool()
+
+def get_connection(path: str = None) -> sqlite3.Connection:
+    return _pool.get(path)
+
+def set_database_path(path: str):
+    _pool.set_path(path)
+
+def get_database_path() -> str:
+    return _pool.path
+
+def close_all():
+    _pool.close_all()
+
+def close_thread():
+    _pool.close_thread()
@@ -1,181 +1,791 @@
 import sqlite3
-from encryption import CryptoManager
+from contextlib import contextmanager
+from connection import get_connection, get_database_path
+from encryption import KeyContext, SecurityError
+from export_format import ExportReader, ExportWriter, is_container
+from kdf import decode_params, encode_params
 import hmac
 import hashlib
-from encryption import hash_password
+import json
+import os
+import string
+import time
+from encryption import hash_password, check_password_hash
 
-def check_master_password_exists() -> bool:
-    conn = sqlite3.connect('passwords.db')
+EXPORT_BATCH_SIZE = 500
+
+# Столбцы записи, которые можно хранить зашифрованными; пароль шифруется всегда
+RECORD_COLUMNS = ("service", "username", "password")
+DEFAULT_ENCRYPTED_COLUMNS = ("password",)
+
+# Сортировка списка: выражение ORDER BY, для каждого есть индекс (выражение, id)
+SORT_KEYS = {
+    "id": "id",
+    "service": "service COLLATE NOCASE",
+    "username": "username COLLATE NOCASE",
+    "last_updated": "COALESCE(last_updated, '')",
+}
+DEFAULT_SORT = ("id", False)
+# COLLATE NOCASE приводит к нижнему регистру только A-Z
+NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def row_sort_key(row, column):
+    """Ключ строки (значение, id) для продолжения выборки после нее"""
+    value = {"id": row[0], "service": row[1], "username": row[2], "last_updated": row[4] or ""}[column]
+    return value, row[0]
+
+# Функции ниже принимают path - файл хранилища; None - основная база из connection.py
+
+def check_master_password_exists(path: str = None) -> bool:
+    conn = get_connection(path)
     cursor = conn.cursor()
-    
-    # Сначала создаем таблицу, если её нет
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            password_hash TEXT NOT NULL
-        )
-    """)
-    
-    # Затем проверяем существование записи
+
+    # Схема создается миграциями при открытии соединения (migrations.py)
     cursor.execute("SELECT EXISTS(SELECT 1 FROM users WHERE id = 1)")
     exists = cursor.fetchone()[0]
-    conn.close()
     return bool(exists)
 
-def verify_master_password(input_password: str) -> bool:
-    conn = sqlite3.connect('passwords.db')
+def _load_master_record(path=None):
+    """Хеш мастер-пароля и параметры KDF; (None, None), если пароль не задан"""
+    conn = get_connection(path)
     cursor = conn.cursor()
-    cursor.execute("SELECT password_hash FROM users WHERE id = 1")
+    cursor.execute("SELECT password_hash, kdf_params FROM users WHERE id = 1")
     result = cursor.fetchone()
-    conn.close()
-    
     if not result:
+        return None, None
+    return result[0], decode_params(result[1])
+
+def verify_master_password(input_password: str, path: str = None) -> bool:
+    stored_hash, kdf_params = _load_master_record(path)
+    if not stored_hash:
         return False
-        
-    stored_hash = result[0]
-    salt = bytes.fromhex(stored_hash[:32])  # Первые 32 символа - соль в hex
-    stored_key = stored_hash[32:]
-    
-    # Генерируем хеш из введенного пароля с той же солью
-    new_key = hashlib.pbkdf2_hmac(
-        'sha512',
-        input_password.encode(),
-        salt,
-        100000,
-        dklen=64
-    ).hex()
-    
-    return hmac.compare_digest(new_key, stored_key)
+    return check_password_hash(input_password, stored_hash, kdf_params)
 
-def save_master_password(password: str):
-    conn = sqlite3.connect('passwords.db')
-    cursor = conn.cursor()
+def _load_vault_meta(key, path=None):
+    result = get_connection(path).execute("SELECT value FROM vault_meta WHERE key = ?", (key,)).fetchone()
+    return result[0] if result else None
 
-    # Создаем таблицу users, если её нет
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY,
-            password_hash TEXT NOT NULL
-        )
-    """)
+def _load_vault_salt(path=None):
+    """Соль ключа хранилища из базы; None - используется salt.key.
+
+    Для дополнительных хранилищ salt.key в текущей папке принадлежит
+    основной базе, поэтому соль прежних версий читается из salt.key рядом
+    с файлом хранилища.
+    """
+    salt = _load_vault_meta("salt", path)
+    if salt is not None:
+        return bytes(salt)
+    if path is None:
+        return None
+    with open(os.path.join(os.path.dirname(os.path.abspath(path)), "salt.key"), "rb") as f:
+        return f.read()
+
+def _load_vault_kdf(path=None):
+    """Параметры KDF ключа хранилища (заголовок хранилища в vault_meta)"""
+    return decode_params(_load_vault_meta("kdf", path))
+
+def unlock_vault(input_password: str, kdf_params: dict = None, path: str = None):
+    """Проверка мастер-пароля и вывод ключей сессии за один проход.
+
+    Если задан kdf_params и хеш мастер-пароля создан с другими параметрами,
+    хеш прозрачно пересчитывается с новыми. Возвращает KeyContext или None,
+    если пароль неверный.
+    """
+    stored_hash, hash_params = _load_master_record(path)
+    if not stored_hash:
+        return None
+    key_context = KeyContext.unlock(
+        input_password, stored_hash, _load_vault_salt(path), hash_params, _load_vault_kdf(path)
+    )
+    if key_context is not None and kdf_params and kdf_params != hash_params:
+        save_master_password(input_password, kdf_params, path)
+    return key_context
+
+def create_vault(path: str, password: str, kdf_params: dict = None):
+    """Новое хранилище в отдельном файле; соль хранится в самой базе.
+
+    Возвращает KeyContext нового хранилища.
+    """
+    salt = os.urandom(16)
+    key_context = KeyContext(password, salt, kdf_params)
+    conn = get_connection(path)
+    conn.execute(
+        "INSERT OR REPLACE INTO vault_meta (key, value) VALUES ('salt', ?), ('kdf', ?)",
+        (salt, encode_params(key_context.kdf_params))
+    )
+    save_master_password(password, kdf_params, path)
+    return key_context
+
+def restore_backup(directory: str, password: str, target: str, progress=None, vault: str = None):
+    """Новое хранилище target из резервных копий в directory (backup.py).
+
+    Применяются последняя полная копия хранилища vault (id или имя; можно не
+    указывать, если в каталоге копии одного хранилища) и продолжающие ее
+    инкрементные. Пароль - мастер-пароль хранилища на момент копий.
+    Возвращает (число записей, список примененных файлов).
+    """
+    from backup import BackupReader, backup_chain
+
+    chain = backup_chain(directory, vault)
+    if not chain:
+        raise ValueError(f"В {directory} нет полной резервной копии")
+    if os.path.exists(target):
+        raise ValueError(f"{target} уже существует")
+    header = chain[0][1]
+    salt = bytes.fromhex(header["salt"])
+    key_context = KeyContext(password, salt, header["kdf"])
+    # Пароль проверяется до создания файла: первый блок не расшифруется
+    with open(chain[0][0], "rb") as f:
+        next(iter(BackupReader(f, key_context)), None)
+
+    conn = get_connection(target)
+    conn.executemany(
+        "INSERT OR REPLACE INTO vault_meta (key, value) VALUES (?, ?)",
+        [("salt", salt), ("kdf", encode_params(header["kdf"])),
+         ("encrypted_columns", json.dumps(header["encrypted_columns"]))]
+    )
+    save_master_password(password, header["kdf"], target)
+    db = DatabaseManager(key_context, target)
+    with db.transaction():
+        for number, (path, _) in enumerate(chain, 1):
+            with open(path, "rb") as f:
+                for batch in BackupReader(f, key_context):
+                    # Измененные записи тоже удаляются: REPLACE не вызывает триггер
+                    # удаления, и в индексе поиска остались бы прежние слова
+                    db.conn.executemany("DELETE FROM passwords WHERE id = ?",
+                                        [(record[1],) for record in batch])
+                    upserts = [record for record in batch if record[0] == "U"]
+                    values = db._encode_rows([record[1] for record in upserts],
+                                             [record[2:5] for record in upserts])
+                    db.conn.executemany(
+                        "INSERT INTO passwords (id, service, username, password, last_updated) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        ((record[1],) + value + (record[5],) for record, value in zip(upserts, values))
+                    )
+            if progress:
+                progress(number, len(chain))
+    return db.count_passwords(), [os.path.basename(path) for path, _ in chain]
+
+def save_master_password(password: str, kdf_params: dict = None, path: str = None):
+    conn = get_connection(path)
+    cursor = conn.cursor()
 
     # Хешируем пароль
-    hashed = hash_password(password)
+    hashed = hash_password(password, kdf_params)
 
     # Сохраняем/обновляем мастер-пароль
     cursor.execute("""
-        INSERT OR REPLACE INTO users (id, password_hash)
-        VALUES (1, ?)
-    """, (hashed,))
+        INSERT OR REPLACE INTO users (id, password_hash, kdf_params)
+        VALUES (1, ?, ?)
+    """, (hashed, encode_params(kdf_params) if kdf_params else None))
     
     conn.commit()
-    conn.close()
 
 class DatabaseManager:
-    def __init__(self, master_password: str):
-        self.conn = sqlite3.connect('passwords.db')
-        self.crypto = CryptoManager(master_password)
-        self.create_table()
-
-    def export_to_file(self, filename: str):
-        """Экспорт с шифрованием и HMAC-проверкой"""
-        data = self.conn.execute("SELECT * FROM passwords").fetchall()
-        encrypted_data = []
-        hmac_key = self.crypto.generate_hmac_key()
+    def __init__(self, key_context: KeyContext, path: str = None):
+        # Общее соединение из пула; путь по умолчанию задается в connection.py
+        self.conn = get_connection(path)
+        self.path = path
+        self.crypto = key_context
+        self._transaction_depth = 0
+        # Таблицы уже созданы миграциями; здесь только чтение настроек схемы
+        self.has_fts = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'passwords_fts'"
+        ).fetchone() is not None
+        self.encrypted_columns = self._load_encrypted_columns()
+
+    @contextmanager
+    def transaction(self):
+        """Все изменения внутри блока фиксируются одним коммитом.
+
+        Вложенные блоки входят во внешнюю транзакцию; при исключении
+        изменения откатываются.
+        """
+        if self._transaction_depth == 0 and not self.conn.in_transaction:
+            # Блокировка записи сразу: id новых записей выделяются заранее
+            self.conn.execute("BEGIN IMMEDIATE")
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.rollback()
+            raise
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    def _commit(self):
+        # Внутри transaction() коммит откладывается до конца блока
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    def _load_encrypted_columns(self):
+        value = self.conn.execute(
+            "SELECT value FROM vault_meta WHERE key = 'encrypted_columns'"
+        ).fetchone()
+        if not value:
+            return DEFAULT_ENCRYPTED_COLUMNS
+        return tuple(json.loads(value[0]))
+
+    def _allocate_ids(self, count):
+        """id для новых записей; вызывается внутри transaction()"""
+        start = self.conn.execute("""
+            SELECT MAX(
+                COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'passwords'), 0),
+                COALESCE((SELECT MAX(id) FROM passwords), 0)
+            )
+        """).fetchone()[0] + 1
+        return range(start, start + count)
+
+    def _encode_rows(self, record_ids, entries):
+        """Шифрование (service, username, password) для записи в базу.
 
-        for row in data:
-            encrypted_row = self.crypto.encrypt(f"{row[1]},{row[2]},{row[3]},{row[4]}")
-            row_hmac = hmac.new(hmac_key, encrypted_row.encode(), hashlib.sha256).hexdigest()
-            encrypted_data.append(f"{encrypted_row}:{row_hmac}")
+        Поля шифруются одним пакетом с привязкой к id записи; None
+        и нешифруемые столбцы передаются как есть.
+        """
+        def encrypted(column, value):
+            return value is not None and column in self.encrypted_columns
 
-        with open(filename, 'w') as f:
-            f.write("\n".join(encrypted_data))
+        items = [(record_id, column, value)
+                 for record_id, entry in zip(record_ids, entries)
+                 for column, value in zip(RECORD_COLUMNS, entry)
+                 if encrypted(column, value)]
+        values = iter(self.crypto.encrypt_fields(items))
+        return [tuple(next(values) if encrypted(column, value) else value
+                      for column, value in zip(RECORD_COLUMNS, entry))
+                for entry in entries]
 
+    def _decode_rows(self, rows):
+        """Расшифровка service и username, если они хранятся в BLOB.
 
-    def import_from_file(self, filename: str):
-        """Импорт с проверкой HMAC"""
+        Пароль остается шифротекстом и расшифровывается по требованию.
+        """
+        result = []
+        for row in rows:
+            if isinstance(row[1], bytes) or isinstance(row[2], bytes):
+                service, username = (
+                    self.crypto.decrypt_field(row[0], column, value) if isinstance(value, bytes) else value
+                    for column, value in (("service", row[1]), ("username", row[2]))
+                )
+                row = (row[0], service, username) + tuple(row[3:])
+            result.append(row)
+        return result
+
+    def _decrypt_records(self, rows):
+        """(id, service, username, password, ...) -> открытые (service, username, password)"""
+        rows = self._decode_rows(rows)
+        passwords = self.crypto.decrypt_fields([(row[0], "password", row[3]) for row in rows])
+        return [(row[1], row[2], password) for row, password in zip(rows, passwords)]
+
+    def export_to_file(self, filename: str, progress=None):
+        """Потоковый экспорт: записи шифруются блоками, целостность - сквозным HMAC.
+
+        progress(done, total) вызывается после каждой пачки записей; исключение
+        из него прерывает экспорт и удаляет недописанный файл.
+        """
+        total = self.count_passwords()
+        cursor = self.conn.execute(
+            "SELECT id, service, username, password, last_updated FROM passwords ORDER BY id"
+        )
+        try:
+            with open(filename, 'wb') as f:
+                writer = ExportWriter(f, self.crypto)
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    # Поля привязаны к id строки, поэтому в файл пишутся открытые
+                    # значения; весь блок затем шифруется целиком
+                    for row, record in zip(rows, self._decrypt_records(rows)):
+                        writer.write(record + (row[4],))
+                    if progress:
+                        progress(writer.count, total)
+                writer.close()
+        except BaseException:
+            cursor.close()
+            if os.path.exists(filename):
+                os.remove(filename)
+            raise
+        return writer.count
+
+    def import_from_file(self, filename: str, progress=None):
+        """Импорт с проверкой HMAC; при ошибке ничего не сохраняется.
+
+        progress(done, total) получает число прочитанных байт файла.
+        """
+        query = "INSERT INTO passwords (id, service, username, password, last_updated) VALUES (?, ?, ?, ?, ?)"
+        count = 0
+        size = os.path.getsize(filename)
+        with open(filename, 'rb') as f, self.transaction():
+            if is_container(f):
+                reader = ExportReader(f, self.crypto)
+                # До версии 3 пароль в экспорте хранился токеном Fernet
+                tokens = reader.version < 3
+            else:
+                reader = self._read_legacy_export(f)
+                tokens = True
+            for batch in reader:
+                if tokens:
+                    batch = [(service, username, self.crypto.decrypt(password), date)
+                             for service, username, password, date in batch]
+                record_ids = self._allocate_ids(len(batch))
+                values = self._encode_rows(record_ids, [record[:3] for record in batch])
+                self.conn.executemany(
+                    query,
+                    ((record_id,) + value + (record[3],)
+                     for record_id, value, record in zip(record_ids, values, batch))
+                )
+                count += len(batch)
+                if progress:
+                    progress(f.tell(), size)
+        return count
+
+    def _read_legacy_export(self, f):
+        """Чтение прежнего построчного формата token:hmac"""
         hmac_key = self.crypto.generate_hmac_key()
-        with open(filename, 'r') as f:
-            for line in f:
-                encrypted_data, received_hmac = line.strip().split(':')
-                calculated_hmac = hmac.new(hmac_key, encrypted_data.encode(), hashlib.sha256).hexdigest()
-                
-                if not hmac.compare_digest(received_hmac, calculated_hmac):
-                    raise SecurityError("Ошибка целостности данных!")
-                
-                decrypted_data = self.crypto.decrypt(encrypted_data)
-                service, username, encrypted_pass, date = decrypted_data.split(',')
-                
-                self.conn.execute(
-                    "INSERT INTO passwords (service, username, password, last_updated) VALUES (?, ?, ?, ?)",
-                    (service, username, encrypted_pass, date)
+        batch = []
+        for raw_line in f:
+            line = raw_line.decode().strip()
+            if not line:
+                continue
+            encrypted_data, received_hmac = line.split(':')
+            calculated_hmac = hmac.new(hmac_key, encrypted_data.encode(), hashlib.sha256).hexdigest()
+
+            if not hmac.compare_digest(received_hmac, calculated_hmac):
+                raise SecurityError("Ошибка целостности данных!")
+
+            decrypted_data = self.crypto.decrypt(encrypted_data)
+            # Токен пароля и дата не содержат запятых, поэтому отделяем их справа
+            head, encrypted_pass, date = decrypted_data.rsplit(',', 2)
+            service, username = head.rsplit(',', 1)
+            batch.append((service, username, encrypted_pass, date))
+            if len(batch) >= EXPORT_BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def change_master_password(self, new_password: str, progress=None, kdf_params: dict = None):
+        """Смена мастер-пароля с перешифрованием всех записей.
+
+        Записи, хеш мастер-пароля, новая соль и параметры KDF сохраняются
+        одной транзакцией: после сбоя остается либо старое хранилище, либо
+        новое целиком. Возвращает новый KeyContext.
+        """
+        # Модуль с пулом процессов нужен только здесь
+        from rekey import reencrypt_rows
+
+        new_salt = os.urandom(16)
+        new_context = KeyContext(new_password, new_salt, kdf_params)
+        backend = self.crypto.fields.backend
+
+        # Если service и username открыты, обновляется только пароль,
+        # чтобы не трогать поисковый индекс
+        labels = any(column in self.encrypted_columns for column in ("service", "username"))
+        with self.transaction():
+            # Записи читаются под блокировкой записи (BEGIN IMMEDIATE): правка,
+            # сохраненная между чтением и блокировкой, осталась бы на старом ключе
+            rows = self.conn.execute("SELECT id, service, username, password FROM passwords ORDER BY id").fetchall()
+            total = len(rows)
+            # Следующая копия будет полной (новая соль), журнал до нее не нужен
+            self.conn.execute("DELETE FROM vault_meta WHERE key IN ('backup_log', 'backup_seq')")
+            self.conn.execute("DELETE FROM change_log")
+            for batch in reencrypt_rows(rows, total, self.crypto.key, new_context.key, backend, progress):
+                if labels:
+                    self.conn.executemany(
+                        "UPDATE passwords SET service = ?, username = ?, password = ? WHERE id = ?", batch
+                    )
+                else:
+                    self.conn.executemany(
+                        "UPDATE passwords SET password = ? WHERE id = ?",
+                        ((password, record_id) for _, _, password, record_id in batch)
+                    )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO users (id, password_hash, kdf_params) VALUES (1, ?, ?)",
+                (hash_password(new_password, kdf_params), encode_params(kdf_params) if kdf_params else None)
+            )
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO vault_meta (key, value) VALUES (?, ?)",
+                [("salt", new_salt), ("kdf", encode_params(new_context.kdf_params))]
+            )
+
+        # salt.key основной базы обновляется для совместимости; источник истины - vault_meta
+        if self.path is None:
+            tmp_file = "salt.key.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(new_salt)
+            os.replace(tmp_file, "salt.key")
+
+        self.crypto = new_context
+        return new_context
+
+    def write_backup(self, directory: str, full: bool = False, progress=None):
+        """Резервная копия в directory (backup.py): полная или изменения после прошлой.
+
+        Полная копия делается, если прошлой нет или ключи хранилища с тех
+        пор сменились (прежние копии открываются старым паролем); перед ней
+        включается журнал изменений (migrations._change_log_gate). После
+        записи файла обработанная часть журнала удаляется.
+        Возвращает путь к файлу или None, если изменений не было.
+        """
+        from backup import BackupWriter, backup_name
+
+        meta = dict(self.conn.execute(
+            "SELECT key, value FROM vault_meta WHERE key IN ('backup_vault', 'backup_seq', 'backup_salt')"
+        ))
+        vault = meta.get("backup_vault") or os.urandom(8).hex()
+        last_seq = meta.get("backup_seq")
+        if last_seq is None or meta.get("backup_salt") != self.crypto.salt:
+            full = True
+        if full:
+            # Журнал включается до снимка: правки во время копии попадут в следующую
+            with self.transaction():
+                self.conn.execute("INSERT OR REPLACE INTO vault_meta (key, value) VALUES ('backup_log', 1)")
+
+        # Журнал и записи читаются из одного снимка базы
+        tmp_file = None
+        self.conn.execute("BEGIN")
+        try:
+            to_seq = self.conn.execute(
+                "SELECT COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'change_log'), 0)"
+            ).fetchone()[0]
+            if full:
+                total = self.count_passwords()
+                cursor = self.conn.execute(
+                    "SELECT 'U', id, service, username, password, last_updated FROM passwords ORDER BY id"
                 )
+            else:
+                if to_seq == last_seq:
+                    self.conn.rollback()
+                    return None
+                total = None
+                cursor = self.conn.execute("""
+                    SELECT CASE WHEN p.id IS NULL THEN 'D' ELSE 'U' END, c.record_id,
+                           p.service, p.username, p.password, p.last_updated
+                    FROM (SELECT DISTINCT record_id FROM change_log WHERE seq > ? AND seq <= ?) c
+                    LEFT JOIN passwords p ON p.id = c.record_id
+                    ORDER BY c.record_id
+                """, (last_seq, to_seq))
+            header = {
+                "vault": vault,
+                "name": os.path.splitext(os.path.basename(self.path or get_database_path()))[0],
+                "kind": "full" if full else "delta",
+                "from_seq": 0 if full else last_seq,
+                "to_seq": to_seq,
+                "salt": self.crypto.salt.hex(),
+                "kdf": self.crypto.kdf_params,
+                "encrypted_columns": list(self.encrypted_columns),
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            }
+            path = os.path.join(directory, backup_name(header))
+            tmp_file = path + ".tmp"
+            with open(tmp_file, "wb") as f:
+                writer = BackupWriter(f, self.crypto, header)
+                while True:
+                    rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                    if not rows:
+                        break
+                    upserts = [row[1:5] for row in rows if row[0] == "U"]
+                    plaintexts = iter(self._decrypt_records(upserts))
+                    for row in rows:
+                        fields = next(plaintexts) if row[0] == "U" else (None, None, None)
+                        writer.write(row[:2] + fields + (row[5],))
+                    if progress:
+                        progress(writer.count, total)
+                writer.close()
+        except BaseException:
+            self.conn.rollback()
+            if tmp_file and os.path.exists(tmp_file):
+                os.remove(tmp_file)
+            raise
         self.conn.commit()
+        os.replace(tmp_file, path)
 
-    def create_table(self):
-        """Создание всех необходимых таблиц"""
-        # Таблица для паролей
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS passwords (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                service TEXT NOT NULL,
-                username TEXT NOT NULL,
-                password TEXT NOT NULL,
-                last_updated TEXT
+        with self.transaction():
+            self.conn.execute("DELETE FROM change_log WHERE seq <= ?", (to_seq,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO vault_meta (key, value) VALUES (?, ?)",
+                [("backup_vault", vault), ("backup_seq", to_seq), ("backup_salt", self.crypto.salt)]
             )
-        """)
+        return path
+
+    def audit_passwords(self, progress=None, corpus_path=None):
+        """Проверка паролей, изменившихся с прошлого запуска (audit.py).
+
+        Результат строки хранится в password_audit вместе с хвостом шифротекста
+        пароля (audit.token_tag); повторно обрабатываются только новые и измененные записи.
+        После смены ключей хранилища или файла базы утечек corpus_path
+        проверяются все записи. Если базу утечек открыть не удалось, проверка
+        идет без нее. Возвращает (число проверенных записей, ошибка базы утечек или None).
+        """
+        # Модуль с пулом процессов нужен только здесь
+        from audit import TOKEN_TAG_SIZE, audit_rows, fingerprint_key
+        from breach import open_corpus
 
-        # Таблица для мастер-пароля
-        self.conn.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY,
-                password_hash TEXT NOT NULL
+        check = b"check"
+        corpus_error = None
+        if corpus_path:
+            try:
+                check += open_corpus(corpus_path).identity().encode()
+            except (OSError, ValueError) as e:
+                corpus_error = str(e)
+                corpus_path = None
+        key_check = hmac.new(fingerprint_key(self.crypto.key), check, hashlib.sha256).digest()
+        stored = self.conn.execute("SELECT value FROM vault_meta WHERE key = 'audit_key'").fetchone()
+        if stored is None or stored[0] != key_check:
+            with self.transaction():
+                self.conn.execute("DELETE FROM password_audit")
+                self.conn.execute("INSERT OR REPLACE INTO vault_meta (key, value) VALUES ('audit_key', ?)",
+                                  (key_check,))
+        rows = self.conn.execute("""
+            SELECT p.id, p.password, p.last_updated FROM passwords p
+            LEFT JOIN password_audit a ON a.id = p.id
+            WHERE a.id IS NULL OR a.token_tag IS NOT substr(p.password, ?)
+            ORDER BY p.id
+        """, (-TOKEN_TAG_SIZE,)).fetchall()
+        # Расшифровка идет вне транзакции; запись, измененная за это время,
+        # сохранится с тегом прежнего шифротекста и будет проверена при следующем запуске
+        results = []
+        for batch in audit_rows(rows, len(rows), self.crypto.key, self.crypto.fields.backend, progress,
+                                corpus_path=corpus_path):
+            results.extend(batch)
+        with self.transaction():
+            self.conn.execute("DELETE FROM password_audit WHERE id NOT IN (SELECT id FROM passwords)")
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO password_audit "
+                "(id, last_updated, fingerprint, score, length, breached, token_tag) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                results
             )
-        """)
-        self.conn.commit()
+        return len(results), corpus_error
+
+    def audit_report(self):
+        """Результаты проверки: (id, service, username, last_updated, оценка, длина,
+        число записей с тем же паролем, возраст в днях, найден в утечках)"""
+        from audit import TOKEN_TAG_SIZE
+
+        # Записи, измененные после проверки, в отчет не попадают
+        cursor = self.conn.execute("""
+            SELECT p.id, p.service, p.username, p.last_updated, a.score, a.length,
+                   (SELECT COUNT(*) FROM password_audit b WHERE b.fingerprint = a.fingerprint),
+                   CAST(julianday('now') - julianday(p.last_updated) AS INTEGER), a.breached
+            FROM passwords p JOIN password_audit a ON a.id = p.id AND a.token_tag IS substr(p.password, ?)
+            ORDER BY a.score, p.id
+        """, (-TOKEN_TAG_SIZE,))
+        return self._decode_rows(cursor.fetchall())
+
+    def migrate_encryption(self, columns=DEFAULT_ENCRYPTED_COLUMNS, progress=None):
+        """Перешифрование всех записей текущим шифром полей (по умолчанию AES-GCM).
+
+        columns - какие из service, username, password хранить зашифрованными;
+        пароль шифруется всегда. Прежние токены Fernet переводятся в BLOB,
+        выполняется одной транзакцией.
+        """
+        columns = tuple(column for column in RECORD_COLUMNS if column in columns or column == "password")
+        previous = self.encrypted_columns
+        done = 0
+        try:
+            with self.transaction():
+                # Чтение под блокировкой записи: иначе запись, добавленная до
+                # блокировки, осталась бы в прежнем виде
+                rows = self.conn.execute("SELECT id, service, username, password FROM passwords ORDER BY id").fetchall()
+                total = len(rows)
+                self.encrypted_columns = columns
+                for start in range(0, len(rows), EXPORT_BATCH_SIZE):
+                    chunk = rows[start:start + EXPORT_BATCH_SIZE]
+                    record_ids = [row[0] for row in chunk]
+                    values = self._encode_rows(record_ids, self._decrypt_records(chunk))
+                    self.conn.executemany(
+                        "UPDATE passwords SET service = ?, username = ?, password = ? WHERE id = ?",
+                        (value + (record_id,) for value, record_id in zip(values, record_ids))
+                    )
+                    done += len(chunk)
+                    if progress:
+                        progress(done, total)
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO vault_meta (key, value) VALUES ('encrypted_columns', ?)",
+                    (json.dumps(list(columns)),)
+                )
+        except BaseException:
+            self.encrypted_columns = previous
+            raise
+        return done
+
+    def _search_filter(self, query):
+        """Условие WHERE для поиска; поля сравниваются без расшифровки"""
+        terms = query.split()
+        if not terms:
+            return "", ()
+        if self.has_fts:
+            # Каждое слово ищется как префикс, кавычки экранируются
+            match = " ".join('"{}"*'.format(term.replace('"', '""')) for term in terms)
+            return " WHERE id IN (SELECT rowid FROM passwords_fts WHERE passwords_fts MATCH ?)", (match,)
+        clauses = []
+        params = []
+        for term in terms:
+            pattern = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+            clauses.append("(service LIKE ? ESCAPE '\\' OR username LIKE ? ESCAPE '\\')")
+            params += [pattern, pattern]
+        return " WHERE " + " AND ".join(clauses), tuple(params)
+
+    def search_passwords(self, query, limit=200):
+        where, params = self._search_filter(query)
+        cursor = self.conn.execute(
+            "SELECT id, service, username, password, last_updated FROM passwords" + where + " ORDER BY id LIMIT ?",
+            params + (limit,)
+        )
+        return self._decode_rows(cursor.fetchall())
 
     def add_password(self, service, username, password):
-        encrypted_pass = self.crypto.encrypt(password)
-        query = """INSERT INTO passwords (service, username, password, last_updated)
-                   VALUES (?, ?, ?, datetime('now'))"""
-        cursor = self.conn.cursor()
-        cursor.execute(query, (service, username, encrypted_pass))
-        self.conn.commit()
-        return cursor.lastrowid
+        # id выделяется до вставки: он входит в связанные данные шифротекста
+        query = """INSERT INTO passwords (id, service, username, password, last_updated)
+                   VALUES (?, ?, ?, ?, datetime('now'))"""
+        with self.transaction():
+            record_id = self._allocate_ids(1)[0]
+            values = self._encode_rows([record_id], [(service, username, password)])[0]
+            self.conn.execute(query, (record_id,) + values)
+        return record_id
+
+    def add_many(self, entries):
+        """Добавление записей (service, username, password) одной транзакцией"""
+        query = """INSERT INTO passwords (id, service, username, password, last_updated)
+                   VALUES (?, ?, ?, ?, datetime('now'))"""
+        entries = list(entries)
+        with self.transaction():
+            record_ids = self._allocate_ids(len(entries))
+            values = self._encode_rows(record_ids, entries)
+            self.conn.executemany(
+                query,
+                ((record_id,) + value for record_id, value in zip(record_ids, values))
+            )
 
     def get_all_passwords(self):
-        cursor = self.conn.execute("SELECT id, service, username, password, last_updated FROM passwords")
-        return cursor.fetchall()
+        cursor = self.conn.execute("SELECT id, service, username, password, last_updated FROM passwords ORDER BY id")
+        return self._decode_rows(cursor.fetchall())
+
+    def count_passwords(self, query=None):
+        where, params = self._search_filter(query or "")
+        return self.conn.execute("SELECT COUNT(*) FROM passwords" + where, params).fetchone()[0]
+
+    def sortable_columns(self):
+        """Столбцы, по которым имеет смысл сортировать (зашифрованные - нет)"""
+        return [column for column in SORT_KEYS if column not in self.encrypted_columns]
+
+    def get_passwords_page(self, offset, limit, query=None, sort=DEFAULT_SORT, after=None):
+        """Страница записей для виртуального списка.
+
+        sort - (столбец из SORT_KEYS, по убыванию). after - ключ последней
+        строки предыдущей страницы (row_sort_key): тогда страница читается
+        по индексу с этого места (keyset), иначе используется OFFSET.
+        """
+        column, descending = sort
+        expression = SORT_KEYS[column]
+        where, params = self._search_filter(query or "")
+        direction = " DESC" if descending else ""
+        if after is not None:
+            compare = "<" if descending else ">"
+            if column == "id":
+                condition, keys = f"id {compare} ?", (after[1],)
+            else:
+                # Условие на первый столбец позволяет SQLite искать по индексу, а не сканировать его
+                condition = f"{expression} {compare}= ? AND ({expression}, id) {compare} (?, ?)"
+                keys = (after[0], after[0], after[1])
+            where += (" AND " if where else " WHERE ") + condition
+            params += keys
+            offset = 0
+        order = f"{expression}{direction}" if column == "id" else f"{expression}{direction}, id{direction}"
+        cursor = self.conn.execute(
+            "SELECT id, service, username, password, last_updated FROM passwords" + where +
+            " ORDER BY " + order + " LIMIT ? OFFSET ?",
+            params + (limit, offset)
+        )
+        return self._decode_rows(cursor.fetchall())
+
+    def get_password_position(self, record_id, sort=DEFAULT_SORT):
+        """Позиция записи в порядке сортировки (число записей перед ней)"""
+        column, descending = sort
+        compare = ">" if descending else "<"
+        if column == "id":
+            query, params = f"SELECT COUNT(*) FROM passwords WHERE id {compare} ?", (record_id,)
+        else:
+            expression = SORT_KEYS[column]
+            query = (f"SELECT COUNT(*) FROM passwords WHERE ({expression}, id) {compare} "
+                     f"(SELECT {expression}, id FROM passwords WHERE id = ?)")
+            params = (record_id,)
+        return self.conn.execute(query, params).fetchone()[0]
     
     def update_password(self, record_id, service, username, password):
         try:
-            encrypted_pass = self.crypto.encrypt(password)  # Шифрование
+            values = self._encode_rows([record_id], [(service, username, password)])[0]  # Шифрование
             query = """UPDATE passwords 
                     SET service = ?, 
                         username = ?, 
                         password = ?, 
                         last_updated = datetime('now') 
                     WHERE id = ?"""
-            cursor = self.conn.cursor()
-            cursor.execute(query, (service, username, encrypted_pass, record_id))
-            self.conn.commit()  # Фиксация изменений
+            with self.transaction():
+                self.conn.execute(query, values + (record_id,))
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка обновления: {str(e)}")
+
+    def update_many(self, updates):
+        """Обновление записей (record_id, service, username, password) одной транзакцией.
+
+        Поле со значением None остается без изменений.
+        """
+        query = """UPDATE passwords 
+                SET service = COALESCE(?, service), 
+                    username = COALESCE(?, username), 
+                    password = COALESCE(?, password), 
+                    last_updated = datetime('now') 
+                WHERE id = ?"""
+        try:
+            updates = list(updates)
+            record_ids = [update[0] for update in updates]
+            values = self._encode_rows(record_ids, [update[1:] for update in updates])
+            with self.transaction():
+                self.conn.executemany(
+                    query,
+                    (value + (record_id,) for value, record_id in zip(values, record_ids))
+                )
         except sqlite3.Error as e:
-            print(f"[DEBUG] SQL Error: {e}")
             raise Exception(f"Ошибка обновления: {str(e)}")
         
 
+    def get_passwords_by_service(self, service):
+        """Записи с точно совпадающим сервисом (без учета регистра A-Z, как COLLATE NOCASE)"""
+        if "service" not in self.encrypted_columns:
+            cursor = self.conn.execute(
+                "SELECT id, service, username, password, last_updated FROM passwords "
+                "WHERE service = ? COLLATE NOCASE ORDER BY id", (service,)
+            )
+            return self._decode_rows(cursor.fetchall())
+        # Зашифрованные названия сравниваются после расшифровки
+        return [row for row in self.get_all_passwords() if row[1].translate(NOCASE) == service.translate(NOCASE)]
+
     def get_password_by_id(self, record_id):
         cursor = self.conn.execute(
             "SELECT id, service, username, password, last_updated FROM passwords WHERE id = ?", 
             (record_id,)
         )
-        return cursor.fetchone()
+        row = cursor.fetchone()
+        return self._decode_rows([row])[0] if row else None
         
         
     def delete_password(self, record_id):
         try:
             self.conn.execute("DELETE FROM passwords WHERE id = ?", (record_id,))
-            self.conn.commit()  
+            self._commit()
+        except sqlite3.Error as e:
+            raise Exception(f"Ошибка базы данных: {str(e)}")
+
+    def delete_many(self, record_ids):
+        """Удаление записей по списку id одной транзакцией; возвращает id удаленных записей"""
+        try:
+            with self.transaction():
+                return [record_id for record_id in record_ids
+                        if self.conn.execute("DELETE FROM passwords WHERE id = ?", (record_id,)).rowcount]
         except sqlite3.Error as e:
             raise Exception(f"Ошибка базы данных: {str(e)}")
-        
\ No newline at end of file
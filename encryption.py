@@ -1,27 +1,51 @@
 from hashlib import pbkdf2_hmac
-from cryptography.fernet import Fernet
 import base64
 import hashlib
+import hmac
 import os
+from kdf import LEGACY_PARAMS, derive, is_legacy
 
-def hash_password(password: str) -> str:
-    # Используем PBKDF2 вместо SHA-256
+# cryptography импортируется при создании первого CryptoManager, а не при
+# запуске: окну ввода мастер-пароля этот пакет не нужен
+
+def _decrypt_errors():
+    from cryptography.exceptions import InvalidTag
+    from cryptography.fernet import InvalidToken
+    return InvalidToken, InvalidTag, ValueError
+
+def hash_password(password: str, kdf_params: dict = None) -> str:
+    # Параметры KDF хранятся отдельно (users.kdf_params), по умолчанию - PBKDF2
     salt = os.urandom(16)
-    key = pbkdf2_hmac(
-        'sha512',
-        password.encode(),
-        salt,
-        100000,
-        dklen=64
-    )
+    key = derive(password, salt, kdf_params or LEGACY_PARAMS, 64)
     return salt.hex() + key.hex()
 
+def check_password_hash(password: str, stored_hash: str, kdf_params: dict = None) -> bool:
+    """Проверка пароля по хешу из таблицы users"""
+    salt = bytes.fromhex(stored_hash[:32])  # Первые 32 символа - соль в hex
+    stored_key = stored_hash[32:]
+
+    # Генерируем хеш из введенного пароля с той же солью
+    new_key = derive(password, salt, kdf_params or LEGACY_PARAMS, 64).hex()
+
+    return hmac.compare_digest(new_key, stored_key)
+
+class SecurityError(Exception):
+    """Ошибка проверки целостности или подлинности данных"""
+
 class CryptoManager:
-    def __init__(self, master_password: str):
+    def __init__(self, master_password: str, salt: bytes = None, kdf_params: dict = None,
+                 field_backend: str = None):
+        from cryptography.fernet import Fernet
+        from cipher import DEFAULT_BACKEND, FieldCipher
+
         self.master_password = master_password
-        self.salt = self.load_or_create_salt()
+        self.kdf_params = kdf_params or dict(LEGACY_PARAMS)
+        # Соль из базы (после смены мастер-пароля) имеет приоритет над salt.key
+        self.salt = salt if salt is not None else self.load_or_create_salt()
         self.key = self.derive_key()
         self.cipher = Fernet(self.key)
+        self.fields = FieldCipher(self.key, field_backend or DEFAULT_BACKEND)
+        self._hmac_key = None
 
     def load_or_create_salt(self):
         """Загрузка или генерация соли"""
@@ -36,16 +60,24 @@ class CryptoManager:
             return salt
 
     def generate_hmac_key(self):
-        return pbkdf2_hmac('sha256', self.master_password.encode(), self.salt, 100000)
+        # Ключ HMAC выводится один раз и кешируется
+        if self._hmac_key is None:
+            if is_legacy(self.kdf_params):
+                # Прежний способ, нужен для чтения старых экспортов
+                self._hmac_key = pbkdf2_hmac('sha256', self.master_password.encode(), self.salt, 100000)
+            else:
+                # С новыми параметрами второй запуск KDF не нужен
+                key_bytes = base64.urlsafe_b64decode(self.key)
+                self._hmac_key = hmac.new(key_bytes, b"lockup-export-hmac", hashlib.sha256).digest()
+        return self._hmac_key
     
     def derive_key(self):
         # Генерируем ключ и кодируем в base64
-        key_bytes = pbkdf2_hmac(
-            'sha512',
-            self.master_password.encode(),
+        key_bytes = derive(
+            self.master_password,
             self.salt,
-            100000,
-            dklen=32  # Явно указываем длину 32 байта
+            self.kdf_params,
+            32  # Явно указываем длину 32 байта
         )
         return base64.urlsafe_b64encode(key_bytes)  # Кодировка для Fernet
 
@@ -53,4 +85,51 @@ class CryptoManager:
         return self.cipher.encrypt(data.encode()).decode()
 
     def decrypt(self, encrypted_data):
-        return self.cipher.decrypt(encrypted_data.encode()).decode()
\ No newline at end of file
+        return self.cipher.decrypt(encrypted_data.encode()).decode()
+
+    def encrypt_field(self, record_id, column, value):
+        """Шифрование поля записи с привязкой к id и столбцу (BLOB)"""
+        return self.fields.encrypt(record_id, column, value)
+
+    def decrypt_field(self, record_id, column, value):
+        """Расшифровка поля: BLOB в формате AEAD или прежний токен Fernet"""
+        try:
+            return self.fields.decrypt(record_id, column, value)
+        except _decrypt_errors():
+            raise SecurityError("Неверный ключ или поврежденные данные")
+
+    def encrypt_fields(self, items):
+        return self.fields.encrypt_many(items)
+
+    def decrypt_fields(self, items):
+        try:
+            return self.fields.decrypt_many(items)
+        except _decrypt_errors():
+            raise SecurityError("Неверный ключ или поврежденные данные")
+
+    def encrypt_bytes(self, data: bytes) -> bytes:
+        return self.cipher.encrypt(data)
+
+    def decrypt_bytes(self, token: bytes) -> bytes:
+        try:
+            return self.cipher.decrypt(token)
+        except _decrypt_errors()[0]:
+            raise SecurityError("Неверный ключ или поврежденные данные")
+
+class KeyContext(CryptoManager):
+    """Ключи сессии: проверка пароля и вывод ключей выполняются один раз при разблокировке.
+
+    Один экземпляр передается в DatabaseManager, MainApp, EntryWindow и EditWindow
+    вместо отдельных CryptoManager в каждом из них.
+    """
+
+    @classmethod
+    def unlock(cls, master_password: str, stored_hash: str, salt: bytes = None,
+               hash_params: dict = None, vault_params: dict = None):
+        """Возвращает контекст, если пароль верный, иначе None.
+
+        hash_params - параметры KDF хеша мастер-пароля, vault_params - ключа хранилища.
+        """
+        if not stored_hash or not check_password_hash(master_password, stored_hash, hash_params):
+            return None
+        return cls(master_password, salt, vault_params)
@@ -0,0 +1,158 @@
+"""Потоковый формат экспорта хранилища (версия 3).
+
+Файл состоит из заголовка и кадров:
+
+    MAGIC (6 байт) | версия (1 байт)
+    тип (1 байт) | длина (4 байта, big-endian) | данные
+    ...
+    тип END | длина | HMAC-SHA256 всего, что записано до этого кадра
+
+Кадр CHUNK содержит Fernet-токен с пачкой записей примерно по CHUNK_SIZE
+байт открытого текста. Каждая запись - четыре поля с префиксом длины,
+поэтому запятые и переводы строк в значениях не ломают формат. Сквозной
+HMAC защищает от перестановки, удаления и обрезки кадров.
+
+В версии 3 пароль внутри блока хранится открытым текстом (блок зашифрован
+целиком), в версии 2 - отдельным токеном Fernet. Версия 2 по-прежнему читается.
+"""
+import hashlib
+import hmac
+import struct
+
+from encryption import SecurityError
+
+MAGIC = b"LOCKUP"
+FORMAT_VERSION = 3
+SUPPORTED_VERSIONS = (2, 3)
+CHUNK_SIZE = 64 * 1024
+
+FRAME_CHUNK = 1
+FRAME_END = 2
+
+_FRAME_HEADER = struct.Struct(">BI")
+_FIELD_LENGTH = struct.Struct(">I")
+_NULL_FIELD = 0xFFFFFFFF
+
+def is_container(fileobj) -> bool:
+    """Проверяет сигнатуру и возвращает позицию чтения в начало"""
+    position = fileobj.tell()
+    signature = fileobj.read(len(MAGIC))
+    fileobj.seek(position)
+    return signature == MAGIC
+
+def _encode_record(record) -> bytes:
+    parts = []
+    for field in record:
+        if field is None:
+            parts.append(_FIELD_LENGTH.pack(_NULL_FIELD))
+        else:
+            data = str(field).encode()
+            parts.append(_FIELD_LENGTH.pack(len(data)))
+            parts.append(data)
+    return b"".join(parts)
+
+def _decode_records(data: bytes, fields: int = 4):
+    records = []
+    offset = 0
+    while offset < len(data):
+        record = []
+        for _ in range(fields):
+            (length,) = _FIELD_LENGTH.unpack_from(data, offset)
+            offset += _FIELD_LENGTH.size
+            if length == _NULL_FIELD:
+                record.append(None)
+            else:
+                record.append(data[offset:offset + length].decode())
+                offset += length
+        records.append(tuple(record))
+    return records
+
+class ExportWriter:
+    """Пишет записи (service, username, password, last_updated) кадрами"""
+
+    def __init__(self, fileobj, crypto, chunk_size: int = CHUNK_SIZE):
+        self.fileobj = fileobj
+        self.crypto = crypto
+        self.chunk_size = chunk_size
+        self.count = 0
+        self._buffer = []
+        self._buffered = 0
+        self._mac = hmac.new(crypto.generate_hmac_key(), digestmod=hashlib.sha256)
+        self._write(MAGIC + bytes([FORMAT_VERSION]))
+
+    def _write(self, data: bytes):
+        self._mac.update(data)
+        self.fileobj.write(data)
+
+    def _flush(self):
+        if not self._buffer:
+            return
+        token = self.crypto.encrypt_bytes(b"".join(self._buffer))
+        self._write(_FRAME_HEADER.pack(FRAME_CHUNK, len(token)) + token)
+        self._buffer = []
+        self._buffered = 0
+
+    def write(self, record):
+        encoded = _encode_record(record)
+        self._buffer.append(encoded)
+        self._buffered += len(encoded)
+        self.count += 1
+        if self._buffered >= self.chunk_size:
+            self._flush()
+
+    def close(self):
+        self._flush()
+        digest = self._mac.digest()
+        self.fileobj.write(_FRAME_HEADER.pack(FRAME_END, len(digest)) + digest)
+
+class ExportReader:
+    """Итератор пачек записей из файла экспорта.
+
+    Заголовок читается сразу (атрибут version), пачки выдаются по мере
+    чтения, а итоговый HMAC проверяется в конце, поэтому вызывающий код
+    должен откатить вставки при SecurityError.
+    """
+
+    def __init__(self, fileobj, crypto, fields: int = 4):
+        self.fileobj = fileobj
+        self.crypto = crypto
+        self.fields = fields
+        self._mac = hmac.new(crypto.generate_hmac_key(), digestmod=hashlib.sha256)
+        header = fileobj.read(len(MAGIC) + 1)
+        if len(header) <= len(MAGIC) or header[:len(MAGIC)] != MAGIC:
+            raise SecurityError("Неизвестный формат файла экспорта")
+        self.version = header[len(MAGIC)]
+        if self.version not in SUPPORTED_VERSIONS:
+            raise SecurityError(f"Неподдерживаемая версия экспорта: {self.version}")
+        self._mac.update(header)
+
+    def __iter__(self):
+        return _read_frames(self.fileobj, self.crypto, self._mac, self.fields)
+
+def read_export(fileobj, crypto):
+    """Генератор пачек записей (см. ExportReader)"""
+    return iter(ExportReader(fileobj, crypto))
+
+def _read_frames(fileobj, crypto, mac, fields=4):
+    while True:
+        frame_header = fileobj.read(_FRAME_HEADER.size)
+        if len(frame_header) < _FRAME_HEADER.size:
+            raise SecurityError("Файл экспорта обрезан")
+        frame_type, length = _FRAME_HEADER.unpack(frame_header)
+        payload = fileobj.read(length)
+        if len(payload) < length:
+            raise SecurityError("Файл экспорта обрезан")
+
+        if frame_type == FRAME_END:
+            if not hmac.compare_digest(payload, mac.digest()):
+                raise SecurityError("Ошибка целостности данных!")
+            return
+        if frame_type != FRAME_CHUNK:
+            raise SecurityError(f"Неизвестный тип кадра: {frame_type}")
+
+        mac.update(frame_header)
+        mac.update(payload)
+        try:
+            yield _decode_records(crypto.decrypt_bytes(payload), fields)
+        except (ValueError, struct.error) as e:
+            raise SecurityError(f"Поврежденный блок экспорта: {e}")
@@ -1,13 +1,24 @@
+import os
+import sys
 import tkinter as tk
-import requests
 from tkinter import ttk, messagebox
-from database import DatabaseManager, verify_master_password
-from encryption import CryptoManager
-import webbrowser
-from lang import LANGUAGES
-from packaging import version
-from tkinter import scrolledtext
-import traceback
+from database import DatabaseManager, unlock_vault, verify_master_password
+from lang import LANGUAGES, LabelBindings
+from listview import MergedRowSource, PagedRowSource, VirtualTreeview
+from jobs import JobRunner
+from plaintext_cache import PlaintextCache
+from settings import load_settings, save_settings
+from assets import load_image
+from refresh import RefreshScheduler
+from themes import PALETTES, use_theme
+from updater import UpdateChecker
+from vaults import VaultRegistry
+
+SEARCH_DELAY = 250  # мс, задержка поиска после ввода
+PLAINTEXT_PURGE_INTERVAL = 5000  # мс, проверка срока открытых паролей
+# Столбцы списка, сортируемые щелчком по заголовку (ключи database.SORT_KEYS)
+SORT_COLUMNS = {"Service": "service", "Username": "username", "Date": "last_updated"}
+SORT_ARROWS = ("▲", "▼")
 
 def center_window(window):
     window.update_idletasks()
@@ -17,11 +28,19 @@ def center_window(window):
     y = (window.winfo_screenheight() // 2) - (height // 2)
     window.geometry(f'+{x}+{y}')
 
+def open_url(url):
+    # webbrowser заметно замедляет запуск, а нужен только по нажатию кнопки
+    import webbrowser
+    webbrowser.open(url)
+
 class MainApp:
-    def __init__(self, root, master_password: str):
+    def __init__(self, root, key_context, settings=None):
+        self.settings = load_settings() if settings is None else settings
         self.current_language = "ru"
         self.translations = {}
         self.load_language()
+        # Подписи регистрируются при создании виджетов (lang.LabelBindings)
+        self.labels = LabelBindings()
         self.root = root
         self.root.deiconify()
         self.root.configure(background="#2d2d2d")
@@ -29,50 +48,72 @@ class MainApp:
         self.root.geometry("800x600")
         center_window(self.root)
         
-        self.db = DatabaseManager(master_password=master_password)
-        self.crypto = CryptoManager(master_password)
+        # Общий контекст ключей сессии: KDF уже выполнен при разблокировке
+        self.crypto = key_context
+        # Дополнительные хранилища открываются при первом выборе
+        self.vaults = VaultRegistry.from_settings(self.settings, key_context)
+        self.db = self.vaults.primary.db
+        self.jobs = JobRunner(self.root)
+        # Расшифрованные пароли: не больше 32 записей и не дольше минуты
+        self.plain_cache = PlaintextCache(max_entries=32, ttl=60)
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.agent = None
+        if self.settings["agent_enabled"]:
+            self.start_agent()
 
         self.current_theme = "dark"
+        self._search_job = None
         
         self.setup_styles()
         self.create_widgets()
         self.load_data()
 
+        # Перерисовка после изменений - один раз за цикл простоя Tk
+        self.refresher = RefreshScheduler(self.root)
+        self.refresher.register("language", lambda items: self.update_ui_language())
+        self.refresher.register("styles", lambda items: self._apply_styles())
+        self.refresher.register("data", lambda items: self.load_data(), covers=("rows", "view"))
+        self.refresher.register("rows", self._apply_row_changes)
+        self.refresher.register("view", lambda items: self.view.render())
+
         self.current_version = "1.0.0"
-        self.check_for_updates()
+        if self.settings["check_updates"]:
+            # Фоновая проверка: первая отрисовка не зависит от сети, ошибки не показываются
+            self.root.after_idle(self.check_for_updates, True)
 
     def update_ui_language(self):
-        columns = ["Service", "Username", "Password", "Date"]
-        for col in columns:
-            self.tree.heading(col, text=self.translations[col.lower()])
+        self.labels.apply(self.translations)
 
-        self.settings_button.config(text=self.translations["settings"])
-        self.add_btn.config(text=self.translations["add_button"])
-        self.edit_btn.config(text=self.translations["edit_button"])
-        self.delete_btn.config(text=self.translations["delete_button"])
+    def load_language(self):
+        self.translations = LANGUAGES[self.current_language]
 
-        self.root.title(self.translations["app_title"])
+    def check_for_updates(self, silent=False):
+        """Проверяет наличие обновлений через удаленный JSON-файл в фоновом потоке.
 
-        for child in self.root.winfo_children():
-            if isinstance(child, SettingsWindow):
-                child.update_labels()
+        При silent=True используется кеш version.json и ошибки не показываются.
+        """
+        checker = UpdateChecker(
+            self.root,
+            self.settings["update_url"],
+            self.current_version,
+            ttl=self.settings["update_cache_ttl"]
+        )
+        checker.start(
+            self._on_update_result,
+            None if silent else self._on_update_error,
+            use_cache=silent
+        )
 
-    def load_language(self):
-        self.translations = LANGUAGES[self.current_language]
+    def _on_update_result(self, data, has_update):
+        if has_update:
+            self.show_update_dialog(data)
 
-    def check_for_updates(self):
-        """Проверяет наличие обновлений через удаленный JSON-файл."""
-        try:
-            response = requests.get("https://raw.githubusercontent.com/GottaGrizzly/LockUp/main/version.json", timeout=5)
-            data = response.json()
-        
-        # Корректное сравнение версий
-            if version.parse(data["latest_version"]) > version.parse(self.current_version):
-                self.show_update_dialog(data)
-        except requests.exceptions.RequestException:
+    def _on_update_error(self, error):
+        from packaging.version import InvalidVersion
+        if isinstance(error, InvalidVersion):
+            messagebox.showerror("Ошибка", f"Некорректный формат версии: {str(error)}")
+        else:
             messagebox.showerror("Ошибка", self.translations["update_connection_error"])
-        except ValueError as e:
-            messagebox.showerror("Ошибка", f"Некорректный формат версии: {str(e)}")
 
     def show_update_dialog(self, update_data):
         """Показывает диалоговое окно с предложением обновиться."""
@@ -81,7 +122,9 @@ class MainApp:
             f"Версия {update_data['latest_version']}:\n{update_data['changelog']}\n\nСкачать сейчас?"
         )
         if answer:
-            webbrowser.open(update_data["download_url"])
+            from tkinter import scrolledtext
+
+            open_url(update_data["download_url"])
             dialog = tk.Toplevel()
             text_area = scrolledtext.ScrolledText(dialog, wrap=tk.WORD)
             text_area.insert(tk.INSERT, update_data["changelog"])
@@ -89,87 +132,19 @@ class MainApp:
 
     def setup_styles(self):
         self.style = ttk.Style()
-        self.style.theme_use("clam")
-        self._configure_styles()
-
-    def _configure_styles(self):
-        self.style.configure("TButton", 
-            background="#404040",
-            foreground="#ffffff",
-            width=12,
-            padding=5,
-            font=("Arial", 10)
-        )
-
-        # Стили для радиокнопок
-        self.style.configure("TRadiobutton",
-                            background="#2d2d2d",
-                            foreground="#ffffff",
-                            indicatorcolor="#ffffff")
-        self.style.map("TRadiobutton",
-                    background=[('active', '#404040')],
-                    foreground=[('active', '#ffffff')])
-        
-        # Базовые стили для всех тем
-        self.style.configure(".", 
-                            background="#2d2d2d", 
-                            foreground="#ffffff",
-                            fieldbackground="#3d3d3d",
-                            borderwidth=0)
-        
-        # Стили для кнопок
-        self.style.configure("TButton",
-                            background="#404040",
-                            foreground="#ffffff",
-                            bordercolor="#404040")
-        self.style.map("TButton",
-                    background=[('active', '#505050' if self.current_theme == "dark" else '#d0d0d0')],
-                    foreground=[('active', '#ffffff' if self.current_theme == "dark" else '#000000')])
-        
-        self.style.configure("Treeview.Heading",
-                        background="#2d2d2d",
-                        foreground="#ffffff",
-                        relief="flat")
-        self.style.map("Treeview.Heading",
-                  background=[('active', '#404040')])
-        
-        # Стили для чекбоксов
-        self.style.configure("TCheckbutton",
-                            background="#2d2d2d",
-                            foreground="#ffffff")
-        self.style.map("TCheckbutton",
-                    background=[('active', '#3d3d3d' if self.current_theme == "dark" else '#e0e0e0')],
-                    foreground=[('active', '#ffffff' if self.current_theme == "dark" else '#000000')])
-        
-        # Стиль для кнопки настроек
-        self.style.configure("Settings.TButton",
-                            borderwidth=0,
-                            relief="flat",
-                            highlightthickness=0)
-        
-        # Стили для Treeview
-        self.style.configure("Treeview",
-                            background="#2d2d2d" if self.current_theme == "dark" else "#f0f0f0",
-                            foreground="#ffffff" if self.current_theme == "dark" else "#000000",
-                            fieldbackground="#2d2d2d" if self.current_theme == "dark" else "#f0f0f0")
-        self.style.configure("Treeview.Item",
-                            background="#3d3d3d" if self.current_theme == "dark" else "#ffffff",
-                            foreground="#ffffff" if self.current_theme == "dark" else "#000000")
-        self.style.map("Treeview",
-                    background=[('selected', '#505050' if self.current_theme == "dark" else '#e0e0e0')],
-                    foreground=[('selected', '#ffffff' if self.current_theme == "dark" else '#000000')])
+        use_theme(self.style, self.current_theme)
 
     def create_widgets(self):
         # Заголовок
         self.header_frame = ttk.Frame(self.root)
         self.header_frame.pack(pady=20)
         
-        self.logo = tk.PhotoImage(file="logo.png").subsample(2,2)
+        self.logo = load_image("logo.png", 2)
         ttk.Label(self.header_frame, image=self.logo).pack(side=tk.LEFT)
         ttk.Label(self.header_frame, text="LockUp", font=("Arial", 24, "bold")).pack(side=tk.LEFT, padx=10)
 
         # Иконка настроек (исправленная версия)
-        self.settings_icon = tk.PhotoImage(file="settings_icon.png").subsample(5,5)
+        self.settings_icon = load_image("settings_icon.png", 5)
         self.settings_button = ttk.Button(
             self.header_frame,
             image=self.settings_icon,
@@ -179,7 +154,7 @@ class MainApp:
         self.settings_button.pack(side=tk.RIGHT, padx=10)
 
         # Новая иконка "Информация"
-        self.info_icon = tk.PhotoImage(file="info_icon.png").subsample(5,5)
+        self.info_icon = load_image("info_icon.png", 5)
         self.info_button = ttk.Button(
             self.header_frame,
             image=self.info_icon,
@@ -191,18 +166,62 @@ class MainApp:
         # Treeview и кнопки управления (перенесено из open_info)
         self.tree_frame = ttk.Frame(self.root)
         self.tree_frame.pack(fill=tk.BOTH, expand=True, padx=20, pady=10)
-        
-        self.tree = ttk.Treeview(self.tree_frame, columns=("Service", "Username", "Password", "Date"), show="headings")
-        columns = ["Service", "Username", "Password", "Date"]
+
+        # Строка поиска по сервису и логину
+        self.search_frame = ttk.Frame(self.tree_frame)
+        self.search_frame.pack(fill=tk.X, pady=(0, 5))
+        self.search_label = ttk.Label(self.search_frame)
+        self.search_label.pack(side=tk.LEFT, padx=(0, 5))
+        self.labels.bind(self.search_label, "search_label")
+        self.search_var = tk.StringVar()
+        self.search_entry = ttk.Entry(self.search_frame, textvariable=self.search_var)
+        self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
+        self.search_var.trace_add("write", self._on_search_changed)
+
+        # Выбор хранилища; "Все хранилища" - общий список только для просмотра
+        self.vault_button = ttk.Button(self.search_frame, command=self.open_vault, width=10)
+        self.vault_button.pack(side=tk.RIGHT, padx=(5, 0))
+        self.labels.bind(self.vault_button, "open_vault")
+        self.vault_var = tk.StringVar(value=self.vaults.active.name)
+        self.vault_box = ttk.Combobox(self.search_frame, textvariable=self.vault_var, state="readonly", width=16)
+        self.vault_box.pack(side=tk.RIGHT)
+        self.vault_box.bind("<<ComboboxSelected>>", lambda e: self.select_vault(self.vault_var.get()))
+        self.labels.bind(self.vault_box, "all_vaults", self._set_all_vaults_text)
+        self.vault_label = ttk.Label(self.search_frame)
+        self.vault_label.pack(side=tk.RIGHT, padx=(10, 5))
+        self.labels.bind(self.vault_label, "vault_label")
+        self._all_vaults_text = ""
+
+        self.tree = ttk.Treeview(self.tree_frame, columns=("Service", "Username", "Password", "Date", "Vault"),
+                                 displaycolumns=("Service", "Username", "Password", "Date"), show="headings")
+        columns = ["Service", "Username", "Password", "Date", "Vault"]
+        self.heading_texts = {}
         for col in columns:
-            self.tree.heading(col, text=self.translations[col.lower()])
             self.tree.column(col, width=150)
-
-        self.root.title(self.translations["app_title"])
+            self.labels.bind(self.tree, col.lower(), lambda text, col=col: self._set_heading(col, text))
+            if col in SORT_COLUMNS:
+                self.tree.heading(col, command=lambda col=col: self.sort_by(col))
+        self.labels.bind(self.root, "app_title", self.root.title)
 
         self._refresh_all_windows(self.style.lookup(".", "background"))
-        
+
+        self.tree_scrollbar = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL)
+        self.tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.tree.pack(fill=tk.BOTH, expand=True)
+
+        # В дереве создаются только видимые строки, данные читаются страницами
+        self.view = VirtualTreeview(self.tree, self.tree_scrollbar, self.db)
+        self.view.reveal_lookup = lambda row: self.plain_cache.get(row[0], row[3])
+        self.root.after(PLAINTEXT_PURGE_INTERVAL, self._purge_plaintexts)
+
+        # Контекстное меню записи
+        self.tree_menu = tk.Menu(self.root, tearoff=0)
+        self.tree_menu.add_command(command=self.reveal_entry)
+        self.tree_menu.add_command(command=self.copy_password)
+        self.labels.bind(self.tree_menu, "reveal_action", lambda text: self.tree_menu.entryconfigure(0, label=text))
+        self.labels.bind(self.tree_menu, "copy_action", lambda text: self.tree_menu.entryconfigure(1, label=text))
+        self.tree.bind("<Button-3>", self._show_tree_menu)
+        self.tree.bind("<Control-c>", lambda e: self.copy_password())
         
         self.controls = ttk.Frame(self.root)
         self.controls.pack(pady=10)
@@ -216,147 +235,328 @@ class MainApp:
         self.delete_btn = ttk.Button(self.controls, command=self.delete_entry)
         self.delete_btn.pack(side=tk.LEFT, padx=5)
 
-        self.settings_button.config(text=self.translations["settings"])
-        self.add_btn.config(text=self.translations["add_button"])
-        self.edit_btn.config(text=self.translations["edit_button"])
-        self.delete_btn.config(text=self.translations["delete_button"])
+        self.audit_btn = ttk.Button(self.controls, command=self.open_audit)
+        self.audit_btn.pack(side=tk.LEFT, padx=5)
+
+        self.labels.bind(self.settings_button, "settings")
+        self.labels.bind(self.add_btn, "add_button")
+        self.labels.bind(self.edit_btn, "edit_button")
+        self.labels.bind(self.delete_btn, "delete_button")
+        self.labels.bind(self.audit_btn, "audit_button")
 
         self.update_ui_language()
 
+    def _on_search_changed(self, *args):
+        # Поиск выполняется после паузы во вводе, а не на каждый символ
+        if self._search_job is not None:
+            self.root.after_cancel(self._search_job)
+        self._search_job = self.root.after(SEARCH_DELAY, self._run_search)
+
+    def _run_search(self):
+        self._search_job = None
+        self.view.set_query(self.search_var.get().strip())
+
+    def _set_heading(self, col, text):
+        self.heading_texts[col] = text
+        column, descending = self.view.source.sort
+        if SORT_COLUMNS.get(col) == column:
+            text = f"{text} {SORT_ARROWS[descending]}"
+        self.tree.heading(col, text=text)
+
+    def sort_by(self, col):
+        """Сортировка по столбцу в базе; повторный щелчок меняет направление"""
+        column = SORT_COLUMNS[col]
+        if column not in self.view.source.sortable_columns():
+            # Зашифрованные значения нельзя упорядочить запросом; в общем
+            # списке столбец должен быть открыт во всех хранилищах
+            return
+        current, descending = self.view.source.sort
+        self.view.set_sort(column, not descending if current == column else False)
+        for name, text in self.heading_texts.items():
+            self._set_heading(name, text)
+
+    def _set_all_vaults_text(self, text):
+        if self.vault_var.get() == self._all_vaults_text:
+            self.vault_var.set(text)
+        self._all_vaults_text = text
+        self.vault_box.configure(values=[text] + self.vaults.names())
+
+    @property
+    def merged(self):
+        """Показывается общий список всех хранилищ"""
+        return isinstance(self.view.source, MergedRowSource)
+
+    def _ask_vault_password(self, vault, confirm=False):
+        from tkinter import simpledialog
+
+        prompt = f"{vault.name}: {self.translations['vault_label']}"
+        password = simpledialog.askstring("LockUp", f"{prompt}\nМастер-пароль:", show="•", parent=self.root)
+        if password and confirm:
+            again = simpledialog.askstring("LockUp", f"{prompt}\nПовторите пароль:", show="•", parent=self.root)
+            if again != password:
+                messagebox.showerror("Ошибка", "Пароли не совпадают")
+                return None
+        return password or None
+
+    def _unlock_vault(self, vault):
+        """Разблокировка при первом обращении; False - пользователь отказался"""
+        if vault.unlocked:
+            return True
+        try:
+            if not vault.exists():
+                password = self._ask_vault_password(vault, confirm=True)
+                if password is None:
+                    return False
+                vault.create(password, self.settings["kdf"])
+                return True
+            password = self._ask_vault_password(vault)
+            if password is None:
+                return False
+            if not vault.unlock(password, self.settings["kdf"]):
+                messagebox.showerror("Ошибка", "Неверный мастер-пароль!")
+                return False
+        except Exception as e:
+            messagebox.showerror("Ошибка", f"Не удалось открыть хранилище: {e}")
+            return False
+        return True
+
+    def open_vault(self):
+        """Добавление файла хранилища (существующего или нового) в список"""
+        from tkinter import filedialog
+
+        path = filedialog.asksaveasfilename(
+            parent=self.root, defaultextension=".db", confirmoverwrite=False,
+            filetypes=[("LockUp", "*.db"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        vault = self.vaults.add(path)
+        if not self._unlock_vault(vault):
+            self.vaults.remove(vault.name)
+            return
+        self.settings["vaults"] = self.vaults.entries()
+        save_settings(self.settings)
+        self._set_all_vaults_text(self._all_vaults_text)
+        self.select_vault(vault.name)
+
+    def select_vault(self, name):
+        if name == self._all_vaults_text:
+            self.vault_var.set(name)
+            self.tree.configure(displaycolumns=("Service", "Username", "Password", "Date", "Vault"))
+            for button in (self.add_btn, self.edit_btn, self.delete_btn):
+                button.state(["disabled"])
+            self.plain_cache.clear()
+            self.view.set_source(MergedRowSource(self.vaults))
+            return
+        vault = self.vaults.get(name)
+        if not self._unlock_vault(vault):
+            # Остаемся в прежнем хранилище
+            self.vault_var.set(self._all_vaults_text if self.merged else self.vaults.active.name)
+            return
+        self.vault_var.set(name)
+        self.vaults.active = vault
+        self.db = vault.db
+        self.crypto = vault.key_context
+        self.tree.configure(displaycolumns=("Service", "Username", "Password", "Date"))
+        for button in (self.add_btn, self.edit_btn, self.delete_btn):
+            button.state(["!disabled"])
+        self.plain_cache.clear()
+        self.view.set_source(PagedRowSource(self.db))
+
     def open_info(self):
         InfoWindow(self.root, self.translations)
 
+    def open_audit(self):
+        """Проверка паролей текущего хранилища; повторно - только измененные записи"""
+        crypto = self.crypto
+        path = self.vaults.active.path
+        corpus_path = self.settings["breach_corpus"]
+
+        def task(job):
+            db = DatabaseManager(crypto, path)
+            _, corpus_error = db.audit_passwords(progress=job.report, corpus_path=corpus_path)
+            return db.audit_report(), corpus_error
+
+        self.run_job(self.root, self.translations["audit_title"], task,
+                     lambda result: AuditWindow(self.root, self.translations, *result))
+
     def load_data(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        records = self.db.get_all_passwords()
-        for row in records:
-            self.tree.insert("", tk.END, 
-                        values=(row[1], row[2], "•"*12, row[4]),
-                        tags=(row[0],))
-            
-            self.tree.tag_configure('item', 
-                                    foreground=self.style.lookup("Treeview", "foreground"),
-                                    background=self.style.lookup("Treeview", "background"))
+        self.tree.tag_configure('item', 
+                                foreground=self.style.lookup("Treeview", "foreground"),
+                                background=self.style.lookup("Treeview", "background"))
+        self.view.refresh()
+
+    def refresh_rows(self, kind, record_ids):
+        """Отложенное обновление записей: kind - added, updated или removed"""
+        self.refresher.mark("rows", [(kind, record_id) for record_id in record_ids])
+
+    def _apply_row_changes(self, changes):
+        ids = {"added": [], "updated": [], "removed": []}
+        for kind, record_id in changes:
+            ids[kind].append(record_id)
+        self.view.apply_changes(ids["added"], ids["updated"], ids["removed"])
 
     def open_settings(self):
         SettingsWindow(self.root, self)
 
+    def set_key_context(self, key_context):
+        """Переход на новые ключи после смены мастер-пароля"""
+        self.crypto = key_context
+        self.db.crypto = key_context
+        self.vaults.active.key_context = key_context
+        # Агент обслуживает только основное хранилище
+        if self.agent is not None and self.vaults.active is self.vaults.primary:
+            self.agent.key_context = key_context
+        self.plain_cache.clear()
+        self.view.revealed.clear()
+        self.refresher.mark("data")
+
+    def run_job(self, parent, title, task, on_done=None):
+        """Запуск долгой задачи в рабочем потоке с окном прогресса и отменой"""
+        dialog = ProgressDialog(parent, title)
+
+        def finished(result):
+            dialog.close()
+            if on_done:
+                on_done(result)
+
+        def failed(error):
+            dialog.close()
+            messagebox.showerror("Ошибка", str(error), parent=parent)
+
+        dialog.job = self.jobs.run(
+            task,
+            on_done=finished,
+            on_error=failed,
+            on_progress=dialog.update,
+            on_cancel=dialog.close
+        )
+        return dialog.job
+
     def change_theme(self, theme):
-        self.style.theme_use("clam")
-        self.root.update_idletasks()
+        # Темы скомпилированы заранее (themes.py): переключение - один theme_use
         self.current_theme = theme
-        bg_color = "#2d2d2d" if theme == "dark" else "#f0f0f0"
-        fg_color = "#ffffff" if theme == "dark" else "#000000"
-        field_bg = "#3d3d3d" if theme == "dark" else "#ffffff"
-        button_bg = "#404040" if theme == "dark" else "#e0e0e0"
-        
-        # Обновление основных стилей
-        self.style.configure(".", 
-                            background=bg_color,
-                            foreground=fg_color,
-                            fieldbackground=field_bg)
-        
-        # Специфические стили для разных виджетов
-        self.style.map("TButton",
-                  background=[('active', '#505050' if theme == "dark" else '#d0d0d0')],
-                  foreground=[('active', '#ffffff' if theme == "dark" else '#000000')])
-        self.style.map("TCheckbutton",
-                  background=[('active', '#3d3d3d' if theme == "dark" else '#e0e0e0')],
-                  foreground=[('active', '#ffffff' if theme == "dark" else '#000000')])
-        self.style.configure("Treeview.Heading",
-                            background=bg_color,
-                            foreground=fg_color)
-        self.style.map("Treeview.Heading",
-                    background=[('active', button_bg)])
-        
-        # Обновление стилей радиокнопок
-        self.style.configure("TRadiobutton",
-                            background=bg_color,
-                            foreground=fg_color)
-        self.style.map("TRadiobutton",
-                    background=[('active', button_bg)],
-                    foreground=[('active', fg_color)])
-        
-        # Принудительное обновление всех элементов
-        self.root.config(bg=bg_color)
-        self._refresh_all_windows(bg_color)
-
-        # Принудительно обновляем все Entry-поля
-        self.style.configure("Dynamic.TEntry",
-                            fieldbackground=field_bg,
-                            foreground=fg_color)
-        self.root.update()
-
-        # Обновление стилей Treeview
-        self.style.configure("Treeview",
-                            background=bg_color,
-                            foreground=fg_color,
-                            fieldbackground=bg_color)
-        self.style.configure("Treeview.Item",
-                            background=field_bg,
-                            foreground=fg_color)
-        self.style.map("Treeview",
-                    background=[('selected', '#505050' if theme == "dark" else '#d0d0d0')],
-                    foreground=[('selected', '#ffffff' if theme == "dark" else '#000000')])
-        
-        # Принудительное обновление Treeview
-        self.tree.configure(style="Treeview")
-        self.load_data()
+        use_theme(self.style, theme)
+        # Окна и Treeview перекрашиваются один раз при простое, данные не перечитываются
+        self.refresher.mark("styles")
+        self.refresher.mark("view")
+
+    def _apply_styles(self):
+        palette = PALETTES[self.current_theme]
+        self.root.config(bg=palette["background"])
+        self._refresh_all_windows(palette["background"])
+        self.tree.tag_configure('item', 
+                                foreground=palette["foreground"],
+                                background=palette["background"])
 
     def _refresh_all_windows(self, bg_color):
+        # Виджеты ttk перекрашивает сама тема; фон нужен только окнам Tk
         for child in self.root.winfo_children():
             if isinstance(child, tk.Toplevel):
                 child.configure(background=bg_color)
-                # Принудительно обновляем все дочерние виджеты
-                for widget in child.winfo_children():
-                    if isinstance(widget, ttk.Entry):
-                        widget.configure(style="TEntry")
-                    elif isinstance(widget, ttk.Checkbutton):
-                        widget.configure(style="TCheckbutton")
-        self.tree.configure(style="Treeview")
-
-    def _update_child_widgets(self, parent, bg_color):
-        for widget in parent.winfo_children():
-            if isinstance(widget, ttk.Frame):
-                widget.configure(style="TFrame")
-            elif isinstance(widget, ttk.Checkbutton):
-                widget.configure(style="TCheckbutton")
-            # Рекурсивное обновление
-            self._update_child_widgets(widget, bg_color)
-
-    def _update_widget_theme(self, widget, bg, fg):
-        try:
-            if isinstance(widget, (ttk.Entry, ttk.Combobox)):
-                widget.configure(style="TEntry")
-            elif isinstance(widget, ttk.Button):
-                widget.configure(style="TButton")
-            elif isinstance(widget, ttk.Checkbutton):
-                widget.configure(style="TCheckbutton")
-            
-            # Для стандартных tkinter виджетов
-            if isinstance(widget, tk.Entry):
-                widget.configure(bg=self.style.lookup("TEntry", "fieldbackground"),
-                                fg=self.style.lookup("TEntry", "foreground"))
-            
-            widget.update_idletasks()
-        except Exception as e:
-            pass
 
     def add_entry(self):
         EntryWindow(
             self.root,
             self.db,
             self.crypto,
-            self.load_data
+            lambda record_id: self.refresh_rows("added", [record_id]),
+            self
         )
 
+    def _show_tree_menu(self, event):
+        item = self.tree.identify_row(event.y)
+        if item and item not in self.tree.selection():
+            self.tree.selection_set(item)
+        if self.tree.selection():
+            self.tree_menu.tk_popup(event.x_root, event.y_root)
+
+    def get_plaintext(self, key):
+        """Расшифровка по требованию; повторный доступ берется из кеша.
+
+        key - id записи или ключ общего списка хранилищ (VaultRegistry.record_key).
+        """
+        if self.merged:
+            vault, record_id = self.vaults.resolve(key)
+            db, crypto = vault.db, vault.key_context
+        else:
+            db, crypto, record_id = self.db, self.crypto, key
+        record = db.get_password_by_id(record_id)
+        if not record:
+            return None
+        return self.plain_cache.get_or_decrypt(
+            key, record[3], lambda value: crypto.decrypt_field(record_id, "password", value)
+        )
+
+    def selected_keys(self):
+        """Ключи выделенных строк в том виде, в каком их хранит источник списка"""
+        return [self.tree.item(item)['tags'][0] for item in self.tree.selection()]
+
+    def reveal_entry(self):
+        keys = self.selected_keys()
+        if not keys:
+            return
+        if all(key in self.view.revealed for key in keys):
+            self.view.revealed.difference_update(keys)
+        else:
+            for key in keys:
+                if self.get_plaintext(key) is not None:
+                    self.view.revealed.add(key)
+        self.refresher.mark("view")
+
+    def copy_password(self):
+        keys = self.selected_keys()
+        if not keys:
+            return
+        plaintext = self.get_plaintext(keys[0])
+        if plaintext is not None:
+            self.root.clipboard_clear()
+            self.root.clipboard_append(plaintext)
+
+    def _purge_plaintexts(self):
+        expired = self.plain_cache.purge_expired()
+        if self.view.revealed.intersection(expired):
+            self.view.revealed.difference_update(expired)
+            self.refresher.mark("view")
+        self.root.after(PLAINTEXT_PURGE_INTERVAL, self._purge_plaintexts)
+
+    def start_agent(self):
+        """Агент разблокировки в фоне: скрипты используют ключи этой сессии"""
+        try:
+            from agent import AgentServer
+            self.agent = AgentServer(self.crypto, idle_timeout=self.settings["agent_idle_timeout"])
+        except (ImportError, AttributeError, OSError):
+            # Unix-сокеты недоступны (например, в Windows) - работаем без агента
+            self.agent = None
+            return
+        self.agent.start_background()
+
+    def close(self):
+        # Открытые пароли затираются до закрытия окна
+        self.plain_cache.clear()
+        if self.agent is not None:
+            self.agent.stop()
+        self.vaults.close()
+        self.root.destroy()
+
+    def selected_record_ids(self):
+        return [int(self.tree.item(item)['tags'][0]) for item in self.tree.selection()]
+
     def edit_entry(self):
         selected = self.tree.selection()
         if not selected:
             messagebox.showwarning("Предупреждение", "Выберите запись для редактирования")
             return
+
+        if len(selected) > 1:
+            # Групповое редактирование сервиса и логина
+            BulkEditWindow(
+                self.root,
+                self.db,
+                lambda record_ids: self.refresh_rows("updated", record_ids),
+                self.selected_record_ids()
+            )
+            return
     
         try:
             # Получаем ID из первого столбца таблицы
@@ -372,11 +572,12 @@ class MainApp:
                 self.root,
                 self.db,
                 self.crypto,
-                self.load_data,
+                lambda record_id: self.refresh_rows("updated", [record_id]),
                 record_id,
                 record[1],  # service
                 record[2],  # username
-                self.crypto.decrypt(record[3])  # password
+                self.get_plaintext(record_id),  # password
+                self
             )
         except Exception as e:
             messagebox.showerror("Ошибка", f"Ошибка при редактировании: {str(e)}")
@@ -387,13 +588,13 @@ class MainApp:
             messagebox.showwarning("Предупреждение", "Выберите запись для удаления")
             return
             
-        if messagebox.askyesno("Подтверждение", "Удалить выбранную запись?"):
+        question = "Удалить выбранную запись?" if len(selected) == 1 else f"Удалить выбранные записи ({len(selected)})?"
+        if messagebox.askyesno("Подтверждение", question):
             try:
-                # Получаем ID из тегов
-                item = self.tree.item(selected[0])
-                record_id = int(item['tags'][0])
-                self.db.delete_password(record_id)
-                self.load_data()
+                # Получаем ID из тегов и удаляем одной транзакцией
+                record_ids = self.selected_record_ids()
+                self.db.delete_many(record_ids)
+                self.refresh_rows("removed", record_ids)
             except Exception as e:
                 messagebox.showerror("Ошибка", f"Ошибка при удалении: {str(e)}")
 
@@ -411,7 +612,7 @@ class SettingsWindow:
         
         self.window.configure(background=self.main_app.style.lookup(".", "background"))
         self.window.title("Настройки")
-        self.window.geometry("300x300")
+        self.window.geometry("300x380")
         center_window(self.window)
         
         self.theme_var = tk.StringVar(value=self.main_app.current_theme)
@@ -420,45 +621,60 @@ class SettingsWindow:
         self.window.transient(parent)
         self.window.grab_set()
         parent.wait_window(self.window)
-        main_app.load_data()
 
     def create_widgets(self):
         main_frame = ttk.Frame(self.window)
         main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
+        translations = self.main_app.translations
+
+        def labelled(widget, key):
+            # Подпись задается сразу и обновляется при смене языка
+            widget.configure(text=translations[key])
+            self.main_app.labels.bind(widget, key)
+            return widget
+
+        self.main_app.labels.bind(self.window, "settings_title", self.window.title)
         
         # Выбор темы
-        ttk.Label(main_frame, text=self.main_app.translations["theme_label"]).pack(anchor=tk.W)
-        ttk.Radiobutton(
+        labelled(ttk.Label(main_frame), "theme_label").pack(anchor=tk.W)
+        labelled(ttk.Radiobutton(
             main_frame, 
-            text=self.main_app.translations["dark_theme"], 
             variable=self.theme_var, 
             value="dark",
              style="TRadiobutton",
             command=lambda: self.main_app.change_theme("dark")
-        ).pack(anchor=tk.W)
+        ), "dark_theme").pack(anchor=tk.W)
         
-        ttk.Radiobutton(
+        labelled(ttk.Radiobutton(
             main_frame, 
-            text=self.main_app.translations["light_theme"], 
             variable=self.theme_var, 
             value="light", 
             command=lambda: self.main_app.change_theme("light")
-        ).pack(anchor=tk.W)
+        ), "light_theme").pack(anchor=tk.W)
         
         # Экспорт/Импорт
         ttk.Separator(main_frame).pack(fill=tk.X, pady=10)
-        ttk.Button(main_frame, text=self.main_app.translations["export_button"], command=self.export_data, width=20).pack(pady=5, fill=tk.X)
-        ttk.Button(main_frame, text=self.main_app.translations["import_button"], command=self.import_data, width=20).pack(pady=5, fill=tk.X)
+        labelled(ttk.Button(main_frame, command=self.export_data, width=20), "export_button").pack(pady=5, fill=tk.X)
+        labelled(ttk.Button(main_frame, command=self.import_data, width=20), "import_button").pack(pady=5, fill=tk.X)
+        labelled(ttk.Button(main_frame, command=self.backup_data, width=20), "backup_button").pack(pady=5, fill=tk.X)
+        labelled(ttk.Button(main_frame, command=self.change_password, width=20), "change_password_button").pack(pady=5, fill=tk.X)
 
         ttk.Separator(main_frame).pack(fill=tk.X, pady=10)
-        ttk.Button(
+        labelled(ttk.Button(
             main_frame, 
-            text=self.main_app.translations["update_button"], 
             command=lambda: self.main_app.check_for_updates(),  # Вызов метода из MainApp
             width=20
-        ).pack(pady=5, fill=tk.X)
+        ), "update_button").pack(pady=5, fill=tk.X)
+
+        self.auto_update_var = tk.BooleanVar(value=self.main_app.settings["check_updates"])
+        labelled(ttk.Checkbutton(
+            main_frame,
+            variable=self.auto_update_var,
+            style="TCheckbutton",
+            command=self.toggle_auto_update
+        ), "auto_update_check").pack(anchor=tk.W, pady=5)
 
-        ttk.Label(main_frame, text=self.main_app.translations["language_label"]).pack(anchor=tk.W)
+        labelled(ttk.Label(main_frame), "language_label").pack(anchor=tk.W)
         
         self.lang_var = tk.StringVar(value=self.main_app.current_language)
         lang_combo = ttk.Combobox(
@@ -471,31 +687,216 @@ class SettingsWindow:
         lang_combo.pack(anchor=tk.W)
         lang_combo.bind("<<ComboboxSelected>>", self.change_language)
 
+    def toggle_auto_update(self):
+        self.main_app.settings["check_updates"] = self.auto_update_var.get()
+        save_settings(self.main_app.settings)
+
     def change_language(self, event):
         new_lang = self.lang_var.get()
         self.main_app.current_language = new_lang
         self.main_app.load_language()
-        self.main_app.update_ui_language()
-
-    def update_labels(self):
-        self.window.title(self.main_app.translations["settings_title"])
-
-        for widget in self.window.winfo_children():
-            if isinstance(widget, ttk.Label):
-                if widget.cget("text") == self.main_app.translations["theme_label"]:
-                    widget.config(text=self.main_app.translations["theme_label"])
+        self.main_app.refresher.mark("language")
 
     def export_data(self):
-        # Реализация экспорта
-        messagebox.showinfo("Экспорт", "Функция экспорта данных")
+        from tkinter import filedialog
+
+        filename = filedialog.asksaveasfilename(
+            parent=self.window,
+            defaultextension=".lockup",
+            filetypes=[("LockUp", "*.lockup"), ("*", "*.*")]
+        )
+        if not filename:
+            return
+        crypto = self.main_app.crypto
+        path = self.main_app.vaults.active.path
+
+        def task(job):
+            # Рабочий поток получает собственное соединение из пула
+            return DatabaseManager(crypto, path).export_to_file(filename, progress=job.report)
+
+        self.main_app.run_job(
+            self.window,
+            self.main_app.translations["export_button"],
+            task,
+            lambda count: messagebox.showinfo("Экспорт", f"Экспортировано записей: {count}", parent=self.window)
+        )
 
     def import_data(self):
-        # Реализация импорта
-        messagebox.showinfo("Импорт", "Функция импорта данных")
+        from tkinter import filedialog
+
+        filename = filedialog.askopenfilename(
+            parent=self.window,
+            filetypes=[("LockUp", "*.lockup"), ("*", "*.*")]
+        )
+        if not filename:
+            return
+        crypto = self.main_app.crypto
+        path = self.main_app.vaults.active.path
+
+        def task(job):
+            return DatabaseManager(crypto, path).import_from_file(filename, progress=job.report)
+
+        def done(count):
+            self.main_app.refresher.mark("data")
+            messagebox.showinfo("Импорт", f"Импортировано записей: {count}", parent=self.window)
+
+        self.main_app.run_job(self.window, self.main_app.translations["import_button"], task, done)
+
+    def backup_data(self):
+        """Инкрементная резервная копия: в файл попадают только изменения после прошлой"""
+        directory = self.main_app.settings["backup_dir"]
+        if not directory or not os.path.isdir(directory):
+            from tkinter import filedialog
+
+            directory = filedialog.askdirectory(parent=self.window, mustexist=True)
+            if not directory:
+                return
+            self.main_app.settings["backup_dir"] = directory
+            save_settings(self.main_app.settings)
+        crypto = self.main_app.crypto
+        path = self.main_app.vaults.active.path
+
+        def task(job):
+            return DatabaseManager(crypto, path).write_backup(directory, progress=job.report)
+
+        def done(filename):
+            message = f"Резервная копия: {os.path.basename(filename)}" if filename else "Изменений с прошлой копии нет"
+            messagebox.showinfo("LockUp", message, parent=self.window)
+
+        self.main_app.run_job(self.window, self.main_app.translations["backup_button"], task, done)
+
+    def change_password(self):
+        ChangePasswordWindow(self.window, self.main_app)
+
+class ChangePasswordWindow:
+    """Смена мастер-пароля; перешифрование выполняется фоновой задачей"""
+    def __init__(self, parent, main_app):
+        self.parent = parent
+        self.main_app = main_app
+
+        self.window = tk.Toplevel(parent)
+        self.window.configure(background=parent.cget("background"))
+        self.window.title(main_app.translations["change_password_button"])
+        self.window.geometry("400x220")
+        center_window(self.window)
+
+        self.current_var = tk.StringVar()
+        self.new_var = tk.StringVar()
+        self.confirm_var = tk.StringVar()
+
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
+
+        fields = (
+            ("Текущий пароль:", self.current_var),
+            ("Новый пароль:", self.new_var),
+            ("Повторите пароль:", self.confirm_var),
+        )
+        for row, (label, variable) in enumerate(fields):
+            ttk.Label(main_frame, text=label).grid(row=row, column=0, sticky=tk.W, pady=5)
+            ttk.Entry(main_frame, textvariable=variable, show="•", style="TEntry").grid(row=row, column=1, sticky=tk.EW, pady=5)
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=3, column=0, columnspan=2, pady=15)
+        ttk.Button(button_frame, text="Сохранить", command=self.save, style="TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Отмена", command=self.window.destroy, style="TButton").pack(side=tk.LEFT, padx=5)
+
+        main_frame.columnconfigure(1, weight=1)
+        self.window.transient(parent)
+        self.window.grab_set()
+
+    def save(self):
+        current = self.current_var.get()
+        new_password = self.new_var.get().strip()
+
+        if not new_password:
+            messagebox.showerror("Ошибка", "Введите пароль!", parent=self.window)
+            return
+        if new_password != self.confirm_var.get().strip():
+            messagebox.showerror("Ошибка", "Пароли не совпадают", parent=self.window)
+            return
+
+        crypto = self.main_app.crypto
+        path = self.main_app.vaults.active.path
+
+        def task(job):
+            if not verify_master_password(current, path):
+                raise ValueError("Неверный мастер-пароль!")
+            return DatabaseManager(crypto, path).change_master_password(
+                new_password,
+                progress=job.report,
+                kdf_params=self.main_app.settings["kdf"]
+            )
+
+        def done(new_context):
+            self.main_app.set_key_context(new_context)
+            self.window.destroy()
+            messagebox.showinfo("LockUp", "Мастер-пароль изменен", parent=self.parent)
+
+        self.main_app.run_job(self.window, self.main_app.translations["change_password_button"], task, done)
+
+class ProgressDialog:
+    """Окно прогресса фоновой задачи с кнопкой отмены"""
+    def __init__(self, parent, title):
+        self.job = None
+        self.window = tk.Toplevel(parent)
+        self.window.configure(background=parent.cget("background"))
+        self.window.title(title)
+        self.window.geometry("350x130")
+        center_window(self.window)
+
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
+
+        self.message_var = tk.StringVar(value=title)
+        ttk.Label(main_frame, textvariable=self.message_var).pack(anchor=tk.W)
+        self.progress = ttk.Progressbar(main_frame, mode="determinate", maximum=100)
+        self.progress.pack(fill=tk.X, pady=10)
+        self.cancel_btn = ttk.Button(main_frame, text="Отмена", command=self.cancel)
+        self.cancel_btn.pack()
+
+        self.window.protocol("WM_DELETE_WINDOW", self.cancel)
+        self.window.transient(parent)
+        self.window.grab_set()
+
+    def update(self, done, total=None, message=None):
+        if message:
+            self.message_var.set(message)
+        if total:
+            self.progress.configure(mode="determinate", value=done * 100 / total)
+        else:
+            self.progress.configure(mode="indeterminate")
+            self.progress.step()
+
+    def cancel(self):
+        if self.job is not None:
+            self.job.cancel()
+        self.cancel_btn.state(["disabled"])
+        self.message_var.set("Отмена...")
+
+    def close(self):
+        if self.window.winfo_exists():
+            self.window.destroy()
+
+def confirm_breached_password(password, parent, main_app):
+    """False, если пароль есть в локальной базе утечек и пользователь не стал его сохранять"""
+    corpus_path = main_app.settings["breach_corpus"]
+    if not corpus_path:
+        return True
+    from breach import open_corpus
+    try:
+        found = password in open_corpus(corpus_path)
+    except (OSError, ValueError):
+        # Без базы утечек запись сохраняется как обычно; причину покажет окно проверки
+        return True
+    return not found or messagebox.askyesno(
+        "Предупреждение", "Этот пароль найден в базе утечек. Все равно сохранить?", parent=parent
+    )
 
 class EntryWindow:
-    def __init__(self, parent, db, crypto, refresh_callback):
+    def __init__(self, parent, db, crypto, refresh_callback, main_app):
         self.parent = parent
+        self.main_app = main_app
         self.db = db
         self.crypto = crypto
         self.refresh = refresh_callback
@@ -577,16 +978,20 @@ class EntryWindow:
             messagebox.showerror("Ошибка", "Все поля обязательны для заполнения")
             return
         
+        if not confirm_breached_password(password, self.window, self.main_app):
+            return
+
         try:
             record_id = self.db.add_password(service, username, password)
-            self.refresh()  
+            self.refresh(record_id)
             self.window.destroy()
         except Exception as e:
             messagebox.showerror("Ошибка базы данных", str(e))
 
 class EditWindow:
-    def __init__(self, parent, db, crypto, refresh_callback, record_id, service, username, password):
+    def __init__(self, parent, db, crypto, refresh_callback, record_id, service, username, password, main_app):
         self.parent = parent
+        self.main_app = main_app
         self.db = db
         self.crypto = crypto
         self.refresh = refresh_callback
@@ -652,7 +1057,9 @@ class EditWindow:
         if not all([service, username, password]):
             messagebox.showerror("Ошибка", "Все поля обязательны для заполнения")
             return
-            
+        if not confirm_breached_password(password, self.window, self.main_app):
+            return
+
         try:
             self.db.update_password(
                 self.record_id,
@@ -660,14 +1067,70 @@ class EditWindow:
                 username,
                 password
             )
-            self.refresh()
+            self.refresh(self.record_id)
+            self.window.destroy()
+        except Exception as e:
+            messagebox.showerror("Ошибка", str(e))
+
+class BulkEditWindow:
+    """Изменение сервиса и/или логина у нескольких записей сразу.
+
+    Пустое поле оставляет значение без изменений; пароли не трогаются.
+    """
+    def __init__(self, parent, db, refresh_callback, record_ids):
+        self.parent = parent
+        self.db = db
+        self.refresh = refresh_callback
+        self.record_ids = record_ids
+
+        self.window = tk.Toplevel(parent)
+        self.window.configure(background=parent.cget("background"))
+        self.window.title(f"Редактирование записей ({len(record_ids)})")
+        self.window.geometry("400x200")
+        center_window(self.window)
+
+        self.service_var = tk.StringVar()
+        self.username_var = tk.StringVar()
+
+        self.create_widgets()
+
+    def create_widgets(self):
+        main_frame = ttk.Frame(self.window)
+        main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
+
+        ttk.Label(main_frame, text="Сервис:").grid(row=0, column=0, sticky=tk.W, pady=5)
+        ttk.Entry(main_frame, textvariable=self.service_var, style="TEntry").grid(row=0, column=1, sticky=tk.EW, pady=5)
+
+        ttk.Label(main_frame, text="Логин:").grid(row=1, column=0, sticky=tk.W, pady=5)
+        ttk.Entry(main_frame, textvariable=self.username_var, style="TEntry").grid(row=1, column=1, sticky=tk.EW, pady=5)
+
+        button_frame = ttk.Frame(main_frame)
+        button_frame.grid(row=2, column=0, columnspan=2, pady=15)
+
+        ttk.Button(button_frame, text="Сохранить", command=self.save_changes, style="TButton").pack(side=tk.LEFT, padx=5)
+        ttk.Button(button_frame, text="Отмена", command=self.window.destroy, style="TButton").pack(side=tk.LEFT, padx=5)
+
+        main_frame.columnconfigure(1, weight=1)
+
+    def save_changes(self):
+        service = self.service_var.get().strip() or None
+        username = self.username_var.get().strip() or None
+
+        if service is None and username is None:
+            messagebox.showerror("Ошибка", "Заполните хотя бы одно поле")
+            return
+
+        try:
+            self.db.update_many((record_id, service, username, None) for record_id in self.record_ids)
+            self.refresh(self.record_ids)
             self.window.destroy()
         except Exception as e:
             messagebox.showerror("Ошибка", str(e))
 
 class CreatePasswordWindow(tk.Toplevel):
-    def __init__(self, parent, on_success_callback):
+    def __init__(self, parent, on_success_callback, settings):
         super().__init__(parent)
+        self.settings = settings
         self.configure(background="#2d2d2d")
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
@@ -701,7 +1164,7 @@ class CreatePasswordWindow(tk.Toplevel):
         
         # Логотип
         try:
-            self.logo_img = tk.PhotoImage(file="logo.png").subsample(2)
+            self.logo_img = load_image("logo.png", 2)
             ttk.Label(main_frame, image=self.logo_img, background="#2d2d2d").pack(pady=10)
         except Exception as e:
             ttk.Label(main_frame, text="LOCKUP", font=("Arial", 24), background="#2d2d2d", foreground="white").pack(pady=10)
@@ -722,14 +1185,15 @@ class CreatePasswordWindow(tk.Toplevel):
         password = self.password_entry.get()
         if password:
             from database import save_master_password
-            save_master_password(password)  # Сохранение в БД
+            save_master_password(password, self.settings["kdf"])  # Сохранение в БД
             self.on_success(password)
         else:
             messagebox.showerror("Ошибка", "Введите пароль!")
 
 class AuthWindow(tk.Toplevel):
-    def __init__(self, parent, on_success):
+    def __init__(self, parent, on_success, settings):
         super().__init__(parent)
+        self.settings = settings
         self.configure(background="#2d2d2d")
         self.style = ttk.Style(self)
         self.style.theme_use("clam")
@@ -766,7 +1230,7 @@ class AuthWindow(tk.Toplevel):
 
         # Логотип
         try:
-            self.logo_img = tk.PhotoImage(file="logo.png").subsample(2)
+            self.logo_img = load_image("logo.png", 2)
             self.logo_label = tk.Label(
                 self.main_frame, 
                 image=self.logo_img, 
@@ -827,9 +1291,10 @@ class AuthWindow(tk.Toplevel):
             messagebox.showerror("Ошибка", "Введите пароль!")
             return
             
-        if verify_master_password(password):
+        key_context = unlock_vault(password, self.settings["kdf"])
+        if key_context:
             self.destroy()
-            self.on_success(password)
+            self.on_success(key_context)
         else:
             messagebox.showerror("Ошибка", "Неверный мастер-пароль!")
             self.password_var.set("")
@@ -837,12 +1302,66 @@ class AuthWindow(tk.Toplevel):
     def quit_app(self):
         self.parent.destroy()
 
+class AuditWindow(tk.Toplevel):
+    """Отчет проверки паролей: сначала самые слабые"""
+    def __init__(self, parent, translations, report, corpus_error=None):
+        # Модуль с порогами уже загружен задачей проверки
+        from audit import OLD_AFTER_DAYS, WEAK_SCORE
+
+        super().__init__(parent)
+        self.title(translations["audit_title"])
+        self.geometry("700x450")
+        center_window(self)
+        self.configure(background=parent.cget("background"))
+
+        main_frame = ttk.Frame(self)
+        main_frame.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
+
+        columns = ("service", "username", "audit_strength", "audit_reused", "audit_age", "audit_issues")
+        tree = ttk.Treeview(main_frame, columns=columns, show="headings")
+        for column in columns:
+            tree.heading(column, text=translations[column])
+            tree.column(column, width=100)
+        scrollbar = ttk.Scrollbar(main_frame, orient=tk.VERTICAL, command=tree.yview)
+        tree.configure(yscrollcommand=scrollbar.set)
+
+        weak = reused = old = breached = 0
+        for record_id, service, username, last_updated, score, length, uses, age, leaked in report:
+            issues = []
+            if leaked:
+                breached += 1
+                issues.append(translations["audit_breached"])
+            if score < WEAK_SCORE:
+                weak += 1
+                issues.append(translations["audit_weak"])
+            if uses > 1:
+                reused += 1
+                issues.append(f"{translations['audit_reused'].lower()} x{uses}")
+            if age is not None and age >= OLD_AFTER_DAYS:
+                old += 1
+                issues.append(translations["audit_old"])
+            tree.insert("", tk.END, values=(service, username, f"{score}/4", uses, age if age is not None else "",
+                                            ", ".join(issues)))
+
+        ttk.Label(
+            main_frame,
+            text=translations["audit_summary"].format(total=len(report), weak=weak, reused=reused, old=old,
+                                                      breached=breached)
+        ).pack(anchor=tk.W, pady=(0, 5))
+        if corpus_error:
+            ttk.Label(main_frame, text=translations["audit_no_corpus"].format(error=corpus_error),
+                      wraplength=640).pack(anchor=tk.W, pady=(0, 5))
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        tree.pack(fill=tk.BOTH, expand=True)
+
 class InfoWindow(tk.Toplevel):
     def __init__(self, parent, translations):
         super().__init__(parent)
         self.title(translations["info_title"])
         self.title("О программе")
-        self.geometry("400x250")
+        self.translations = translations
+        self.metrics = sys.modules.get("metrics")  # загружен, только если метрики включены
+        self.geometry("560x520" if self.metrics else "400x280")
         center_window(self)
         self.configure(background=parent.cget("background"))
         
@@ -866,7 +1385,50 @@ class InfoWindow(tk.Toplevel):
         self.github_btn = ttk.Button(
             main_frame,
             text="GitHub",
-            command=lambda: webbrowser.open("https://github.com/GottaGrizzly"),
+            command=lambda: open_url("https://github.com/GottaGrizzly"),
             style="TButton"
         )
-        self.github_btn.pack(pady=10)
\ No newline at end of file
+        self.github_btn.pack(pady=10)
+
+        self.create_metrics_pane(main_frame)
+
+    def create_metrics_pane(self, parent):
+        """Диагностика: снимок счетчиков и времени операций"""
+        frame = ttk.LabelFrame(parent, text=self.translations["metrics_title"])
+        frame.pack(fill=tk.BOTH, expand=True, pady=(10, 0))
+        if self.metrics is None or not self.metrics.registry.enabled:
+            ttk.Label(frame, text=self.translations["metrics_disabled"]).pack(padx=10, pady=10)
+            return
+
+        columns = ("count", "mean", "max", "errors")
+        self.metrics_tree = ttk.Treeview(frame, columns=columns, height=10)
+        self.metrics_tree.heading("#0", text=self.translations["metrics_operation"])
+        self.metrics_tree.column("#0", width=200)
+        for column in columns:
+            self.metrics_tree.heading(column, text=self.translations[f"metrics_{column}"])
+            self.metrics_tree.column(column, width=80, anchor=tk.E)
+        self.metrics_tree.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        buttons = ttk.Frame(frame)
+        buttons.pack(fill=tk.X, padx=5, pady=(0, 5))
+        ttk.Button(buttons, text=self.translations["metrics_refresh"], command=self.refresh_metrics).pack(side=tk.LEFT)
+        ttk.Button(buttons, text=self.translations["metrics_save"], command=self.save_metrics).pack(side=tk.RIGHT)
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+        self.metrics_tree.delete(*self.metrics_tree.get_children())
+        for name, data in self.metrics.registry.snapshot().items():
+            self.metrics_tree.insert("", "end", text=name, values=(
+                data["count"], f"{data['mean'] * 1000:.2f}", f"{data['max'] * 1000:.2f}", data["errors"]
+            ))
+
+    def save_metrics(self):
+        from tkinter import filedialog
+
+        filename = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("Prometheus", "*.prom")]
+        )
+        if filename:
+            self.metrics.registry.dump(filename)
@@ -0,0 +1,101 @@
+import queue
+import threading
+
+from connection import close_thread
+
+class JobCancelled(Exception):
+    """Задача остановлена пользователем"""
+
+class Job:
+    """Дескриптор фоновой задачи, передается в функцию задачи.
+
+    Функция периодически вызывает report(); если пользователь нажал
+    "Отмена", report() выбрасывает JobCancelled.
+    """
+
+    def __init__(self):
+        self._cancel = threading.Event()
+        self._events = queue.Queue()
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def report(self, done, total=None, message=None):
+        """Сообщение о прогрессе из рабочего потока"""
+        self.check_cancelled()
+        self._events.put(("progress", (done, total, message)))
+
+class JobRunner:
+    """Выполняет долгие задачи в рабочем потоке.
+
+    События задачи передаются через потокобезопасную очередь, которую
+    главный поток опрашивает через after(), поэтому все обратные вызовы
+    выполняются в потоке Tk.
+    """
+
+    POLL_INTERVAL = 50  # мс
+
+    def __init__(self, root):
+        self.root = root
+
+    def run(self, task, on_done=None, on_error=None, on_progress=None, on_cancel=None) -> Job:
+        job = Job()
+        callbacks = {
+            "done": on_done,
+            "error": on_error,
+            "progress": on_progress,
+            "cancelled": on_cancel,
+        }
+        threading.Thread(target=self._worker, args=(task, job), daemon=True).start()
+        self.root.after(self.POLL_INTERVAL, self._poll, job, callbacks)
+        return job
+
+    def _worker(self, task, job):
+        try:
+            result = task(job)
+        except JobCancelled:
+            job._events.put(("cancelled", None))
+        except Exception as e:
+            job._events.put(("error", e))
+        else:
+            job._events.put(("done", result))
+        finally:
+            # Поток задачи одноразовый: его соединения с базой больше не понадобятся
+            close_thread()
+
+    def _poll(self, job, callbacks):
+        progress = None
+        outcome = None
+        while outcome is None:
+            try:
+                kind, payload = job._events.get_nowait()
+            except queue.Empty:
+                break
+            if kind == "progress":
+                # Из накопившихся сообщений о прогрессе важно только последнее
+                progress = payload
+            else:
+                outcome = (kind, payload)
+
+        if progress is not None and callbacks["progress"] is not None:
+            callbacks["progress"](*progress)
+        if outcome is None:
+            self.root.after(self.POLL_INTERVAL, self._poll, job, callbacks)
+            return
+
+        kind, payload = outcome
+        callback = callbacks[kind]
+        if callback is None:
+            return
+        if kind == "cancelled":
+            callback()
+        else:
+            callback(payload)
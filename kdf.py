@@ -0,0 +1,137 @@
+"""Параметры функции выведения ключа (KDF) и их калибровка.
+
+Параметры хранятся как JSON-запись с номером версии:
+
+    {"v": 1, "alg": "pbkdf2-sha512", "iterations": 100000}
+    {"v": 1, "alg": "scrypt", "n": 32768, "r": 8, "p": 1}
+    {"v": 1, "alg": "argon2id", "time_cost": 3, "memory_cost": 65536, "parallelism": 2}
+
+Отсутствие записи означает прежние параметры (PBKDF2, 100 000 итераций).
+Argon2id требует необязательного пакета argon2-cffi.
+
+    python kdf.py calibrate --alg scrypt --target 0.5 --save
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+PARAMS_VERSION = 1
+
+LEGACY_PARAMS = {"v": PARAMS_VERSION, "alg": "pbkdf2-sha512", "iterations": 100000}
+
+ALGORITHMS = ("pbkdf2-sha512", "pbkdf2-sha256", "scrypt", "argon2id")
+
+def encode_params(params: dict) -> str:
+    return json.dumps(params, sort_keys=True, separators=(",", ":"))
+
+def decode_params(data) -> dict:
+    """Запись параметров из базы; None - прежние параметры"""
+    if not data:
+        return dict(LEGACY_PARAMS)
+    params = json.loads(data)
+    if params.get("v") != PARAMS_VERSION:
+        raise ValueError(f"Неподдерживаемая версия параметров KDF: {params.get('v')}")
+    return params
+
+def is_legacy(params: dict) -> bool:
+    return params == LEGACY_PARAMS
+
+def derive(password, salt: bytes, params: dict, length: int) -> bytes:
+    if isinstance(password, str):
+        password = password.encode()
+    alg = params["alg"]
+    if alg in ("pbkdf2-sha512", "pbkdf2-sha256"):
+        return hashlib.pbkdf2_hmac(alg.split("-")[1], password, salt, params["iterations"], dklen=length)
+    if alg == "scrypt":
+        n, r, p = params["n"], params["r"], params["p"]
+        return hashlib.scrypt(password, salt=salt, n=n, r=r, p=p, maxmem=128 * n * r * p + 1024 * 1024, dklen=length)
+    if alg == "argon2id":
+        try:
+            from argon2.low_level import Type, hash_secret_raw
+        except ImportError:
+            raise ValueError("Для Argon2id установите пакет argon2-cffi")
+        return hash_secret_raw(
+            password, salt,
+            time_cost=params["time_cost"],
+            memory_cost=params["memory_cost"],
+            parallelism=params["parallelism"],
+            hash_len=length,
+            type=Type.ID
+        )
+    raise ValueError(f"Неизвестный алгоритм KDF: {alg}")
+
+def available_algorithms():
+    result = list(ALGORITHMS[:3])
+    try:
+        import argon2  # noqa: F401
+        result.append("argon2id")
+    except ImportError:
+        pass
+    return result
+
+def _base_params(alg: str) -> dict:
+    if alg.startswith("pbkdf2"):
+        return {"v": PARAMS_VERSION, "alg": alg, "iterations": 10000}
+    if alg == "scrypt":
+        return {"v": PARAMS_VERSION, "alg": alg, "n": 1024, "r": 8, "p": 1}
+    if alg == "argon2id":
+        return {"v": PARAMS_VERSION, "alg": alg, "time_cost": 2, "memory_cost": 8192, "parallelism": 2}
+    raise ValueError(f"Неизвестный алгоритм KDF: {alg}")
+
+def _scale(params: dict, factor: float) -> dict:
+    params = dict(params)
+    if "iterations" in params:
+        params["iterations"] = max(1000, int(params["iterations"] * factor))
+    elif params["alg"] == "scrypt":
+        # N должно быть степенью двойки
+        n = params["n"]
+        while factor >= 2:
+            n *= 2
+            factor /= 2
+        params["n"] = n
+    else:
+        params["memory_cost"] = int(params["memory_cost"] * factor)
+    return params
+
+def _measure(params: dict) -> float:
+    salt = os.urandom(16)
+    start = time.perf_counter()
+    derive(b"calibration", salt, params, 32)
+    return time.perf_counter() - start
+
+def calibrate(alg: str = "pbkdf2-sha512", target_seconds: float = 0.5) -> dict:
+    """Подбирает параметры, при которых одно выведение ключа занимает около target_seconds"""
+    params = _base_params(alg)
+    elapsed = _measure(params)
+    # Увеличиваем стоимость, пока время не приблизится к цели
+    while elapsed < target_seconds / 2:
+        params = _scale(params, 2)
+        elapsed = _measure(params)
+    if alg != "scrypt" and elapsed < target_seconds:
+        params = _scale(params, target_seconds / elapsed)
+    return params
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="lockup-kdf", description="Калибровка параметров KDF")
+    commands = parser.add_subparsers(dest="command", required=True)
+    calibrate_parser = commands.add_parser("calibrate")
+    calibrate_parser.add_argument("--alg", choices=ALGORITHMS, default="pbkdf2-sha512")
+    calibrate_parser.add_argument("--target", type=float, default=0.5, help="целевое время в секундах")
+    calibrate_parser.add_argument("--save", action="store_true", help="записать в settings.json")
+    args = parser.parse_args(argv)
+
+    params = calibrate(args.alg, args.target)
+    print(json.dumps({"params": params, "seconds": round(_measure(params), 3)}))
+    if args.save:
+        from settings import load_settings, save_settings
+        settings = load_settings()
+        settings["kdf"] = params
+        save_settings(settings)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,37 @@ LANGUAGES = {
     "dark_theme": "Dark",
     "light_theme": "Light",
     "update_button": "Check for Updates",
+    "update_connection_error": "Connection error while checking for updates",
+    "auto_update_check": "Check for updates on startup",
+    "search_label": "Search:",
+    "change_password_button": "Change Master Password",
+    "backup_button": "Backup",
+    "reveal_action": "Show/Hide Password",
+    "copy_action": "Copy Password",
+    "vault_label": "Vault:",
+    "all_vaults": "All vaults",
+    "open_vault": "Open...",
+    "vault": "Vault",
+    "audit_button": "Audit",
+    "audit_title": "Password Audit",
+    "audit_strength": "Strength",
+    "audit_reused": "Reused",
+    "audit_age": "Age, days",
+    "audit_issues": "Issues",
+    "audit_weak": "weak",
+    "audit_old": "old",
+    "audit_breached": "breached",
+    "audit_summary": "Checked: {total}, weak: {weak}, reused: {reused}, old: {old}, breached: {breached}",
+    "audit_no_corpus": "Breach corpus unavailable, breach check skipped: {error}",
+    "metrics_title": "Diagnostics",
+    "metrics_disabled": "Metrics are disabled (metrics_enabled in settings.json)",
+    "metrics_refresh": "Refresh",
+    "metrics_save": "Save...",
+    "metrics_operation": "Operation",
+    "metrics_count": "Calls",
+    "metrics_mean": "Mean, ms",
+    "metrics_max": "Max, ms",
+    "metrics_errors": "Errors",
     "service": "Service",
     "username": "Username",
     "password": "Password",
@@ -37,10 +68,65 @@ LANGUAGES = {
     "dark_theme": "Тёмная",
     "light_theme": "Светлая",
     "update_button": "Проверить обновления",
+    "auto_update_check": "Проверять обновления при запуске",
+    "search_label": "Поиск:",
+    "change_password_button": "Сменить мастер-пароль",
+    "backup_button": "Резервная копия",
+    "reveal_action": "Показать/скрыть пароль",
+    "copy_action": "Копировать пароль",
+    "vault_label": "Хранилище:",
+    "all_vaults": "Все хранилища",
+    "open_vault": "Открыть...",
+    "vault": "Хранилище",
+    "audit_button": "Проверка",
+    "audit_title": "Проверка паролей",
+    "audit_strength": "Стойкость",
+    "audit_reused": "Повторы",
+    "audit_age": "Возраст, дн.",
+    "audit_issues": "Проблемы",
+    "audit_weak": "слабый",
+    "audit_old": "старый",
+    "audit_breached": "в утечках",
+    "audit_summary": "Проверено: {total}, слабых: {weak}, повторов: {reused}, старых: {old}, в утечках: {breached}",
+    "audit_no_corpus": "База утечек недоступна, проверка по ней пропущена: {error}",
+    "metrics_title": "Диагностика",
+    "metrics_disabled": "Метрики выключены (metrics_enabled в settings.json)",
+    "metrics_refresh": "Обновить",
+    "metrics_save": "Сохранить...",
+    "metrics_operation": "Операция",
+    "metrics_count": "Вызовы",
+    "metrics_mean": "Среднее, мс",
+    "metrics_max": "Максимум, мс",
+    "metrics_errors": "Ошибки",
     "service": "Сервис",
     "username": "Логин",
     "password": "Пароль", 
     "date": "Дата",
     "settings_title": "Настройки"
     }
-}
\ No newline at end of file
+}
+
+class LabelBindings:
+    """Подписи виджетов, привязанные к ключам LANGUAGES при их создании.
+
+    Смена языка - один проход по привязкам без поиска виджетов по тексту.
+    """
+
+    def __init__(self):
+        self._bindings = []
+
+    def bind(self, widget, key, setter=None, option="text"):
+        """setter(text) - для подписей, которые не задаются через configure"""
+        if setter is None:
+            setter = lambda text: widget.configure(**{option: text})
+        self._bindings.append((widget, key, setter))
+
+    def apply(self, translations):
+        alive = []
+        for widget, key, setter in self._bindings:
+            # Привязки закрытых окон удаляются при первом проходе
+            if not widget.winfo_exists():
+                continue
+            setter(translations[key])
+            alive.append((widget, key, setter))
+        self._bindings = alive
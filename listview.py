@@ -0,0 +1,405 @@
+import string
+import tkinter as tk
+from collections import deque
+from tkinter import ttk
+from database import DEFAULT_SORT, row_sort_key
+
+MASKED_PASSWORD = "•" * 12
+# COLLATE NOCASE в SQLite приводит к нижнему регистру только A-Z
+NOCASE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+class PagedRowSource:
+    """Постраничное чтение записей из SQLite с небольшим кешем страниц.
+
+    Строки загружаются только для запрошенного окна, а изменения отдельных
+    записей сбрасывают лишь затронутые страницы. Следующая страница читается
+    по ключу последней строки предыдущей (keyset), поэтому прокрутка вглубь
+    отсортированного списка не замедляется; OFFSET остается для переходов.
+    """
+
+    def __init__(self, db, page_size=200, max_pages=16):
+        self.db = db
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.total = 0
+        self.query = ""
+        self.sort = DEFAULT_SORT
+        self._pages = {}
+
+    def reset(self):
+        self._pages.clear()
+        self.total = self.db.count_passwords(self.query)
+
+    def set_query(self, query):
+        """Фильтр поиска по service и username; пустая строка - все записи"""
+        self.query = query
+        self.reset()
+
+    def set_sort(self, column, descending=False):
+        """Порядок строк: столбец из database.SORT_KEYS и направление"""
+        self.sort = (column, descending)
+        self.reset()
+
+    @property
+    def ordered_by_id(self):
+        """Порядок не зависит от содержимого записей"""
+        return self.sort[0] == "id"
+
+    def sortable_columns(self):
+        return self.db.sortable_columns()
+
+    def position(self, record_id):
+        return self.db.get_password_position(record_id, self.sort)
+
+    def _page(self, index):
+        page = self._pages.pop(index, None)
+        if page is None:
+            previous = self._pages.get(index - 1)
+            if previous and len(previous) == self.page_size:
+                after = row_sort_key(previous[-1], self.sort[0])
+                page = self.db.get_passwords_page(0, self.page_size, self.query, self.sort, after)
+            else:
+                page = self.db.get_passwords_page(index * self.page_size, self.page_size,
+                                                  self.query, self.sort)
+            if len(self._pages) >= self.max_pages:
+                # Вытесняем самую старую страницу
+                self._pages.pop(next(iter(self._pages)))
+        self._pages[index] = page
+        return page
+
+    def rows(self, first, count):
+        """Строки с позиции first, не больше count"""
+        result = []
+        position = first
+        end = min(first + count, self.total)
+        while position < end:
+            page_index, offset = divmod(position, self.page_size)
+            page = self._page(page_index)
+            chunk = page[offset:offset + end - position]
+            if not chunk:
+                break
+            result.extend(chunk)
+            position += len(chunk)
+        return result
+
+    def invalidate_from(self, position):
+        """Сбрасывает страницы, начиная с той, что содержит position"""
+        first_page = position // self.page_size
+        for index in [i for i in self._pages if i >= first_page]:
+            del self._pages[index]
+
+    def row_added(self, record_id):
+        if self.query:
+            # При активном поиске позиция записи в выборке неизвестна
+            self.reset()
+            return
+        self.total += 1
+        self.invalidate_from(self.position(record_id))
+
+    def row_updated(self, record_id):
+        record = self.db.get_password_by_id(record_id)
+        if not self.ordered_by_id:
+            # Изменение может переместить запись в другое место списка
+            self._pages.clear()
+            return record
+        for page in self._pages.values():
+            for i, row in enumerate(page):
+                if row[0] == record_id:
+                    page[i] = record
+                    return record
+        return record
+
+    def row_removed(self, record_id):
+        self.rows_removed([record_id])
+
+    def rows_removed(self, record_ids):
+        if self.query:
+            self.reset()
+            return
+        if not record_ids:
+            return
+        self.total = max(self.total - len(record_ids), 0)
+        if not self.ordered_by_id:
+            # Удаленных записей в базе уже нет, их позицию не вычислить
+            self._pages.clear()
+            return
+        # Позиция первой удаленной записи равна числу записей перед ней по id
+        first = max(record_ids) if self.sort[1] else min(record_ids)
+        self.invalidate_from(self.position(first))
+
+
+class MergedRowSource:
+    """Общий список записей всех разблокированных хранилищ (vaults.VaultRegistry).
+
+    Интерфейс тот же, что у PagedRowSource. Количество и очередные страницы
+    запрашиваются у хранилищ параллельно, а строки сливаются в порядке
+    сортировки. Вместо id в строке ключ registry.record_key, в конце
+    добавлено имя хранилища. Слитая часть списка хранится до сброса,
+    поэтому переход в конец читает все строки до него.
+    """
+
+    ordered_by_id = False
+
+    def __init__(self, registry, page_size=200):
+        self.registry = registry
+        self.page_size = page_size
+        self.total = 0
+        self.query = ""
+        self.sort = DEFAULT_SORT
+        self._vaults = []
+        self._sources = []
+        self._rows = []
+
+    def reset(self):
+        self._vaults = self.registry.unlocked()
+        sources = [PagedRowSource(vault.db, self.page_size, max_pages=2) for vault in self._vaults]
+        for source in sources:
+            source.query = self.query
+            source.sort = self.sort
+        self.registry.map(PagedRowSource.reset, sources)
+        self._sources = sources
+        self._positions = [0] * len(sources)
+        self._buffers = [deque() for _ in sources]
+        self._rows = []
+        self.total = sum(source.total for source in sources)
+
+    def set_query(self, query):
+        self.query = query
+        self.reset()
+
+    def set_sort(self, column, descending=False):
+        self.sort = (column, descending)
+        self.reset()
+
+    def sortable_columns(self):
+        """Столбцы, которые можно упорядочить запросом в каждом хранилище"""
+        columns = None
+        for vault in self.registry.unlocked():
+            sortable = vault.db.sortable_columns()
+            columns = sortable if columns is None else [column for column in columns if column in sortable]
+        return columns or []
+
+    def _merge_key(self, row):
+        value, record_id = row_sort_key(row, self.sort[0])
+        # Тот же порядок, что у COLLATE NOCASE в запросе каждого хранилища
+        return (value.translate(NOCASE) if isinstance(value, str) else value), record_id
+
+    def _read(self, index):
+        source = self._sources[index]
+        page = source.rows(self._positions[index], self.page_size)
+        self._positions[index] += len(page)
+        return page
+
+    def _fill(self, end):
+        end = min(end, self.total)
+        pick = max if self.sort[1] else min
+        while len(self._rows) < end:
+            # Пополняем опустевшие буферы; в начале - у всех хранилищ сразу
+            starving = [i for i, buffer in enumerate(self._buffers)
+                        if not buffer and self._positions[i] < self._sources[i].total]
+            for i, page in zip(starving, self.registry.map(self._read, starving)):
+                self._buffers[i].extend(page)
+            ready = [i for i, buffer in enumerate(self._buffers) if buffer]
+            if not ready:
+                break
+            while len(self._rows) < end and all(self._buffers[i] for i in ready):
+                i = pick(ready, key=lambda i: self._merge_key(self._buffers[i][0]))
+                row = self._buffers[i].popleft()
+                vault = self._vaults[i]
+                self._rows.append((self.registry.record_key(vault, row[0]),) + tuple(row[1:]) + (vault.name,))
+
+    def rows(self, first, count):
+        self._fill(first + count)
+        return self._rows[first:first + count]
+
+    # Изменения записей в общем списке не отслеживаются по отдельности
+    def row_added(self, record_id):
+        self.reset()
+
+    def row_updated(self, record_id):
+        self.reset()
+
+    def row_removed(self, record_id):
+        self.reset()
+
+    def rows_removed(self, record_ids):
+        self.reset()
+
+
+class VirtualTreeview:
+    """Виртуальный список поверх ttk.Treeview.
+
+    В дереве существуют только элементы видимого окна; прокрутка и
+    изменения записей перезаполняют эти элементы, не создавая остальные.
+    """
+
+    def __init__(self, tree, scrollbar, db, page_size=200):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.source = PagedRowSource(db, page_size)
+        self.first = 0
+        self.visible = 1
+        # id записей с открытым паролем; сам текст берется из reveal_lookup(row)
+        self.revealed = set()
+        self.reveal_lookup = None
+
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self.tree.bind("<Configure>", self._on_configure)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self.scroll(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll(3))
+
+    def refresh(self):
+        """Полное обновление: пересчет количества и перерисовка окна"""
+        self.source.reset()
+        self.render()
+
+    def set_query(self, query):
+        self.source.set_query(query)
+        self.first = 0
+        self.render()
+
+    def set_sort(self, column, descending=False):
+        self.source.set_sort(column, descending)
+        self.first = 0
+        self.render()
+
+    def set_source(self, source):
+        """Другой источник строк (хранилище или общий список) с тем же поиском и порядком"""
+        source.query = self.source.query
+        source.set_sort(*self.source.sort)
+        self.source = source
+        self.revealed.clear()
+        self.first = 0
+        self.render()
+
+    def _scroll_to(self, record_id):
+        """Окно так, чтобы запись была видна (для порядка по id - конец списка)"""
+        if self.source.sort == DEFAULT_SORT:
+            self.first = max(0, self.source.total - self.visible)
+            return
+        if self.source.query:
+            return
+        position = self.source.position(record_id)
+        if not self.first <= position < self.first + self.visible:
+            self.first = max(0, position - self.visible // 2)
+
+    def _values(self, row):
+        password = MASKED_PASSWORD
+        if row[0] in self.revealed and self.reveal_lookup is not None:
+            plaintext = self.reveal_lookup(row)
+            if plaintext is None:
+                # Значение вытеснено из кеша или устарело - снова скрываем
+                self.revealed.discard(row[0])
+            else:
+                password = plaintext
+        # Строки общего списка хранилищ дополнены именем хранилища
+        return (row[1], row[2], password, row[4]) + tuple(row[5:])
+
+    def render(self):
+        self.first = max(0, min(self.first, self.source.total - self.visible))
+        rows = self.source.rows(self.first, self.visible)
+        items = self.tree.get_children()
+        selected_ids = {self.tree.item(item, "tags")[0] for item in self.tree.selection()}
+
+        for i, row in enumerate(rows):
+            values = self._values(row)
+            if i < len(items):
+                self.tree.item(items[i], values=values, tags=(row[0],))
+            else:
+                self.tree.insert("", tk.END, values=values, tags=(row[0],))
+        if len(items) > len(rows):
+            self.tree.delete(*items[len(rows):])
+
+        # Выделение привязано к записи, а не к элементу окна
+        keep = [item for item in self.tree.get_children()
+                if self.tree.item(item, "tags")[0] in selected_ids]
+        self.tree.selection_set(keep)
+        self._update_scrollbar()
+
+    def _update_scrollbar(self):
+        total = self.source.total
+        if total <= self.visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.first / total, (self.first + self.visible) / total)
+
+    def scroll(self, delta):
+        self.first += delta
+        self.render()
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * self.source.total)
+        elif args[0] == "scroll":
+            step = int(args[1])
+            self.first += step * self.visible if args[2] == "pages" else step
+        self.render()
+
+    def _on_mousewheel(self, event):
+        self.scroll(-3 if event.delta > 0 else 3)
+        return "break"
+
+    def _on_configure(self, event):
+        try:
+            row_height = int(ttk.Style().lookup("Treeview", "rowheight"))
+        except (ValueError, tk.TclError):
+            row_height = 20
+        # Одна строка занята заголовками столбцов
+        visible = max(1, event.height // row_height - 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.render()
+
+    def row_added(self, record_id):
+        self.source.row_added(record_id)
+        self._scroll_to(record_id)
+        self.render()
+
+    def row_updated(self, record_id):
+        record = self.source.row_updated(record_id)
+        if record is None:
+            return
+        if not self.source.ordered_by_id:
+            self.render()
+            return
+        for item in self.tree.get_children():
+            if str(self.tree.item(item, "tags")[0]) == str(record_id):
+                self.tree.item(item, values=self._values(record))
+                break
+
+    def rows_updated(self, record_ids):
+        for record_id in record_ids:
+            self.row_updated(record_id)
+
+    def row_removed(self, record_id):
+        self.rows_removed([record_id])
+
+    def rows_removed(self, record_ids):
+        self.revealed.difference_update(record_ids)
+        self.source.rows_removed(record_ids)
+        self.render()
+
+    def apply_changes(self, added=(), updated=(), removed=()):
+        """Накопленные изменения записей за одну перерисовку.
+
+        Если менялось только содержимое записей, обновляются лишь их
+        элементы в окне; добавление и удаление перерисовывают окно один раз.
+        """
+        removed = set(removed)
+        added = [record_id for record_id in dict.fromkeys(added) if record_id not in removed]
+        updated = [record_id for record_id in dict.fromkeys(updated)
+                   if record_id not in removed and record_id not in added]
+        if removed:
+            self.revealed.difference_update(removed)
+            self.source.rows_removed(list(removed))
+        for record_id in added:
+            self.source.row_added(record_id)
+        if added:
+            self._scroll_to(added[-1])
+        if added or removed or (updated and not self.source.ordered_by_id):
+            for record_id in updated:
+                self.source.row_updated(record_id)
+            self.render()
+        else:
+            self.rows_updated(updated)
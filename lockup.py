@@ -0,0 +1,212 @@
+"""Консольный интерфейс LockUp без графики.
+
+Модуль не импортирует tkinter и подходит для скриптов и CI:
+
+    echo "$MASTER" | python lockup.py list
+    printf '%s\\n%s\\n' "$MASTER" "$SECRET" | python lockup.py add github alice
+    echo "$MASTER" | python lockup.py backup /var/backups/lockup  # например, раз в час из cron
+
+Мастер-пароль читается из первой строки stdin (или запрашивается, если
+stdin - терминал); пароль записи для add и update - из следующей строки.
+С ключом --agent пароль не нужен: ключи берутся у запущенного agent.py.
+Результат выводится в JSON.
+"""
+import argparse
+import getpass
+import json
+import os
+import sys
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_AUTH = 2
+
+class CliError(Exception):
+    """Ошибка команды; result, если задан, все равно выводится в stdout"""
+
+    def __init__(self, message, code=EXIT_ERROR, result=None):
+        super().__init__(message)
+        self.code = code
+        self.result = result
+
+def _read_secret(prompt):
+    if sys.stdin.isatty():
+        return getpass.getpass(prompt)
+    line = sys.stdin.readline()
+    if not line:
+        raise CliError(f"Нет данных в stdin: {prompt.strip()}")
+    return line.rstrip("\r\n")
+
+def _record_json(row, password=None):
+    record = {
+        "id": row[0],
+        "service": row[1],
+        "username": row[2],
+        "last_updated": row[4],
+    }
+    if password is not None:
+        record["password"] = password
+    return record
+
+def _open_vault(args):
+    from connection import set_database_path
+    from database import DatabaseManager, check_master_password_exists, unlock_vault
+    from settings import load_settings
+
+    if args.db:
+        set_database_path(args.db)
+    if args.agent or args.agent_socket:
+        from agent import AgentClient
+        client = AgentClient(args.agent_socket)
+        if not client.is_unlocked():
+            raise CliError("Агент недоступен или заблокирован", EXIT_AUTH)
+        return DatabaseManager(client)
+    if not check_master_password_exists():
+        raise CliError("Мастер-пароль не задан", EXIT_AUTH)
+    key_context = unlock_vault(_read_secret("Мастер-пароль: "), load_settings()["kdf"])
+    if key_context is None:
+        raise CliError("Неверный мастер-пароль!", EXIT_AUTH)
+    return DatabaseManager(key_context)
+
+def cmd_list(db, args):
+    if args.search:
+        rows = db.search_passwords(args.search, limit=args.limit)
+    else:
+        rows = db.get_passwords_page(0, args.limit)
+    return [_record_json(row) for row in rows]
+
+def cmd_get(db, args):
+    if args.id is not None:
+        rows = [db.get_password_by_id(args.id)]
+    else:
+        rows = db.get_passwords_by_service(args.service)
+    rows = [row for row in rows if row]
+    if not rows:
+        raise CliError("Запись не найдена")
+    return [_record_json(row, db.crypto.decrypt_field(row[0], "password", row[3])) for row in rows]
+
+def cmd_add(db, args):
+    password = _read_secret("Пароль записи: ")
+    return {"id": db.add_password(args.service, args.username, password)}
+
+def cmd_update(db, args):
+    if not db.get_password_by_id(args.id):
+        raise CliError("Запись не найдена")
+    password = _read_secret("Пароль записи: ") if args.password else None
+    db.update_many([(args.id, args.service, args.username, password)])
+    return _record_json(db.get_password_by_id(args.id))
+
+def cmd_delete(db, args):
+    deleted = db.delete_many(args.ids)
+    missing = [record_id for record_id in args.ids if record_id not in deleted]
+    result = {"deleted": deleted}
+    if missing:
+        result["missing"] = missing
+        raise CliError(f"Записи не найдены: {', '.join(map(str, missing))}", result=result)
+    return result
+
+def cmd_export(db, args):
+    return {"count": db.export_to_file(args.file)}
+
+def cmd_import(db, args):
+    return {"count": db.import_from_file(args.file)}
+
+def cmd_migrate(db, args):
+    columns = ["password"] + args.columns
+    return {"migrated": db.migrate_encryption(columns), "encrypted_columns": list(db.encrypted_columns)}
+
+def cmd_backup(db, args):
+    if not hasattr(db.crypto, "salt"):
+        # В заголовок копии нужны соль и параметры KDF, агент их не передает
+        raise CliError("Для резервной копии нужен мастер-пароль, а не агент", EXIT_AUTH)
+    os.makedirs(args.directory, exist_ok=True)
+    return {"file": db.write_backup(args.directory, args.full)}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="lockup", description="LockUp: доступ к хранилищу из командной строки")
+    parser.add_argument("--db", help="путь к файлу базы (по умолчанию из settings.json)")
+    parser.add_argument("--agent", action="store_true",
+                        help="использовать ключи агента разблокировки вместо мастер-пароля")
+    parser.add_argument("--agent-socket", help="путь к сокету агента")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="сохранить метрики времени операций (JSON или .prom)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = commands.add_parser("list", help="список записей без паролей")
+    list_parser.add_argument("--search", help="поиск по сервису и логину")
+    list_parser.add_argument("--limit", type=int, default=1000)
+    list_parser.set_defaults(handler=cmd_list)
+
+    get_parser = commands.add_parser("get", help="запись с расшифрованным паролем")
+    target = get_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--id", type=int)
+    target.add_argument("--service")
+    get_parser.set_defaults(handler=cmd_get)
+
+    add_parser = commands.add_parser("add", help="добавить запись")
+    add_parser.add_argument("service")
+    add_parser.add_argument("username")
+    add_parser.set_defaults(handler=cmd_add)
+
+    update_parser = commands.add_parser("update", help="изменить запись")
+    update_parser.add_argument("id", type=int)
+    update_parser.add_argument("--service")
+    update_parser.add_argument("--username")
+    update_parser.add_argument("--password", action="store_true", help="прочитать новый пароль из stdin")
+    update_parser.set_defaults(handler=cmd_update)
+
+    delete_parser = commands.add_parser("delete", help="удалить записи")
+    delete_parser.add_argument("ids", type=int, nargs="+")
+    delete_parser.set_defaults(handler=cmd_delete)
+
+    export_parser = commands.add_parser("export", help="экспорт в файл")
+    export_parser.add_argument("file")
+    export_parser.set_defaults(handler=cmd_export)
+
+    import_parser = commands.add_parser("import", help="импорт из файла")
+    import_parser.add_argument("file")
+    import_parser.set_defaults(handler=cmd_import)
+
+    migrate_parser = commands.add_parser("migrate", help="перешифровать записи шифром AEAD")
+    migrate_parser.add_argument("--columns", nargs="*", default=[], choices=["service", "username"],
+                                help="дополнительно шифровать эти столбцы (без них - поиск по ним недоступен)")
+    migrate_parser.set_defaults(handler=cmd_migrate)
+
+    backup_parser = commands.add_parser(
+        "backup", help="резервная копия: изменения после прошлой (восстановление - python backup.py restore)"
+    )
+    backup_parser.add_argument("directory")
+    backup_parser.add_argument("--full", action="store_true", help="полная копия вместо инкрементной")
+    backup_parser.set_defaults(handler=cmd_backup)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db is None:
+        from settings import load_settings
+        args.db = load_settings()["database_path"]
+    if args.metrics:
+        import metrics
+        metrics.enable()
+    try:
+        result = args.handler(_open_vault(args), args)
+    except CliError as e:
+        if e.result is not None:
+            json.dump(e.result, sys.stdout, ensure_ascii=False)
+            sys.stdout.write("\n")
+        json.dump({"error": str(e)}, sys.stderr, ensure_ascii=False)
+        sys.stderr.write("\n")
+        return e.code
+    except Exception as e:
+        json.dump({"error": str(e)}, sys.stderr, ensure_ascii=False)
+        sys.stderr.write("\n")
+        return EXIT_ERROR
+    finally:
+        if args.metrics:
+            metrics.registry.dump(args.metrics)
+    json.dump(result, sys.stdout, ensure_ascii=False)
+    sys.stdout.write("\n")
+    return EXIT_OK
+
+if __name__ == "__main__":
+    sys.exit(main())
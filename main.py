@@ -1,43 +1,75 @@
-from tkinter import messagebox
+import sys
+from profiling import StartupProfiler
+
+# Замер начинается до импорта интерфейса и базы
+profiler = StartupProfiler(enabled="--profile-startup" in sys.argv)
+profiler.track_imports()
+
 from gui import AuthWindow, MainApp, CreatePasswordWindow
 import tkinter as tk
-from database import check_master_password_exists, verify_master_password
+from database import check_master_password_exists
+from connection import set_database_path
+from settings import load_settings
+from encryption import KeyContext
+
+profiler.mark("imports")
 
 class App(tk.Tk):
-    def __init__(self):
+    def __init__(self, settings):
         super().__init__()
         self.withdraw()
-        self.master_password = None
+        self.settings = settings
+        self.key_context = None
         self._main_app = None
 
         # Проверяем существование мастер-пароля
         if not self.check_master_password_exists():
             self.show_create_password_window()
+            first_window = self.create_password_win
         else:
             self.show_auth_window()
+            first_window = self.auth_win
 
+        if profiler.enabled:
+            self.profile_first_paint(first_window)
         self.mainloop()
 
+    def profile_first_paint(self, window):
+        """--profile-startup: отчет после первой отрисовки окна и выход"""
+        profiler.mark("window created")
+
+        def on_map(event):
+            if event.widget is window:
+                # Отрисовка выполняется в idle-задачах Tk после отображения окна
+                self.after_idle(finish)
+
+        def finish():
+            profiler.mark("first paint")
+            profiler.report()
+            self.destroy()
+
+        if window.winfo_ismapped():
+            self.after_idle(finish)
+        else:
+            window.bind("<Map>", on_map, add="+")
+
     def show_auth_window(self):
-        self.auth_win = AuthWindow(self, self.on_login_success)
+        self.auth_win = AuthWindow(self, self.on_login_success, self.settings)
 
     def show_create_password_window(self):
-        self.create_password_win = CreatePasswordWindow(self, self.on_master_password_created)
+        self.create_password_win = CreatePasswordWindow(self, self.on_master_password_created, self.settings)
 
     def on_master_password_created(self, password: str):
-        self.master_password = password
+        self.key_context = KeyContext(password)
         self.create_password_win.destroy()
         self.deiconify()
         self.show_main_app()
 
-    def on_login_success(self, password: str):
-        if verify_master_password(password):
-            self.master_password = password
-            self.auth_win.destroy()
-            self.show_main_app()
-        else:
-            messagebox.showerror("Ошибка", "Неверный мастер-пароль!")
-            self.auth_win.password_var.set("")
+    def on_login_success(self, key_context: KeyContext):
+        # Пароль уже проверен в AuthWindow, повторный KDF не нужен
+        self.key_context = key_context
+        self.auth_win.destroy()
+        self.show_main_app()
 
     def show_main_app(self):
         # Уничтожаем предыдущий экземпляр, если есть
@@ -45,12 +77,21 @@ class App(tk.Tk):
             self._main_app.root.destroy()
 
             # Создаем новый экземпляр MainApp
-        self._main_app = MainApp(self, self.master_password)
+        self._main_app = MainApp(self, self.key_context, self.settings)
         self._main_app.root.deiconify()
 
     def check_master_password_exists(self):
         return check_master_password_exists() 
 
 if __name__ == "__main__":
-    app = App()  
-    app.mainloop()
\ No newline at end of file
+    settings = load_settings()
+    set_database_path(settings["database_path"])
+    if settings["metrics_enabled"]:
+        import metrics
+        from listview import VirtualTreeview
+
+        metrics.enable()
+        metrics.instrument(MainApp, "gui", ["load_data"])
+        metrics.instrument(VirtualTreeview, "view", ["refresh", "render"])
+    app = App(settings)  
+    app.mainloop()
\ No newline at end of file
@@ -0,0 +1,141 @@
+"""Счетчики и гистограммы времени выполнения горячих участков.
+
+Инструментирование включается явно (metrics_enabled в settings.json или
+lockup.py --metrics FILE): только тогда методы классов заменяются обертками
+с замером времени. Выключенные метрики не добавляют никаких накладных
+расходов - исходные методы не трогаются.
+
+Снимок доступен в окне "О программе" и сохраняется в JSON или в текстовый
+формат Prometheus (файлы .prom и .txt).
+"""
+import bisect
+import functools
+import inspect
+import json
+import threading
+import time
+
+# Верхние границы корзин гистограммы в секундах
+BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class _Operation:
+    __slots__ = ("count", "errors", "total", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.buckets = [0] * (len(BUCKETS) + 1)  # последняя - +Inf
+
+class Metrics:
+    def __init__(self):
+        self.enabled = False
+        self._operations = {}
+        self._lock = threading.Lock()
+
+    def observe(self, name: str, seconds: float, error: bool = False):
+        with self._lock:
+            operation = self._operations.get(name)
+            if operation is None:
+                operation = self._operations[name] = _Operation()
+            operation.count += 1
+            operation.errors += error
+            operation.total += seconds
+            operation.max = max(operation.max, seconds)
+            operation.buckets[bisect.bisect_left(BUCKETS, seconds)] += 1
+
+    def reset(self):
+        with self._lock:
+            self._operations.clear()
+
+    def snapshot(self) -> dict:
+        """{операция: count, errors, sum, max, mean, buckets}; корзины накопительные"""
+        with self._lock:
+            result = {}
+            for name, operation in sorted(self._operations.items()):
+                cumulative = 0
+                buckets = {}
+                for bound, count in zip(BUCKETS + ("+Inf",), operation.buckets):
+                    cumulative += count
+                    buckets[str(bound)] = cumulative
+                result[name] = {
+                    "count": operation.count,
+                    "errors": operation.errors,
+                    "sum": operation.total,
+                    "max": operation.max,
+                    "mean": operation.total / operation.count if operation.count else 0.0,
+                    "buckets": buckets,
+                }
+            return result
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self) -> str:
+        lines = [
+            "# HELP lockup_operation_duration_seconds Время выполнения операций LockUp",
+            "# TYPE lockup_operation_duration_seconds histogram",
+        ]
+        snapshot = self.snapshot()
+        for name, data in snapshot.items():
+            for bound, count in data["buckets"].items():
+                lines.append(f'lockup_operation_duration_seconds_bucket{{op="{name}",le="{bound}"}} {count}')
+            lines.append(f'lockup_operation_duration_seconds_sum{{op="{name}"}} {data["sum"]:.9f}')
+            lines.append(f'lockup_operation_duration_seconds_count{{op="{name}"}} {data["count"]}')
+        lines.append("# HELP lockup_operation_errors_total Операции, завершившиеся исключением")
+        lines.append("# TYPE lockup_operation_errors_total counter")
+        for name, data in snapshot.items():
+            lines.append(f'lockup_operation_errors_total{{op="{name}"}} {data["errors"]}')
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path: str):
+        """Сохранение снимка; формат определяется расширением файла"""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+registry = Metrics()
+
+def timed(name: str, func):
+    """Обертка, записывающая время вызова func в registry"""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        error = False
+        try:
+            return func(*args, **kwargs)
+        except BaseException:
+            error = True
+            raise
+        finally:
+            registry.observe(name, time.perf_counter() - start, error)
+    wrapper.__wrapped_metric__ = name
+    return wrapper
+
+def instrument(cls, prefix: str, names=None, skip=()):
+    """Замер методов класса: names или все публичные функции, кроме skip"""
+    if names is None:
+        names = [name for name, value in vars(cls).items()
+                 if inspect.isfunction(value) and not name.startswith("_") and name not in skip]
+    for name in names:
+        method = getattr(cls, name)
+        if hasattr(method, "__wrapped_metric__"):
+            continue
+        setattr(cls, name, timed(f"{prefix}.{name}", method))
+
+def instrument_function(module, attribute: str, name: str):
+    function = getattr(module, attribute)
+    if not hasattr(function, "__wrapped_metric__"):
+        setattr(module, attribute, timed(name, function))
+
+def enable():
+    """Инструментирование DatabaseManager, CryptoManager и KDF"""
+    import database
+    import encryption
+
+    registry.enabled = True
+    # transaction() возвращает контекстный менеджер, время его создания не показательно
+    instrument(database.DatabaseManager, "db", skip=("transaction",))
+    instrument(encryption.CryptoManager, "crypto")
+    instrument_function(encryption, "derive", "kdf.derive")
@@ -0,0 +1,221 @@
+"""Версионированные миграции схемы базы.
+
+Номер схемы хранится в PRAGMA user_version. Каждый шаг применяется один раз,
+по порядку, в отдельной транзакции вместе с записью нового номера, поэтому
+после сбоя база остается на предыдущей версии целиком. Если схема актуальна,
+при открытии соединения выполняется только чтение user_version - без DDL.
+
+Новый шаг добавляется в конец MIGRATIONS; уже выпущенные шаги не меняются.
+"""
+import sqlite3
+
+def _base_schema(conn):
+    """Таблицы записей, мастер-пароля и служебных значений хранилища"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS passwords (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            service TEXT NOT NULL,
+            username TEXT NOT NULL,
+            password TEXT NOT NULL,
+            last_updated TEXT
+        )
+    """)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            password_hash TEXT NOT NULL,
+            kdf_params TEXT
+        )
+    """)
+    # Базы прежних версий: параметры KDF хранятся в отдельном столбце
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(users)")]
+    if "kdf_params" not in columns:
+        conn.execute("ALTER TABLE users ADD COLUMN kdf_params TEXT")
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS vault_meta (
+            key TEXT PRIMARY KEY,
+            value BLOB
+        )
+    """)
+
+def _search_index(conn):
+    """Поисковый индекс по service и username.
+
+    Основной вариант - FTS5 с триггерами синхронизации; зашифрованные
+    значения (BLOB) в индекс не попадают. Если FTS5 недоступен, создаются
+    обычные индексы NOCASE для поиска по префиксу через LIKE.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'passwords_fts'").fetchone()
+    try:
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS passwords_fts USING fts5(
+                service, username,
+                content='passwords', content_rowid='id',
+                prefix='2 3'
+            )
+        """)
+    except sqlite3.OperationalError:
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_service_nocase ON passwords(service COLLATE NOCASE)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_username_nocase ON passwords(username COLLATE NOCASE)")
+        return
+
+    # Триггеры прежних версий индексировали значения без проверки типа
+    for trigger in ("passwords_fts_insert", "passwords_fts_delete", "passwords_fts_update"):
+        conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+    conn.execute("""
+        CREATE TRIGGER passwords_fts_insert AFTER INSERT ON passwords BEGIN
+            INSERT INTO passwords_fts(rowid, service, username)
+            VALUES (new.id,
+                    CASE WHEN typeof(new.service) = 'text' THEN new.service END,
+                    CASE WHEN typeof(new.username) = 'text' THEN new.username END);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER passwords_fts_delete AFTER DELETE ON passwords BEGIN
+            INSERT INTO passwords_fts(passwords_fts, rowid, service, username)
+            VALUES ('delete', old.id,
+                    CASE WHEN typeof(old.service) = 'text' THEN old.service END,
+                    CASE WHEN typeof(old.username) = 'text' THEN old.username END);
+        END
+    """)
+    conn.execute("""
+        CREATE TRIGGER passwords_fts_update AFTER UPDATE OF service, username ON passwords BEGIN
+            INSERT INTO passwords_fts(passwords_fts, rowid, service, username)
+            VALUES ('delete', old.id,
+                    CASE WHEN typeof(old.service) = 'text' THEN old.service END,
+                    CASE WHEN typeof(old.username) = 'text' THEN old.username END);
+            INSERT INTO passwords_fts(rowid, service, username)
+            VALUES (new.id,
+                    CASE WHEN typeof(new.service) = 'text' THEN new.service END,
+                    CASE WHEN typeof(new.username) = 'text' THEN new.username END);
+        END
+    """)
+    if not exists:
+        # Индексируем записи, созданные до появления поиска; BLOB пропускаются
+        conn.execute("""
+            INSERT INTO passwords_fts(rowid, service, username)
+            SELECT id,
+                   CASE WHEN typeof(service) = 'text' THEN service END,
+                   CASE WHEN typeof(username) = 'text' THEN username END
+            FROM passwords
+        """)
+
+def _sort_indexes(conn):
+    """Индексы для сортировки списка с постраничным чтением по ключу (database.SORT_KEYS)"""
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_service_sort ON passwords(service COLLATE NOCASE, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_username_sort ON passwords(username COLLATE NOCASE, id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_passwords_updated_sort ON passwords(COALESCE(last_updated, ''), id)")
+    # Прежние индексы поиска без FTS5 покрываются новыми
+    conn.execute("DROP INDEX IF EXISTS idx_passwords_service_nocase")
+    conn.execute("DROP INDEX IF EXISTS idx_passwords_username_nocase")
+
+def _password_audit(conn):
+    """Результаты проверки паролей (audit.py); актуальность строки - по token_tag (шаг 7)"""
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS password_audit (
+            id INTEGER PRIMARY KEY,
+            last_updated TEXT,
+            fingerprint BLOB NOT NULL,
+            score INTEGER NOT NULL,
+            length INTEGER NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_password_audit_fingerprint ON password_audit(fingerprint)")
+
+def _audit_breaches(conn):
+    """Признак пароля из локальной базы утечек (breach.py)"""
+    conn.execute("ALTER TABLE password_audit ADD COLUMN breached INTEGER NOT NULL DEFAULT 0")
+
+def _change_log(conn):
+    """Журнал изменений записей для инкрементных резервных копий (backup.py).
+
+    Триггеры пишут только id и вид операции; значения берутся из passwords
+    при создании копии. Журнал очищается после каждой копии.
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            op TEXT NOT NULL,
+            record_id INTEGER NOT NULL
+        )
+    """)
+    for operation, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+        conn.execute(f"DROP TRIGGER IF EXISTS passwords_log_{operation.lower()}")
+        conn.execute(f"""
+            CREATE TRIGGER passwords_log_{operation.lower()} AFTER {operation} ON passwords BEGIN
+                INSERT INTO change_log (op, record_id) VALUES ('{operation[0]}', {row}.id);
+            END
+        """)
+
+def _audit_token_tag(conn):
+    """Хвост шифротекста пароля, по которому проверялась строка password_audit.
+
+    last_updated хранится с точностью до секунды и не меняется при правке
+    в ту же секунду. Последние байты шифротекста - тег AEAD или HMAC Fernet -
+    меняются при каждой записи (случайный nonce) и сравниваются прямо в SQL.
+    """
+    conn.execute("ALTER TABLE password_audit ADD COLUMN token_tag BLOB")
+
+def _change_log_gate(conn):
+    """Журнал изменений ведется, только пока резервные копии включены.
+
+    До первой копии (и после смены мастер-пароля) следующая копия все равно
+    полная, поэтому журнал не нужен и не должен расти. Запись 'backup_log'
+    в vault_meta ставит DatabaseManager.write_backup перед полной копией.
+    """
+    if conn.execute("SELECT 1 FROM vault_meta WHERE key = 'backup_seq'").fetchone():
+        conn.execute("INSERT OR REPLACE INTO vault_meta (key, value) VALUES ('backup_log', 1)")
+    else:
+        conn.execute("DELETE FROM change_log")
+    for operation, row in (("INSERT", "new"), ("UPDATE", "new"), ("DELETE", "old")):
+        conn.execute(f"DROP TRIGGER IF EXISTS passwords_log_{operation.lower()}")
+        conn.execute(f"""
+            CREATE TRIGGER passwords_log_{operation.lower()} AFTER {operation} ON passwords
+            WHEN EXISTS (SELECT 1 FROM vault_meta WHERE key = 'backup_log') BEGIN
+                INSERT INTO change_log (op, record_id) VALUES ('{operation[0]}', {row}.id);
+            END
+        """)
+
+# (версия, описание, функция); версия равна позиции шага в списке
+MIGRATIONS = [
+    (1, "base schema", _base_schema),
+    (2, "full-text search index", _search_index),
+    (3, "sort indexes", _sort_indexes),
+    (4, "password audit", _password_audit),
+    (5, "breached password flag", _audit_breaches),
+    (6, "change log", _change_log),
+    (7, "audit token tag", _audit_token_tag),
+    (8, "change log only with backups", _change_log_gate),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def upgrade(conn, target: int = SCHEMA_VERSION) -> int:
+    """Применяет недостающие миграции; возвращает число примененных шагов.
+
+    Номер перечитывается внутри BEGIN IMMEDIATE, поэтому два процесса,
+    открывших базу одновременно, не применят один шаг дважды.
+    """
+    if schema_version(conn) >= target:
+        return 0
+    applied = 0
+    for version, description, step in MIGRATIONS:
+        if version > target:
+            break
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            step(conn)
+            # PRAGMA user_version входит в ту же транзакцию
+            conn.execute(f"PRAGMA user_version = {version:d}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        applied += 1
+    return applied
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+def _wipe(buffer: bytearray):
+    for i in range(len(buffer)):
+        buffer[i] = 0
+
+class PlaintextCache:
+    """Небольшой LRU-кеш расшифрованных паролей с ограничением по времени.
+
+    Значения хранятся в bytearray и затираются нулями при вытеснении,
+    истечении срока и clear(). Ключ включает шифротекст, поэтому после
+    изменения записи старое значение не используется. Строки, которые
+    возвращает get(), - копии, их Python затереть не позволяет.
+    """
+
+    def __init__(self, max_entries: int = 32, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, record_id, token: str):
+        with self._lock:
+            entry = self._entries.get(record_id)
+            if entry is None:
+                return None
+            cached_token, expires_at, buffer = entry
+            if cached_token != token or expires_at < time.monotonic():
+                self._discard(record_id)
+                return None
+            self._entries.move_to_end(record_id)
+            return buffer.decode()
+
+    def put(self, record_id, token: str, plaintext: str):
+        with self._lock:
+            self._discard(record_id)
+            self._entries[record_id] = (token, time.monotonic() + self.ttl, bytearray(plaintext.encode()))
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def get_or_decrypt(self, record_id, token, decrypt):
+        plaintext = self.get(record_id, token)
+        if plaintext is None:
+            plaintext = decrypt(token)
+            self.put(record_id, token, plaintext)
+        return plaintext
+
+    def __contains__(self, record_id):
+        with self._lock:
+            entry = self._entries.get(record_id)
+            return entry is not None and entry[1] >= time.monotonic()
+
+    def purge_expired(self):
+        """Удаляет просроченные значения; возвращает их id"""
+        now = time.monotonic()
+        with self._lock:
+            expired = [record_id for record_id, entry in self._entries.items() if entry[1] < now]
+            for record_id in expired:
+                self._discard(record_id)
+        return expired
+
+    def invalidate(self, record_id):
+        with self._lock:
+            self._discard(record_id)
+
+    def clear(self):
+        with self._lock:
+            for record_id in list(self._entries):
+                self._discard(record_id)
+
+    def _discard(self, record_id):
+        entry = self._entries.pop(record_id, None)
+        if entry is not None:
+            _wipe(entry[2])
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,62 @@
+"""Профилирование запуска: python main.py --profile-startup
+
+Замеряет время импорта модулей, впервые загруженных до появления окна
+ввода мастер-пароля, и время до его первой отрисовки. Отчет печатается
+в stdout в формате JSON (время в миллисекундах), после чего приложение
+завершается - так время до запроса пароля можно отслеживать как метрику.
+"""
+import builtins
+import json
+import sys
+import time
+
+class StartupProfiler:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.start = time.perf_counter()
+        self.imports = {}
+        self.marks = {}
+        self._original_import = None
+
+    def _elapsed_ms(self, since):
+        return round((time.perf_counter() - since) * 1000, 2)
+
+    def track_imports(self):
+        """Учитывает импорты верхнего уровня (вместе с их зависимостями)"""
+        if not self.enabled or self._original_import is not None:
+            return
+        original = self._original_import = builtins.__import__
+        depth = 0
+
+        def timed_import(name, *args, **kwargs):
+            nonlocal depth
+            if depth or name in sys.modules:
+                return original(name, *args, **kwargs)
+            depth += 1
+            started = time.perf_counter()
+            try:
+                return original(name, *args, **kwargs)
+            finally:
+                depth -= 1
+                self.imports[name] = self._elapsed_ms(started)
+
+        builtins.__import__ = timed_import
+
+    def stop_tracking(self):
+        if self._original_import is not None:
+            builtins.__import__ = self._original_import
+            self._original_import = None
+
+    def mark(self, name: str):
+        """Отметка времени от начала запуска"""
+        if self.enabled:
+            self.marks[name] = self._elapsed_ms(self.start)
+
+    def report(self, stream=None):
+        self.stop_tracking()
+        data = {
+            "marks": self.marks,
+            "imports": dict(sorted(self.imports.items(), key=lambda item: -item[1])),
+        }
+        print(json.dumps(data, indent=2), file=stream or sys.stdout)
+        return data
@@ -0,0 +1,46 @@
+"""Отложенная и объединенная перерисовка интерфейса.
+
+Изменения (записи, стили, подписи языка) помечаются как "грязные"
+области, а перерисовка выполняется один раз в ближайший цикл простоя Tk
+(after_idle). Несколько правок подряд или быстрые переключения темы дают
+одну перерисовку, объем которой зависит от того, что изменилось.
+"""
+
+class RefreshScheduler:
+    def __init__(self, root):
+        self.root = root
+        self._handlers = []
+        self._dirty = {}
+        self._job = None
+
+    def register(self, region: str, callback, covers=()):
+        """callback(items) вызывается при сбросе области region.
+
+        Обработчики вызываются в порядке регистрации; covers - области,
+        которые уже учтены этим обработчиком и пропускаются в том же цикле.
+        """
+        self._handlers.append((region, callback, frozenset(covers)))
+
+    def mark(self, region: str, items=()):
+        """Помечает область; items (например, id записей) накапливаются"""
+        self._dirty.setdefault(region, []).extend(items)
+        if self._job is None:
+            self._job = self.root.after_idle(self.flush)
+
+    def flush(self):
+        """Немедленный сброс всех помеченных областей"""
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        dirty, self._dirty = self._dirty, {}
+        covered = set()
+        for region, callback, covers in self._handlers:
+            if region in dirty and region not in covered:
+                callback(dirty[region])
+                covered |= covers
+
+    def cancel(self):
+        if self._job is not None:
+            self.root.after_cancel(self._job)
+            self._job = None
+        self._dirty.clear()
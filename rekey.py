@@ -0,0 +1,79 @@
+"""Перешифрование паролей при смене мастер-пароля и пул для пакетной обработки записей.
+
+Модуль не импортирует tkinter и database, чтобы рабочие процессы пула
+запускались быстро (в том числе при методе запуска spawn в Windows).
+"""
+import os
+
+from cipher import DEFAULT_BACKEND, FieldCipher
+
+CHUNK_SIZE = 2000
+# Меньшие хранилища перешифровываются в текущем процессе: запуск пула дороже
+PARALLEL_THRESHOLD = 5000
+
+def reencrypt_chunk(old_key: bytes, new_key: bytes, backend: str, rows):
+    """Перешифрование пачки (id, service, username, password).
+
+    Возвращает (service, username, password, id) для UPDATE. Пароль всегда
+    шифруется заново шифром backend, service и username - только если они
+    хранятся зашифрованными (BLOB).
+    """
+    old_cipher = FieldCipher(old_key, backend)
+    new_cipher = FieldCipher(new_key, backend)
+    result = []
+    for record_id, service, username, password in rows:
+        values = []
+        for column, value in (("service", service), ("username", username), ("password", password)):
+            if column == "password" or isinstance(value, bytes):
+                value = new_cipher.encrypt(record_id, column, old_cipher.decrypt(record_id, column, value))
+            values.append(value)
+        result.append(tuple(values) + (record_id,))
+    return result
+
+def _chunks(rows, size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def map_chunks(func, args, rows, total, progress=None, workers=None):
+    """Генератор результатов func(*args, chunk) по пачкам rows в исходном порядке.
+
+    Большие объемы распределяются по пулу процессов; progress(done, total)
+    вызывается после каждой готовой пачки. func должна быть функцией уровня
+    модуля без зависимостей от tkinter, чтобы пул запускался быстро.
+    """
+    done = 0
+    if total < PARALLEL_THRESHOLD:
+        for chunk in _chunks(rows, CHUNK_SIZE):
+            result = func(*args, chunk)
+            done += len(result)
+            if progress:
+                progress(done, total)
+            yield result
+        return
+
+    # Пул процессов нужен только для больших хранилищ; импорт откладывается
+    from concurrent.futures import ProcessPoolExecutor
+
+    workers = workers or os.cpu_count() or 1
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(func, *args, chunk) for chunk in _chunks(rows, CHUNK_SIZE)]
+        for future in futures:
+            result = future.result()
+            done += len(result)
+            if progress:
+                progress(done, total)
+            yield result
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def reencrypt_rows(rows, total, old_key: bytes, new_key: bytes, backend: str = DEFAULT_BACKEND,
+                   progress=None, workers=None):
+    """Генератор пачек (service, username, password, id) в порядке исходных строк"""
+    return map_chunks(reencrypt_chunk, (old_key, new_key, backend), rows, total, progress, workers)
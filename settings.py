@@ -0,0 +1,33 @@
+import json
+import os
+
+SETTINGS_FILE = "settings.json"
+
+DEFAULTS = {
+    "database_path": "passwords.db",
+    "check_updates": True,  # Проверять обновления при запуске
+    "update_url": "https://raw.githubusercontent.com/GottaGrizzly/LockUp/main/version.json",
+    "update_cache_ttl": 24 * 60 * 60,  # Время жизни кеша version.json в секундах
+    "kdf": None,  # Параметры KDF для новых хешей (python kdf.py calibrate --save)
+    "agent_enabled": False,  # Обслуживать скрипты через агент разблокировки, пока открыто окно
+    "agent_idle_timeout": 15 * 60,
+    "metrics_enabled": False,  # Замер времени операций (окно "О программе")
+    "breach_corpus": None,  # Локальная база утечек (python breach.py convert ...)
+    "backup_dir": None,  # Папка резервных копий (кнопка в настройках, lockup.py backup)
+    "vaults": [],  # Дополнительные хранилища: [{"name": ..., "path": ...}] (vaults.py)
+}
+
+def load_settings(path: str = SETTINGS_FILE) -> dict:
+    """Загрузка настроек поверх значений по умолчанию"""
+    settings = dict(DEFAULTS)
+    if os.path.exists(path):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                settings.update(json.load(f))
+        except (OSError, ValueError):
+            pass
+    return settings
+
+def save_settings(settings: dict, path: str = SETTINGS_FILE):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(settings, f, ensure_ascii=False, indent=2)
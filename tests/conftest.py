@@ -0,0 +1,29 @@
+import os
+import sys
+
+import pytest
+
+# Модули приложения лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from connection import close_all
+from database import DatabaseManager, create_vault
+
+PASSWORD = "test-password"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    """Временный рабочий каталог; соединения с базами закрываются после теста"""
+    monkeypatch.chdir(tmp_path)
+    yield tmp_path
+    close_all()
+
+
+@pytest.fixture
+def make_vault(workdir):
+    """Новое хранилище в отдельном файле: make_vault(name) -> DatabaseManager"""
+    def make(name="vault"):
+        path = str(workdir / f"{name}.db")
+        return DatabaseManager(create_vault(path, PASSWORD), path)
+    return make
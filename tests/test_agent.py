@@ -0,0 +1,69 @@
+import io
+import json
+import socket
+
+import pytest
+
+import lockup
+from agent import AgentClient, AgentServer
+from database import DatabaseManager
+
+pytestmark = pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="нужны Unix-сокеты")
+
+
+@pytest.fixture
+def agent(make_vault, workdir):
+    db = make_vault()
+    server = AgentServer(db.crypto, str(workdir / "agent" / "agent.sock"), idle_timeout=0)
+    thread = server.start_background()
+    server.db = db
+    yield server
+    server.stop()
+    thread.join(timeout=5)
+
+
+def run(agent, monkeypatch, capsys, *argv, stdin=""):
+    monkeypatch.setattr("sys.stdin", io.StringIO(stdin))
+    code = lockup.main(["--db", agent.db.path, "--agent-socket", agent.socket_path, *argv])
+    out, err = capsys.readouterr()
+    return code, json.loads(out) if out else json.loads(err)
+
+
+def test_cli_round_trip_through_agent(agent, monkeypatch, capsys):
+    assert AgentClient(agent.socket_path).is_unlocked()
+    code, result = run(agent, monkeypatch, capsys, "add", "github", "alice", stdin="secret\n")
+    assert code == lockup.EXIT_OK
+    code, records = run(agent, monkeypatch, capsys, "list")
+    assert [(record["id"], record["service"]) for record in records] == [(result["id"], "github")]
+    code, records = run(agent, monkeypatch, capsys, "get", "--id", str(result["id"]))
+    assert records[0]["password"] == "secret"
+    # Агент шифрует теми же ключами, что и сессия с мастер-паролем
+    db = DatabaseManager(agent.db.crypto, agent.db.path)
+    row = db.get_password_by_id(result["id"])
+    assert db.crypto.decrypt_field(row[0], "password", row[3]) == "secret"
+
+
+def test_backup_needs_master_password(agent, monkeypatch, capsys, workdir):
+    code, error = run(agent, monkeypatch, capsys, "backup", str(workdir / "backups"))
+    assert code == lockup.EXIT_AUTH and "error" in error
+
+
+def test_second_agent_does_not_steal_socket(agent):
+    with pytest.raises(FileExistsError):
+        AgentServer(agent.key_context, agent.socket_path)
+    assert AgentClient(agent.socket_path).is_unlocked()
+
+
+def test_stale_socket_is_replaced_and_removed_on_stop(make_vault, workdir):
+    path = workdir / "agent.sock"
+    stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    stale.bind(str(path))
+    stale.close()
+    server = AgentServer(make_vault().crypto, str(path), idle_timeout=0)
+    thread = server.start_background()
+    client = AgentClient(str(path))
+    assert client.is_unlocked()
+    client.call("lock")
+    thread.join(timeout=5)
+    assert not path.exists()
+    assert not client.is_unlocked()
@@ -0,0 +1,51 @@
+from audit import strength
+
+
+def report_by_id(db):
+    return {row[0]: row for row in db.audit_report()}
+
+
+def test_strength_scores():
+    assert strength("") == 0
+    assert strength("password") == 0
+    assert strength("qwerty123") == 0
+    assert strength("Zq8#vLp2!xR7mW") == 4
+
+
+def test_rerun_checks_only_changed_records(make_vault):
+    db = make_vault()
+    db.add_many([("a", "u", "password"), ("b", "u", "password"), ("c", "u", "Zq8#vLp2!xR7mW")])
+    assert db.audit_passwords() == (3, None)
+    assert db.audit_passwords() == (0, None)
+
+    report = report_by_id(db)
+    assert report[1][4] == 0 and report[1][6] == 2  # слабый и повторяется
+    assert report[3][4] == 4 and report[3][6] == 1
+
+
+def test_edit_in_same_second_is_rechecked(make_vault):
+    db = make_vault()
+    db.add_password("a", "u", "password")
+    db.audit_passwords()
+    db.update_password(1, "a", "u", "Zq8#vLp2!xR7mW")
+    # До повторной проверки устаревший результат в отчет не попадает
+    assert db.audit_report() == []
+    assert db.audit_passwords() == (1, None)
+    assert report_by_id(db)[1][4] == 4
+
+
+def test_deleted_records_leave_report(make_vault):
+    db = make_vault()
+    db.add_many([("a", "u", "same"), ("b", "u", "same")])
+    db.audit_passwords()
+    db.delete_password(2)
+    db.audit_passwords()
+    assert report_by_id(db)[1][6] == 1
+
+
+def test_new_master_password_rechecks_everything(make_vault):
+    db = make_vault()
+    db.add_many([("a", "u", "one"), ("b", "u", "two")])
+    db.audit_passwords()
+    db.change_master_password("another-password")
+    assert db.audit_passwords() == (2, None)
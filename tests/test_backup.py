@@ -0,0 +1,98 @@
+import os
+
+import pytest
+
+from backup import backup_chain
+from encryption import SecurityError
+from conftest import PASSWORD
+from database import DatabaseManager, restore_backup, unlock_vault
+
+
+def records(db):
+    return [(row[0], row[1], row[2], db.crypto.decrypt_field(row[0], "password", row[3]))
+            for row in db.get_all_passwords()]
+
+
+def restored(workdir, name, **kwargs):
+    target = str(workdir / f"{name}.db")
+    count, files = restore_backup(str(workdir / "backups"), PASSWORD, target, **kwargs)
+    return DatabaseManager(unlock_vault(PASSWORD, path=target), target), count, files
+
+
+def test_full_and_delta_round_trip(make_vault, workdir):
+    db = make_vault()
+    os.mkdir("backups")
+    db.add_many((f"service-{i}", f"user-{i}", f"password-{i}") for i in range(50))
+    assert db.write_backup("backups").endswith("-full.lkb")
+
+    db.update_password(3, "service-3", "user-3", "changed")
+    db.delete_password(7)
+    db.add_password("new", "user", "secret")
+    assert db.write_backup("backups").endswith("-delta.lkb")
+    assert db.write_backup("backups") is None
+
+    copy, count, files = restored(workdir, "restored")
+    assert count == 50 and len(files) == 2
+    assert records(copy) == records(db)
+
+
+def test_restored_rename_updates_search(make_vault, workdir):
+    db = make_vault()
+    os.mkdir("backups")
+    db.add_password("alpha", "user", "secret")
+    db.write_backup("backups")
+    db.update_password(1, "zulu", "user", "secret")
+    db.write_backup("backups")
+
+    copy, _, _ = restored(workdir, "renamed")
+    assert copy.search_passwords("alpha") == []
+    assert [row[1] for row in copy.search_passwords("zulu")] == ["zulu"]
+
+
+def test_wrong_password_creates_nothing(make_vault, workdir):
+    db = make_vault()
+    os.mkdir("backups")
+    db.add_password("a", "u", "p")
+    db.write_backup("backups")
+    target = str(workdir / "restored.db")
+    with pytest.raises(SecurityError):
+        restore_backup("backups", "wrong", target)
+    assert not os.path.exists(target)
+
+
+def test_new_master_password_forces_full_backup(make_vault, workdir):
+    db = make_vault()
+    os.mkdir("backups")
+    db.add_password("a", "u", "p")
+    db.write_backup("backups")
+    db.change_master_password(PASSWORD)
+    assert db.write_backup("backups").endswith("-full.lkb")
+    copy, count, files = restored(workdir, "restored")
+    assert count == 1 and len(files) == 1
+
+
+def test_change_log_is_kept_only_with_backups(make_vault):
+    db = make_vault()
+    log_size = lambda: db.conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0]
+    db.add_many(("a", "u", "p") for _ in range(10))
+    assert log_size() == 0
+    os.mkdir("backups")
+    db.write_backup("backups")
+    db.update_password(1, "a", "u", "q")
+    assert log_size() == 1
+    db.change_master_password(PASSWORD)
+    assert log_size() == 0
+
+
+def test_restore_picks_one_vault(make_vault, workdir):
+    os.mkdir("backups")
+    first, second = make_vault("first"), make_vault("second")
+    first.add_password("first", "u", "p")
+    second.add_many([("second", "u", "p"), ("second", "v", "q")])
+    first.write_backup("backups")
+    second.write_backup("backups")
+
+    with pytest.raises(ValueError):
+        backup_chain("backups")
+    copy, count, _ = restored(workdir, "restored", vault="second")
+    assert count == 2 and records(copy) == records(second)
@@ -0,0 +1,75 @@
+import hashlib
+import os
+
+import pytest
+
+from breach import BreachCorpus, convert, open_corpus
+
+
+def write_corpus(directory, passwords, name="corpus.bin"):
+    source = directory / "corpus.txt"
+    digests = sorted(hashlib.sha1(password.encode()).hexdigest().upper() for password in passwords)
+    source.write_text("".join(f"{digest}:{number}\n" for number, digest in enumerate(digests, 1)))
+    target = str(directory / name)
+    return target, convert(str(source), target)
+
+
+def test_convert_and_lookup(workdir):
+    passwords = [f"leaked-{i}" for i in range(2000)]
+    target, count = write_corpus(workdir, passwords)
+    assert count == len(passwords)
+    corpus = BreachCorpus(target)
+    try:
+        assert all(password in corpus for password in passwords)
+        assert not any(f"clean-{i}" in corpus for i in range(2000))
+    finally:
+        corpus.close()
+
+
+def test_convert_skips_duplicates_and_rejects_unsorted(workdir):
+    digest = hashlib.sha1(b"password").hexdigest().upper()
+    source = workdir / "corpus.txt"
+    source.write_text(f"{digest}:3\n{digest}:1\n\n")
+    assert convert(str(source), "corpus.bin") == 1
+
+    source.write_text(f"{'F' * 40}\n{'0' * 40}\n")
+    with pytest.raises(ValueError):
+        convert(str(source), "unsorted.bin")
+    assert not os.path.exists("unsorted.bin")
+
+
+def test_corrupt_file_is_rejected(workdir):
+    target, _ = write_corpus(workdir, ["password"])
+    with open(target, "ab") as f:
+        f.write(b"x")
+    with pytest.raises(ValueError):
+        BreachCorpus(target)
+
+
+def test_replaced_corpus_is_reopened(workdir):
+    target, _ = write_corpus(workdir, ["password"])
+    assert "password" in open_corpus(target)
+    write_corpus(workdir, ["zzz"])
+    corpus = open_corpus(target)
+    assert "zzz" in corpus and "password" not in corpus
+
+
+def test_audit_flags_breached_passwords(make_vault, workdir):
+    target, _ = write_corpus(workdir, ["password"])
+    db = make_vault()
+    db.add_many([("a", "u", "password"), ("b", "u", "Zq8#vLp2!xR7mW")])
+    db.audit_passwords(corpus_path=target)
+    assert {row[0]: row[8] for row in db.audit_report()} == {1: 1, 2: 0}
+
+    # Новая база утечек - все записи проверяются заново
+    write_corpus(workdir, ["Zq8#vLp2!xR7mW"])
+    assert db.audit_passwords(corpus_path=target) == (2, None)
+    assert {row[0]: row[8] for row in db.audit_report()} == {1: 0, 2: 1}
+
+
+def test_audit_without_available_corpus(make_vault, workdir):
+    db = make_vault()
+    db.add_password("a", "u", "password")
+    count, error = db.audit_passwords(corpus_path=str(workdir / "missing.bin"))
+    assert count == 1 and error
+    assert len(db.audit_report()) == 1
@@ -0,0 +1,120 @@
+import hashlib
+import hmac
+import io
+
+import pytest
+
+import export_format
+from encryption import SecurityError
+from export_format import ExportReader, ExportWriter
+
+RECORDS = [
+    ("mail, personal", "user\nname", "p,a:s\ns", "2024-01-01 10:00:00"),
+    ("bank", "", "secret", None),
+] + [(f"service-{i}", f"user-{i}", f"password-{i}", "2024-01-02 00:00:00") for i in range(500)]
+
+
+def write_container(crypto, records, chunk_size=1024):
+    buffer = io.BytesIO()
+    writer = ExportWriter(buffer, crypto, chunk_size)
+    for record in records:
+        writer.write(record)
+    writer.close()
+    return buffer.getvalue()
+
+
+def split_frames(data):
+    frames, offset = [], len(export_format.MAGIC) + 1
+    while offset < len(data):
+        _, length = export_format._FRAME_HEADER.unpack_from(data, offset)
+        end = offset + export_format._FRAME_HEADER.size + length
+        frames.append(data[offset:end])
+        offset = end
+    return frames
+
+
+def read_container(data, crypto):
+    reader = ExportReader(io.BytesIO(data), crypto)
+    return reader.version, [record for batch in reader for record in batch]
+
+
+def test_round_trip_in_several_chunks(make_vault):
+    crypto = make_vault().crypto
+    data = write_container(crypto, RECORDS)
+    assert len(split_frames(data)) > 2
+    assert read_container(data, crypto) == (3, RECORDS)
+
+
+def test_reads_version_2(make_vault, monkeypatch):
+    crypto = make_vault().crypto
+    # В версии 2 пароль внутри блока - отдельный токен Fernet
+    monkeypatch.setattr(export_format, "FORMAT_VERSION", 2)
+    data = write_container(crypto, [(s, u, crypto.encrypt(p), d) for s, u, p, d in RECORDS])
+    version, records = read_container(data, crypto)
+    assert version == 2
+    assert [(s, u, crypto.decrypt(p), d) for s, u, p, d in records] == RECORDS
+
+
+def test_import_of_version_2_and_line_formats(make_vault, monkeypatch, workdir):
+    source = make_vault("source")
+    crypto = source.crypto
+    monkeypatch.setattr(export_format, "FORMAT_VERSION", 2)
+    (workdir / "v2.lockup").write_bytes(write_container(crypto, [(s, u, crypto.encrypt(p), d)
+                                                                  for s, u, p, d in RECORDS[2:]]))
+    monkeypatch.undo()
+    hmac_key = crypto.generate_hmac_key()
+    lines = []
+    for service, username, password, date in RECORDS[2:]:
+        token = crypto.encrypt(f"{service},{username},{crypto.encrypt(password)},{date}")
+        lines.append(f"{token}:{hmac.new(hmac_key, token.encode(), hashlib.sha256).hexdigest()}\n")
+    (workdir / "lines.txt").write_text("".join(lines))
+
+    for name in ("v2.lockup", "lines.txt"):
+        target = make_vault(name.split(".")[0] + "-import")
+        target.crypto = crypto
+        assert target.import_from_file(str(workdir / name)) == len(RECORDS) - 2
+        imported = [(row[1], row[2], crypto.decrypt_field(row[0], "password", row[3]), row[4])
+                    for row in target.get_all_passwords()]
+        assert imported == RECORDS[2:]
+
+
+def test_tampered_chunk_is_rejected(make_vault):
+    crypto = make_vault().crypto
+    data = bytearray(write_container(crypto, RECORDS))
+    data[len(export_format.MAGIC) + 1 + 5 + 40] ^= 1
+    with pytest.raises(SecurityError):
+        read_container(bytes(data), crypto)
+
+
+def test_reordered_chunks_are_rejected(make_vault):
+    crypto = make_vault().crypto
+    data = write_container(crypto, RECORDS)
+    frames = split_frames(data)
+    swapped = data[:len(export_format.MAGIC) + 1] + frames[1] + frames[0] + b"".join(frames[2:])
+    with pytest.raises(SecurityError):
+        read_container(swapped, crypto)
+
+
+@pytest.mark.parametrize("cut", [1, 40, 200])
+def test_truncated_file_is_rejected(make_vault, cut):
+    crypto = make_vault().crypto
+    data = write_container(crypto, RECORDS)
+    with pytest.raises(SecurityError):
+        read_container(data[:-cut], crypto)
+
+
+def test_other_key_is_rejected(make_vault):
+    data = write_container(make_vault("first").crypto, RECORDS)
+    with pytest.raises(SecurityError):
+        read_container(data, make_vault("second").crypto)
+
+
+def test_failed_import_keeps_vault_unchanged(make_vault, workdir):
+    db = make_vault()
+    db.add_password("kept", "user", "password")
+    db.export_to_file("export.lockup")
+    data = (workdir / "export.lockup").read_bytes()
+    (workdir / "export.lockup").write_bytes(data[:-1])
+    with pytest.raises(SecurityError):
+        db.import_from_file("export.lockup")
+    assert db.count_passwords() == 1
@@ -0,0 +1,24 @@
+import threading
+
+import connection
+from jobs import Job, JobRunner
+
+
+def test_job_thread_releases_connections(workdir):
+    connection.set_database_path(str(workdir / "jobs.db"))
+
+    def task(job):
+        connection.get_connection().execute("SELECT 1")
+        return "done"
+
+    runner = JobRunner(root=None)
+    jobs = [Job() for _ in range(5)]
+    try:
+        for job in jobs:
+            worker = threading.Thread(target=runner._worker, args=(task, job))
+            worker.start()
+            worker.join()
+        assert [job._events.get_nowait() for job in jobs] == [("done", "done")] * 5
+        assert connection._pool._all == []
+    finally:
+        connection.set_database_path(connection.DEFAULT_DB_PATH)
@@ -0,0 +1,49 @@
+import io
+import json
+
+import pytest
+
+import lockup
+from conftest import PASSWORD
+
+
+@pytest.fixture
+def run(make_vault, monkeypatch, capsys):
+    db = make_vault()
+
+    def run(*argv, stdin=""):
+        monkeypatch.setattr("sys.stdin", io.StringIO(f"{PASSWORD}\n{stdin}"))
+        code = lockup.main(["--db", db.path, *argv])
+        out, err = capsys.readouterr()
+        return code, json.loads(out) if out else None, err
+    run.db = db
+    return run
+
+
+def test_get_by_service_finds_exact_match_among_many_prefixes(run):
+    run.db.add_many((f"github{i}", "user", "other") for i in range(300))
+    run.db.add_password("GitHub", "alice", "secret")
+    code, records, _ = run("get", "--service", "github")
+    assert code == lockup.EXIT_OK
+    assert [(record["service"], record["password"]) for record in records] == [("GitHub", "secret")]
+
+
+def test_get_by_encrypted_service(run):
+    run.db.add_password("github", "alice", "secret")
+    run.db.migrate_encryption(("service", "password"))
+    code, records, _ = run("get", "--service", "GITHUB")
+    assert code == lockup.EXIT_OK and records[0]["password"] == "secret"
+
+
+def test_get_missing_service(run):
+    code, _, err = run("get", "--service", "nothing")
+    assert code == lockup.EXIT_ERROR and "error" in json.loads(err)
+
+
+def test_delete_reports_missing_ids(run):
+    run.db.add_many([("a", "u", "p"), ("b", "u", "p")])
+    code, result, err = run("delete", "1", "5")
+    assert code == lockup.EXIT_ERROR
+    assert result == {"deleted": [1], "missing": [5]}
+    assert "5" in json.loads(err)["error"]
+    assert run("delete", "2") == (lockup.EXIT_OK, {"deleted": [2]}, "")
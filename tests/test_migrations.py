@@ -0,0 +1,107 @@
+import sqlite3
+
+import pytest
+
+import migrations
+from conftest import PASSWORD
+from connection import get_connection
+from database import DatabaseManager, unlock_vault
+from encryption import KeyContext, hash_password
+from migrations import MIGRATIONS, SCHEMA_VERSION, schema_version, upgrade
+
+RECORDS = [("github", "alice", "first"), ("gitlab", "bob", "second"), ("mail", "carol", "third")]
+
+
+def baseline_vault(path):
+    """База первой версии: без user_version, kdf_params, vault_meta и индексов; пароли - токены Fernet"""
+    crypto = KeyContext(PASSWORD)  # соль в salt.key рядом с базой, как раньше
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE passwords (id INTEGER PRIMARY KEY AUTOINCREMENT, service TEXT NOT NULL,
+                    username TEXT NOT NULL, password TEXT NOT NULL, last_updated TEXT)""")
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, password_hash TEXT NOT NULL)")
+    conn.execute("INSERT INTO users (id, password_hash) VALUES (1, ?)", (hash_password(PASSWORD),))
+    conn.executemany("INSERT INTO passwords (service, username, password, last_updated) "
+                     "VALUES (?, ?, ?, datetime('now'))",
+                     [(service, username, crypto.encrypt(password)) for service, username, password in RECORDS])
+    conn.commit()
+    conn.close()
+
+
+def names(conn, kind):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+
+def test_versions_are_consecutive():
+    assert [step[0] for step in MIGRATIONS] == list(range(1, SCHEMA_VERSION + 1))
+
+
+def test_baseline_vault_upgrades_through_every_step(workdir):
+    path = str(workdir / "passwords.db")
+    baseline_vault(path)
+    conn = get_connection(path)
+    assert schema_version(conn) == SCHEMA_VERSION
+    assert upgrade(conn) == 0
+
+    assert {"passwords_fts", "vault_meta", "password_audit", "change_log"} <= names(conn, "table")
+    assert {"idx_passwords_service_sort", "idx_passwords_username_sort", "idx_passwords_updated_sort",
+            "idx_password_audit_fingerprint"} <= names(conn, "index")
+    assert "kdf_params" in {row[1] for row in conn.execute("PRAGMA table_info(users)")}
+    assert {"breached", "token_tag"} <= {row[1] for row in conn.execute("PRAGMA table_info(password_audit)")}
+
+    db = DatabaseManager(unlock_vault(PASSWORD, path=path), path)
+    # Записи, созданные до появления поиска, попали в индекс FTS
+    assert db.has_fts
+    assert [row[1] for row in db.search_passwords("git")] == ["github", "gitlab"]
+    assert [db.crypto.decrypt_field(row[0], "password", row[3]) for row in db.get_all_passwords()] == \
+        [record[2] for record in RECORDS]
+    assert db.audit_passwords() == (3, None)
+    # Журнал изменений не ведется, пока нет резервных копий
+    db.add_password("new", "user", "password")
+    assert conn.execute("SELECT COUNT(*) FROM change_log").fetchone()[0] == 0
+
+
+class NoFts5:
+    """Соединение, на котором CREATE VIRTUAL TABLE недоступен (SQLite без FTS5)"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def execute(self, sql, *args):
+        if "VIRTUAL TABLE" in sql:
+            raise sqlite3.OperationalError("no such module: fts5")
+        return self._conn.execute(sql, *args)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+def test_upgrade_without_fts5_falls_back_to_like_search(workdir):
+    path = str(workdir / "passwords.db")
+    baseline_vault(path)
+    conn = sqlite3.connect(path, isolation_level=None)
+    assert upgrade(NoFts5(conn)) == SCHEMA_VERSION
+    assert "passwords_fts" not in names(conn, "table")
+    # Индексы NOCASE шага 2 заменены индексами сортировки шага 3
+    indexes = names(conn, "index")
+    assert "idx_passwords_service_nocase" not in indexes and "idx_passwords_service_sort" in indexes
+    conn.close()
+
+    db = DatabaseManager(unlock_vault(PASSWORD, path=path), path)
+    assert not db.has_fts
+    assert [row[1] for row in db.search_passwords("GIT")] == ["github", "gitlab"]
+
+
+def test_failed_step_keeps_previous_version(workdir, monkeypatch):
+    path = str(workdir / "passwords.db")
+    baseline_vault(path)
+
+    def broken(conn):
+        conn.execute("CREATE TABLE half_done (id INTEGER)")
+        raise RuntimeError("сбой миграции")
+    monkeypatch.setattr(migrations, "MIGRATIONS", MIGRATIONS[:3] + [(4, "broken", broken)])
+    conn = sqlite3.connect(path, isolation_level=None)
+    with pytest.raises(RuntimeError):
+        upgrade(conn, 4)
+    assert schema_version(conn) == 3
+    assert "half_done" not in names(conn, "table")
+    conn.close()
@@ -0,0 +1,64 @@
+import random
+
+import pytest
+
+from database import SORT_KEYS, row_sort_key
+
+PAGE = 7
+
+
+@pytest.fixture
+def db(make_vault):
+    db = make_vault()
+    rng = random.Random(1)
+    # Повторяющиеся значения и разный регистр проверяют порядок по id внутри равных ключей
+    db.add_many((rng.choice(["alpha", "Beta", "beta", "gamma", "Яндекс", "банк"]),
+                 f"user-{rng.randrange(10)}", "password") for _ in range(60))
+    db.conn.executemany("UPDATE passwords SET last_updated = datetime('now', ?) WHERE id = ?",
+                        ((f"-{rng.randrange(5)} days", record_id) for record_id in range(1, 61, 2)))
+    db.conn.commit()
+    return db
+
+
+def read_by_keyset(db, sort, query=None):
+    rows, after = [], None
+    while True:
+        page = db.get_passwords_page(0, PAGE, query=query, sort=sort, after=after)
+        if not page:
+            return rows
+        rows.extend(page)
+        after = row_sort_key(page[-1], sort[0])
+
+
+def read_by_offset(db, sort, query=None):
+    rows = []
+    while True:
+        page = db.get_passwords_page(len(rows), PAGE, query=query, sort=sort)
+        if not page:
+            return rows
+        rows.extend(page)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+@pytest.mark.parametrize("column", list(SORT_KEYS))
+def test_keyset_pages_match_offset_pages(db, column, descending):
+    sort = (column, descending)
+    rows = read_by_keyset(db, sort)
+    assert rows == read_by_offset(db, sort)
+    assert len(rows) == db.count_passwords()
+
+
+@pytest.mark.parametrize("column", list(SORT_KEYS))
+def test_keyset_pages_with_query(db, column):
+    sort = (column, False)
+    rows = read_by_keyset(db, sort, "beta")
+    assert rows == read_by_offset(db, sort, "beta")
+    assert rows and all(row[1].lower() == "beta" for row in rows)
+
+
+@pytest.mark.parametrize("descending", [False, True])
+def test_position_matches_sorted_order(db, descending):
+    sort = ("service", descending)
+    rows = read_by_offset(db, sort)
+    for position in (0, 13, len(rows) - 1):
+        assert db.get_password_position(rows[position][0], sort) == position
@@ -0,0 +1,56 @@
+import sqlite3
+
+import pytest
+
+from conftest import PASSWORD
+from database import unlock_vault
+
+
+def blocked_writer(path):
+    """Соединение без ожидания блокировки: запись во время перешифрования падает"""
+    conn = sqlite3.connect(path, timeout=0)
+
+    def write():
+        with pytest.raises(sqlite3.OperationalError, match="locked"):
+            conn.execute("UPDATE passwords SET password = 'plain' WHERE id = 1")
+    return conn, write
+
+
+def reads_in_transaction(db):
+    """Для каждого чтения всех записей - шло ли оно внутри транзакции"""
+    reads = []
+    db.conn.set_trace_callback(
+        lambda sql: reads.append(db.conn.in_transaction) if sql.startswith("SELECT id, service") else None
+    )
+    return reads
+
+
+def test_master_password_change_holds_write_lock(make_vault, workdir):
+    db = make_vault()
+    db.add_many((f"service-{i}", "user", f"password-{i}") for i in range(20))
+    reads = reads_in_transaction(db)
+    conn, write = blocked_writer(db.path)
+    db.change_master_password("new-password", progress=lambda done, total: write())
+    conn.close()
+    db.conn.set_trace_callback(None)
+    assert reads == [True]
+
+    key_context = unlock_vault("new-password", path=db.path)
+    assert key_context is not None and unlock_vault(PASSWORD, path=db.path) is None
+    assert [key_context.decrypt_field(row[0], "password", row[3]) for row in db.get_all_passwords()] == \
+        [f"password-{i}" for i in range(20)]
+
+
+def test_encryption_migration_holds_write_lock(make_vault):
+    db = make_vault()
+    db.add_many((f"service-{i}", "user", f"password-{i}") for i in range(20))
+    reads = reads_in_transaction(db)
+    conn, write = blocked_writer(db.path)
+    db.migrate_encryption(("service", "username", "password"), progress=lambda done, total: write())
+    conn.close()
+    db.conn.set_trace_callback(None)
+    assert reads == [True]
+
+    stored = db.conn.execute("SELECT service, username, password FROM passwords").fetchall()
+    assert all(isinstance(value, bytes) for row in stored for value in row)
+    assert [row[1] for row in db.get_all_passwords()] == [f"service-{i}" for i in range(20)]
@@ -0,0 +1,37 @@
+import encryption
+from conftest import PASSWORD
+from database import DatabaseManager, unlock_vault
+
+
+def counted(monkeypatch, owner, name, calls):
+    original = getattr(owner, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(name)
+        return original(*args, **kwargs)
+    monkeypatch.setattr(owner, name, wrapper)
+
+
+def test_unlock_derives_vault_key_once(make_vault, monkeypatch):
+    path = make_vault().path
+    calls = []
+    counted(monkeypatch, encryption, "derive", calls)
+    counted(monkeypatch, encryption, "pbkdf2_hmac", calls)
+    counted(monkeypatch, encryption.CryptoManager, "derive_key", calls)
+
+    key_context = unlock_vault(PASSWORD, path=path)
+    db = DatabaseManager(key_context, path)
+    record_id = db.add_password("service", "user", "password")
+    assert key_context.decrypt_field(record_id, "password", db.get_password_by_id(record_id)[3]) == "password"
+
+    # Одна проверка хеша мастер-пароля и один вывод ключа хранилища
+    assert calls.count("derive_key") == 1
+    assert calls.count("derive") + calls.count("pbkdf2_hmac") == 2
+
+
+def test_wrong_password_skips_key_derivation(make_vault, monkeypatch):
+    path = make_vault().path
+    calls = []
+    counted(monkeypatch, encryption.CryptoManager, "derive_key", calls)
+    assert unlock_vault("wrong", path=path) is None
+    assert calls == []
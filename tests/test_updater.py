@@ -0,0 +1,92 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from updater import UpdateChecker, fetch_version_info
+
+VERSION_INFO = {"latest_version": "2.0.0", "download_url": "https://example.invalid/lockup"}
+
+
+class FakeRoot:
+    """Вместо Tk: after() выполняется в pump() того же потока"""
+
+    def __init__(self):
+        self.pending = []
+
+    def after(self, delay, func, *args):
+        self.pending.append((func, args))
+
+    def pump(self, timeout=5):
+        deadline = time.monotonic() + timeout
+        while self.pending and time.monotonic() < deadline:
+            func, args = self.pending.pop(0)
+            func(*args)
+            time.sleep(0.01)
+        assert not self.pending, "результат проверки не получен"
+
+
+@pytest.fixture
+def server():
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append(self.path)
+            body = json.dumps(VERSION_INFO).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.requests = requests_seen
+    httpd.url = f"http://127.0.0.1:{httpd.server_address[1]}/version.json"
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def check(url, cache_file, ttl, use_cache=True):
+    root = FakeRoot()
+    results, errors = [], []
+    UpdateChecker(root, url, "1.0.0", str(cache_file), ttl).start(
+        lambda data, has_update: results.append((data, has_update)), errors.append, use_cache
+    )
+    root.pump()
+    return results, errors
+
+
+def test_result_is_cached_for_ttl(server, tmp_path):
+    cache_file = tmp_path / "update_cache.json"
+    assert check(server.url, cache_file, 3600) == ([(VERSION_INFO, True)], [])
+    assert check(server.url, cache_file, 3600) == ([(VERSION_INFO, True)], [])
+    assert len(server.requests) == 1
+    # Ручная проверка идет мимо кеша
+    check(server.url, cache_file, 3600, use_cache=False)
+    assert len(server.requests) == 2
+
+
+def test_stale_cache_is_refreshed(server, tmp_path):
+    cache_file = tmp_path / "update_cache.json"
+    cache_file.write_text(json.dumps({"fetched_at": 0, "data": {"latest_version": "0.1"}}))
+    assert fetch_version_info(server.url, str(cache_file), ttl=60) == VERSION_INFO
+    assert len(server.requests) == 1
+    assert json.loads(cache_file.read_text())["data"] == VERSION_INFO
+
+
+def test_network_failure_reaches_error_callback(server, tmp_path):
+    url = server.url
+    server.shutdown()
+    server.server_close()
+    results, errors = check(url, tmp_path / "update_cache.json", 0)
+    assert results == [] and len(errors) == 1
+    assert not (tmp_path / "update_cache.json").exists()
@@ -0,0 +1,46 @@
+from conftest import PASSWORD
+from database import DatabaseManager, create_vault
+from listview import MergedRowSource, NOCASE
+from vaults import Vault, VaultRegistry
+
+
+def test_merged_list_uses_sql_nocase_order(workdir):
+    services = [["Банк", "Яндекс", "Zeta", "alpha"], ["банк2", "Ящик", "вк2", "Beta"], ["Вк", "gamma"]]
+    vaults = []
+    for number, names in enumerate(services):
+        path = str(workdir / f"vault-{number}.db")
+        vault = Vault(f"vault-{number}", path, create_vault(path, PASSWORD))
+        vault.db.add_many((name, "user", "password") for name in names)
+        vaults.append(vault)
+    registry = VaultRegistry(vaults[0])
+    for vault in vaults[1:]:
+        registry.add(vault.path).key_context = vault.key_context
+
+    source = MergedRowSource(registry, page_size=2)
+    source.set_sort("service")
+    merged = [row[1] for row in source.rows(0, 20)]
+    registry.close()
+
+    expected = sorted((name for names in services for name in names), key=lambda name: name.translate(NOCASE))
+    assert merged == expected
+    # Тот же порядок дает SQLite в одной базе
+    db = DatabaseManager(vaults[0].key_context, vaults[0].path)
+    db.add_many((name, "user", "password") for names in services[1:] for name in names)
+    assert [row[1] for row in db.get_passwords_page(0, 20, sort=("service", False))] == expected
+
+
+def test_merged_list_sorts_only_by_columns_open_in_every_vault(workdir):
+    vaults = []
+    for number in range(2):
+        path = str(workdir / f"vault-{number}.db")
+        vaults.append(Vault(f"vault-{number}", path, create_vault(path, PASSWORD)))
+    registry = VaultRegistry(vaults[0])
+    registry.add(vaults[1].path).key_context = vaults[1].key_context
+    source = MergedRowSource(registry)
+    assert "service" in source.sortable_columns()
+
+    registry.unlocked()[1].db.migrate_encryption(("service", "password"))
+    columns = source.sortable_columns()
+    registry.close()
+    assert "service" not in columns
+    assert "id" in columns
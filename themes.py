@@ -0,0 +1,105 @@
+"""Темы оформления ttk в виде таблиц (по аналогии с LANGUAGES в lang.py).
+
+Каждая тема один раз компилируется в именованную тему ttk через
+theme_create, после чего переключение - это один вызов theme_use.
+"""
+
+# Палитры тем; ключи используются в шаблоне THEME_STYLES
+PALETTES = {
+    "dark": {
+        "background": "#2d2d2d",
+        "foreground": "#ffffff",
+        "field": "#3d3d3d",
+        "button": "#404040",
+        "active": "#505050",
+        "check_active": "#3d3d3d",
+        "selected": "#505050",
+        "indicator": "#ffffff",
+    },
+    "light": {
+        "background": "#f0f0f0",
+        "foreground": "#000000",
+        "field": "#ffffff",
+        "button": "#e0e0e0",
+        "active": "#d0d0d0",
+        "check_active": "#e0e0e0",
+        "selected": "#d0d0d0",
+        "indicator": "#ffffff",
+    },
+}
+
+# Стили ttk: значения-строки вида "{ключ}" подставляются из палитры
+THEME_STYLES = {
+    ".": {
+        "configure": {"background": "{background}", "foreground": "{foreground}",
+                      "fieldbackground": "{field}", "borderwidth": 0},
+    },
+    "TButton": {
+        # Кнопки темные в обеих темах, меняется только подсветка
+        "configure": {"background": "#404040", "foreground": "#ffffff", "bordercolor": "#404040",
+                      "width": 12, "padding": 5, "font": ("Arial", 10)},
+        "map": {"background": [("active", "{active}")], "foreground": [("active", "{foreground}")]},
+    },
+    "Settings.TButton": {
+        "configure": {"borderwidth": 0, "relief": "flat", "highlightthickness": 0},
+    },
+    "TRadiobutton": {
+        "configure": {"background": "{background}", "foreground": "{foreground}",
+                      "indicatorcolor": "{indicator}"},
+        "map": {"background": [("active", "{button}")], "foreground": [("active", "{foreground}")]},
+    },
+    "TCheckbutton": {
+        "configure": {"background": "{background}", "foreground": "{foreground}"},
+        "map": {"background": [("active", "{check_active}")], "foreground": [("active", "{foreground}")]},
+    },
+    "Dynamic.TEntry": {
+        "configure": {"fieldbackground": "{field}", "foreground": "{foreground}"},
+    },
+    "Treeview": {
+        "configure": {"background": "{background}", "foreground": "{foreground}",
+                      "fieldbackground": "{background}"},
+        "map": {"background": [("selected", "{selected}")], "foreground": [("selected", "{foreground}")]},
+    },
+    "Treeview.Item": {
+        "configure": {"background": "{field}", "foreground": "{foreground}"},
+    },
+    "Treeview.Heading": {
+        "configure": {"background": "{background}", "foreground": "{foreground}", "relief": "flat"},
+        "map": {"background": [("active", "{button}")]},
+    },
+}
+
+BASE_THEME = "clam"
+
+def theme_name(theme: str) -> str:
+    return f"lockup-{theme}"
+
+def _fill(value, palette):
+    if isinstance(value, str):
+        return value.format(**palette)
+    if isinstance(value, list):
+        return [tuple(_fill(part, palette) for part in item) for item in value]
+    return value
+
+def theme_settings(theme: str) -> dict:
+    """Настройки для style.theme_create с цветами из палитры темы"""
+    palette = PALETTES[theme]
+    return {
+        style: {
+            section: {option: _fill(value, palette) for option, value in options.items()}
+            for section, options in sections.items()
+        }
+        for style, sections in THEME_STYLES.items()
+    }
+
+def compile_themes(style):
+    """Создает темы ttk, которых еще нет в интерпретаторе Tk"""
+    existing = set(style.theme_names())
+    for theme in PALETTES:
+        if theme_name(theme) not in existing:
+            style.theme_create(theme_name(theme), parent=BASE_THEME, settings=theme_settings(theme))
+
+def use_theme(style, theme: str):
+    compile_themes(style)
+    style.theme_use(theme_name(theme))
+    return PALETTES[theme]
@@ -0,0 +1,86 @@
+import json
+import os
+import queue
+import threading
+import time
+
+CACHE_FILE = "update_cache.json"
+
+def _read_cache(cache_file: str, ttl: float):
+    """Возвращает закешированный version.json, если он не старше ttl секунд"""
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - cached.get("fetched_at", 0) > ttl:
+        return None
+    return cached.get("data")
+
+def _write_cache(cache_file: str, data: dict):
+    tmp_file = cache_file + ".tmp"
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({"fetched_at": time.time(), "data": data}, f)
+    os.replace(tmp_file, cache_file)
+
+def fetch_version_info(url: str, cache_file: str = CACHE_FILE, ttl: float = 0, timeout: float = 5) -> dict:
+    """Загружает version.json, используя кеш на диске, пока он свежий"""
+    if ttl > 0:
+        cached = _read_cache(cache_file, ttl)
+        if cached is not None:
+            return cached
+
+    import requests  # Импортируется только в фоновом потоке
+    response = requests.get(url, timeout=timeout)
+    response.raise_for_status()
+    data = response.json()
+    try:
+        _write_cache(cache_file, data)
+    except OSError:
+        pass
+    return data
+
+def is_newer(latest_version: str, current_version: str) -> bool:
+    from packaging import version
+    return version.parse(latest_version) > version.parse(current_version)
+
+class UpdateChecker:
+    """Проверка обновлений в фоновом потоке.
+
+    Результат передается в цикл Tk через очередь, которую опрашивает after(),
+    поэтому главный цикл не ждет сеть.
+    """
+
+    POLL_INTERVAL = 100  # мс
+
+    def __init__(self, root, url: str, current_version: str, cache_file: str = CACHE_FILE, ttl: float = 0):
+        self.root = root
+        self.url = url
+        self.current_version = current_version
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self._results = queue.Queue()
+
+    def start(self, on_result, on_error=None, use_cache: bool = True):
+        """on_result(data, has_update) и on_error(exc) вызываются в потоке Tk"""
+        ttl = self.ttl if use_cache else 0
+        threading.Thread(target=self._worker, args=(ttl,), daemon=True).start()
+        self.root.after(self.POLL_INTERVAL, self._poll, on_result, on_error)
+
+    def _worker(self, ttl):
+        try:
+            data = fetch_version_info(self.url, self.cache_file, ttl)
+            self._results.put((data, is_newer(data["latest_version"], self.current_version), None))
+        except Exception as e:
+            self._results.put((None, False, e))
+
+    def _poll(self, on_result, on_error):
+        try:
+            data, has_update, error = self._results.get_nowait()
+        except queue.Empty:
+            self.root.after(self.POLL_INTERVAL, self._poll, on_result, on_error)
+            return
+        if error is None:
+            on_result(data, has_update)
+        elif on_error is not None:
+            on_error(error)
@@ -0,0 +1,135 @@
+"""Реестр хранилищ: несколько файлов базы, открытых в одном окне.
+
+Основная база (settings.json: database_path) разблокируется при входе,
+дополнительные перечислены в settings.json ("vaults") и открываются
+лениво: ни соединения, ни вывода ключей, пока хранилище не выбрано.
+У каждого хранилища своя соль, свой KeyContext и свое соединение.
+
+Запросы ко всем разблокированным хранилищам выполняются параллельно
+в потоках: sqlite3 и cryptography отпускают GIL на время работы.
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from database import DatabaseManager, check_master_password_exists, create_vault, unlock_vault
+from encryption import SecurityError
+
+class Vault:
+    """Файл хранилища; path=None - основная база"""
+
+    def __init__(self, name: str, path: str = None, key_context=None):
+        self.name = name
+        self.path = path
+        self.key_context = key_context
+        self._db = None
+
+    @property
+    def unlocked(self) -> bool:
+        return self.key_context is not None
+
+    def exists(self) -> bool:
+        """Задан ли мастер-пароль (иначе файл нужно создать через create)"""
+        return check_master_password_exists(self.path)
+
+    def unlock(self, password: str, kdf_params: dict = None) -> bool:
+        if not self.unlocked:
+            self.key_context = unlock_vault(password, kdf_params, self.path)
+        return self.unlocked
+
+    def create(self, password: str, kdf_params: dict = None):
+        self.key_context = create_vault(self.path, password, kdf_params)
+
+    def lock(self):
+        self.key_context = None
+        self._db = None
+
+    @property
+    def db(self) -> DatabaseManager:
+        if self._db is None:
+            if not self.unlocked:
+                raise SecurityError(f"Хранилище {self.name} заблокировано")
+            self._db = DatabaseManager(self.key_context, self.path)
+        return self._db
+
+def vault_name(path: str) -> str:
+    return os.path.splitext(os.path.basename(path))[0]
+
+class VaultRegistry:
+    """Открытые хранилища по именам и текущее (в него добавляются записи)"""
+
+    def __init__(self, primary: Vault, entries=()):
+        self.primary = primary
+        self.active = primary
+        self.vaults = {primary.name: primary}
+        for entry in entries:
+            self.vaults[entry["name"]] = Vault(entry["name"], entry["path"])
+        self._executor = None
+
+    @classmethod
+    def from_settings(cls, settings: dict, key_context):
+        primary = Vault(vault_name(settings["database_path"]), key_context=key_context)
+        return cls(primary, settings.get("vaults", ()))
+
+    def entries(self) -> list:
+        """Дополнительные хранилища для settings.json"""
+        return [{"name": vault.name, "path": vault.path}
+                for vault in self.vaults.values() if vault is not self.primary]
+
+    def names(self) -> list:
+        return list(self.vaults)
+
+    def get(self, name: str) -> Vault:
+        return self.vaults[name]
+
+    def add(self, path: str) -> Vault:
+        path = os.path.abspath(path)
+        for vault in self.vaults.values():
+            if vault.path == path:
+                return vault
+        name = base = vault_name(path)
+        number = 2
+        while name in self.vaults:
+            name = f"{base}-{number}"
+            number += 1
+        vault = self.vaults[name] = Vault(name, path)
+        return vault
+
+    def remove(self, name: str):
+        vault = self.vaults[name]
+        if vault is self.primary:
+            raise ValueError("Основное хранилище нельзя закрыть")
+        del self.vaults[name]
+        vault.lock()
+        if self.active is vault:
+            self.active = self.primary
+
+    def unlocked(self) -> list:
+        return [vault for vault in self.vaults.values() if vault.unlocked]
+
+    def record_key(self, vault: Vault, record_id: int) -> str:
+        """Ключ записи в общем списке хранилищ"""
+        return f"{vault.name}:{record_id}"
+
+    def resolve(self, key: str):
+        """(хранилище, id записи) по ключу record_key"""
+        name, _, record_id = key.rpartition(":")
+        return self.vaults[name], int(record_id)
+
+    def map(self, func, items) -> list:
+        """func для каждого элемента параллельно; результаты в исходном порядке.
+
+        Соединения создаются в вызывающем потоке (Vault.db), в потоках
+        пула каждое хранилище использует только свое соединение.
+        """
+        items = list(items)
+        if len(items) < 2:
+            return [func(item) for item in items]
+        if self._executor is None:
+            # Запросы упираются и в диск, поэтому потоков больше, чем ядер (как по умолчанию)
+            self._executor = ThreadPoolExecutor(thread_name_prefix="vault")
+        return list(self._executor.map(func, items))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None